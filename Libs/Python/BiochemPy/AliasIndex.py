@@ -0,0 +1,148 @@
+import os
+import sys
+from csv import reader as csv_reader
+
+class AliasIndex:
+    # Indexes built in this process, by file and type of identifier, so
+    # that every helper that loads the aliases shares the same parse
+    Shared_Indexes = dict()
+
+    def __init__(self, aliases_file, names_file, id_type):
+        self.AliasFile = aliases_file
+        self.NameFile = names_file
+
+        # i.e. "cpd" or "rxn", rows for other identifiers are skipped
+        self.IdType = id_type
+
+        # Each file is parsed on first use, and again only if it changed
+        self.AliasStamp = None
+        self.NameStamp = None
+
+        # Rows of the aliases file: [(msid, alias, source, sources)]
+        # where sources is the source field split on '|'
+        self.AliasRows = list()
+
+        # {msid: {source: [aliases]}} and {source: {alias: [msids]}}
+        self.MSAliases = dict()
+        self.SourceAliases = dict()
+
+        # {msid: [names]} and {name: [msids]}
+        self.MSNames = dict()
+        self.NameIDs = dict()
+
+    @classmethod
+    def sharedIndex(cls, aliases_file, names_file, id_type):
+        key = (os.path.realpath(aliases_file), os.path.realpath(names_file), id_type)
+        if(key not in cls.Shared_Indexes):
+            cls.Shared_Indexes[key] = cls(aliases_file, names_file, id_type)
+        return cls.Shared_Indexes[key]
+
+    @staticmethod
+    def fileStamp(file_name):
+        stat = os.stat(file_name)
+        return (stat.st_size, stat.st_mtime_ns)
+
+    def readRows(self, file_name, fields):
+        # Yields the given fields of each row, the first field being the
+        # ModelSEED ID, the strings are interned so that the same
+        # identifier is only held once
+        with open(file_name) as fh:
+            reader = csv_reader(fh, dialect = 'excel-tab')
+            headers = next(reader, None)
+            if(headers is None):
+                return
+
+            columns = [headers.index(field) for field in fields]
+            for row in reader:
+                # Same handling of blank and short rows as DictReader
+                if(row == []):
+                    continue
+                if(len(row) < len(headers)):
+                    row += [None] * (len(headers) - len(row))
+
+                if(self.IdType not in row[columns[0]]):
+                    continue
+
+                yield tuple(sys.intern(row[column]) if row[column] is not None else None
+                            for column in columns)
+
+    def parseAliases(self):
+        stamp = self.fileStamp(self.AliasFile)
+        if(stamp == self.AliasStamp):
+            return
+
+        self.AliasRows = list()
+        self.MSAliases = dict()
+        self.SourceAliases = dict()
+
+        sources_cache = dict()
+        for (msid, alias, source) in self.readRows(self.AliasFile, ('ModelSEED ID', 'External ID', 'Source')):
+            if(source not in sources_cache):
+                sources_cache[source] = tuple(sys.intern(entry) for entry in source.split('|'))
+            sources = sources_cache[source]
+            self.AliasRows.append((msid, alias, source, sources))
+
+            if(msid not in self.MSAliases):
+                self.MSAliases[msid] = dict()
+
+            for entry in sources:
+                if(entry not in self.MSAliases[msid]):
+                    self.MSAliases[msid][entry] = list()
+                self.MSAliases[msid][entry].append(alias)
+
+                if(entry not in self.SourceAliases):
+                    self.SourceAliases[entry] = dict()
+                if(alias not in self.SourceAliases[entry]):
+                    self.SourceAliases[entry][alias] = list()
+                self.SourceAliases[entry][alias].append(msid)
+
+        self.AliasStamp = stamp
+
+    def parseNames(self):
+        stamp = self.fileStamp(self.NameFile)
+        if(stamp == self.NameStamp):
+            return
+
+        self.MSNames = dict()
+        self.NameIDs = dict()
+        for (msid, name) in self.readRows(self.NameFile, ('ModelSEED ID', 'External ID')):
+            if(msid not in self.MSNames):
+                self.MSNames[msid] = list()
+            self.MSNames[msid].append(name)
+
+            if(name not in self.NameIDs):
+                self.NameIDs[name] = list()
+            self.NameIDs[name].append(msid)
+
+        self.NameStamp = stamp
+
+    # The views below are shared by every caller, and must not be changed,
+    # the loaders in Compounds and Reactions return copies of them
+
+    def aliasRows(self):
+        self.parseAliases()
+        return self.AliasRows
+
+    def msAliases(self):
+        self.parseAliases()
+        return self.MSAliases
+
+    def sourceAliases(self):
+        self.parseAliases()
+        return self.SourceAliases
+
+    def msNames(self):
+        self.parseNames()
+        return self.MSNames
+
+    def nameIDs(self):
+        self.parseNames()
+        return self.NameIDs
+
+    @staticmethod
+    def copyLists(lists_dict):
+        return dict((key, list(values)) for key, values in lists_dict.items())
+
+    @staticmethod
+    def copyNestedLists(nested_dict):
+        return dict((key, AliasIndex.copyLists(lists_dict)) for key, lists_dict in nested_dict.items())
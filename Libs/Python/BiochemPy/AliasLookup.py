@@ -0,0 +1,206 @@
+import os
+import json
+import mmap
+import struct
+from .Snapshots import Snapshot
+from .AliasIndex import AliasIndex
+
+# Version of the lookup layout, bump it whenever the layout changes
+LOOKUP_VERSION = 1
+
+# The header is padded to a fixed size so that it can be written last
+HEADER_SIZE = 512
+
+class AliasLookup:
+    """
+    Resolves aliases without parsing the whole alias file. The aliases are
+    compiled into a hidden file next to the alias file, which holds two
+    sorted lists of lines, "source<tab>alias<tab>msid" and
+    "msid<tab>source<tab>alias", each followed by the offset of every line
+    so that a key is found by binary search. The compiled file is mapped
+    into memory, and is rebuilt whenever the alias file changes
+    """
+
+    # Lookups opened in this process, by file and type of identifier
+    Shared_Lookups = dict()
+
+    def __init__(self, aliases_file, id_type):
+        (aliases_dir, aliases_name) = os.path.split(aliases_file)
+        self.AliasFile = aliases_file
+        self.LookupFile = os.path.join(aliases_dir, '.' + aliases_name + '.lookup')
+        self.IdType = id_type
+
+        self.Data = None
+        self.Forward = None
+        self.Reverse = None
+        self.open()
+
+    @classmethod
+    def sharedLookup(cls, aliases_file, id_type):
+        key = (os.path.realpath(aliases_file), id_type)
+        if(key not in cls.Shared_Lookups):
+            cls.Shared_Lookups[key] = cls(aliases_file, id_type)
+        elif(cls.Shared_Lookups[key].isFresh() is False):
+            cls.Shared_Lookups[key].close()
+            cls.Shared_Lookups[key].open()
+        return cls.Shared_Lookups[key]
+
+    def isFresh(self):
+        stat = os.stat(self.AliasFile)
+        return (stat.st_size, stat.st_mtime_ns) == self.Stamp
+
+    def open(self):
+        snapshot = Snapshot(self.AliasFile, 'lookup')
+        self.Stamp = (snapshot.Size, snapshot.MTime)
+
+        header = self.readHeader()
+        if(header is None or header.get('id_type') != self.IdType or
+                snapshot.isFresh(header.get('source', dict())) is False):
+            data = self.compile()
+            header = self.parseHeader(data)
+            if(self.saveLookup(snapshot, data) is False):
+                # i.e. a read-only checkout, the lookup is kept in memory
+                self.Data = data
+        if(self.Data is None):
+            with open(self.LookupFile, 'rb') as fh:
+                self.Data = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+            header = self.parseHeader(self.Data)
+
+        self.Forward = header['forward']
+        self.Reverse = header['reverse']
+
+    def close(self):
+        if(isinstance(self.Data, mmap.mmap)):
+            self.Data.close()
+        self.Data = None
+
+    @staticmethod
+    def parseHeader(data):
+        try:
+            header = json.loads(bytes(data[:HEADER_SIZE]).decode('utf-8'))
+        except ValueError:
+            return None
+        if(not isinstance(header, dict) or header.get('version') != LOOKUP_VERSION):
+            return None
+        return header
+
+    def readHeader(self):
+        if(os.path.isfile(self.LookupFile) is False):
+            return None
+
+        try:
+            with open(self.LookupFile, 'rb') as fh:
+                return self.parseHeader(fh.read(HEADER_SIZE))
+        except OSError:
+            return None
+
+    def compile(self):
+        forward_lines = set()
+        reverse_lines = set()
+        alias_index = AliasIndex(self.AliasFile, None, self.IdType)
+        for (msid, alias, source_field, sources) in alias_index.aliasRows():
+            for source in sources:
+                forward_lines.add("\t".join((source, alias, msid)).encode('utf-8'))
+                reverse_lines.add("\t".join((msid, source, alias)).encode('utf-8'))
+
+        chunks = [b""]
+        position = HEADER_SIZE
+        sections = list()
+        for lines in (sorted(forward_lines), sorted(reverse_lines)):
+            lines_start = position
+            offsets = list()
+            for line in lines:
+                offsets.append(position)
+                chunks.append(line + b"\n")
+                position += len(line) + 1
+
+            index_start = position
+            chunks.append(struct.pack('<' + str(len(offsets)) + 'Q', *offsets))
+            position += 8 * len(offsets)
+            sections.append([lines_start, index_start, len(offsets)])
+
+        # The source header is filled in when the file is saved
+        header = {'version': LOOKUP_VERSION, 'id_type': self.IdType,
+                  'forward': sections[0], 'reverse': sections[1]}
+        chunks[0] = self.packHeader(header)
+        return b"".join(chunks)
+
+    @staticmethod
+    def packHeader(header):
+        header_text = json.dumps(header, sort_keys=True).encode('utf-8')
+        if(len(header_text) >= HEADER_SIZE):
+            raise ValueError("Lookup header is too long: " + str(len(header_text)))
+        return header_text + b" " * (HEADER_SIZE - len(header_text) - 1) + b"\n"
+
+    def saveLookup(self, snapshot, data):
+        header = self.parseHeader(data)
+        header['source'] = snapshot.header()
+
+        # Don't store a lookup of a file that changed whilst it was read
+        stat = os.stat(self.AliasFile)
+        if(stat.st_size != snapshot.Size or stat.st_mtime_ns != snapshot.MTime):
+            return False
+
+        temp_file = self.LookupFile + '.' + str(os.getpid()) + '.tmp'
+        try:
+            with open(temp_file, 'wb') as fh:
+                fh.write(self.packHeader(header))
+                fh.write(memoryview(data)[HEADER_SIZE:])
+            os.replace(temp_file, self.LookupFile)
+        except OSError:
+            if(os.path.isfile(temp_file)):
+                os.remove(temp_file)
+            return False
+
+        return True
+
+    def readLine(self, index_start, line_index):
+        offset = struct.unpack_from('<Q', self.Data, index_start + 8 * line_index)[0]
+        return self.Data[offset:self.Data.find(b"\n", offset)]
+
+    def searchLines(self, section, prefix):
+        # Yields the remainder of every line that starts with the prefix
+        (lines_start, index_start, count) = section
+        prefix = prefix.encode('utf-8')
+
+        low = 0
+        high = count
+        while(low < high):
+            middle = (low + high) // 2
+            if(self.readLine(index_start, middle) < prefix):
+                low = middle + 1
+            else:
+                high = middle
+
+        while(low < count):
+            line = self.readLine(index_start, low)
+            if(not line.startswith(prefix)):
+                break
+            yield line[len(prefix):].decode('utf-8')
+            low += 1
+
+    def findMSIDs(self, source, alias):
+        """
+        @param source: source of the alias, i.e. KEGG
+        @param alias: external identifier, i.e. C00001
+        @return: sorted list of the ModelSEED IDs that have the alias
+        """
+        return list(self.searchLines(self.Forward, source + "\t" + alias + "\t"))
+
+    def findAliases(self, msid, source=None):
+        """
+        @param msid: ModelSEED ID, i.e. cpd00001
+        @param source: optional source, i.e. KEGG
+        @return: sorted list of the aliases from the source if given,
+        otherwise a dictionary of the sorted aliases from each source
+        """
+        if(source is not None):
+            return list(self.searchLines(self.Reverse, msid + "\t" + source + "\t"))
+
+        aliases_dict = dict()
+        for entry in self.searchLines(self.Reverse, msid + "\t"):
+            (source, alias) = entry.split("\t", 1)
+            if(source not in aliases_dict):
+                aliases_dict[source] = list()
+            aliases_dict[source].append(alias)
+        return aliases_dict
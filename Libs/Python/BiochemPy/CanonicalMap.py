@@ -0,0 +1,161 @@
+class CanonicalMap:
+    """
+    The compound or reaction that stands for each obsolete compound or
+    reaction. Entries are grouped with their linked entries by union-find,
+    and the replacement of every obsolete entry is resolved once, so that
+    canonical() is a lookup. Use Compounds.canonicalMap() and
+    Reactions.canonicalMap() rather than building it directly
+    """
+
+    def __init__(self, rows_dict, link_field):
+        """
+        @param rows_dict: compounds or reactions, as returned by
+        loadCompounds() or loadReactions()
+        @param link_field: linked_compound or linked_reaction
+        """
+        self.Obsolete = dict((row_id, rows_dict[row_id]['is_obsolete'] == 1) for row_id in rows_dict)
+
+        # The linked entries of each entry, in the order in which they're
+        # listed, and the links to entries that don't exist: [(id, link)]
+        self.Links = dict()
+        self.Dangling = list()
+
+        self.Parents = dict((row_id, row_id) for row_id in rows_dict)
+        self.Sizes = dict((row_id, 1) for row_id in rows_dict)
+        for row_id in rows_dict:
+            links = rows_dict[row_id][link_field]
+            if(links is None or links == 'null' or links == ''):
+                continue
+
+            self.Links[row_id] = list()
+            for link in links.split(';'):
+                if(link not in rows_dict):
+                    self.Dangling.append((row_id, link))
+                    continue
+                self.Links[row_id].append(link)
+                self.union(row_id, link)
+
+        # The members of each group, indexed by the root of the group
+        self.Groups = dict()
+        for row_id in sorted(rows_dict):
+            root = self.find(row_id)
+            if(root not in self.Groups):
+                self.Groups[root] = list()
+            self.Groups[root].append(row_id)
+
+        # The entry that stands for each entry, and why the obsolete
+        # entries that have no replacement don't: {id: reason}
+        self.Canonical = dict()
+        self.Unresolved = dict()
+        self.Cycles = list()
+        cycle_roots = set()
+        for row_id in rows_dict:
+            if(self.Obsolete[row_id] is False):
+                self.Canonical[row_id] = row_id
+                continue
+
+            (replacement, cycle) = self.resolve(row_id)
+            if(replacement is not None):
+                self.Canonical[row_id] = replacement
+                continue
+
+            if(row_id not in self.Links):
+                self.Unresolved[row_id] = 'obsolete and no replacement is specified'
+            elif(len(self.Links[row_id]) == 0):
+                self.Unresolved[row_id] = 'obsolete and replacement ' + rows_dict[row_id][link_field] + ' not found'
+            else:
+                self.Unresolved[row_id] = 'obsolete and all replacements are obsolete'
+
+            if(cycle is True and self.find(row_id) not in cycle_roots):
+                cycle_roots.add(self.find(row_id))
+                self.Cycles.append(self.group(row_id))
+
+        # Groups in which more than one entry isn't obsolete
+        self.Conflicts = list()
+        for members in self.Groups.values():
+            if(len([member for member in members if self.Obsolete[member] is False]) > 1):
+                self.Conflicts.append(list(members))
+
+    def find(self, row_id):
+        root = row_id
+        while(self.Parents[root] != root):
+            root = self.Parents[root]
+
+        # Path compression
+        while(self.Parents[row_id] != root):
+            (self.Parents[row_id], row_id) = (root, self.Parents[row_id])
+        return root
+
+    def union(self, first, second):
+        first = self.find(first)
+        second = self.find(second)
+        if(first == second):
+            return
+        if(self.Sizes[first] < self.Sizes[second]):
+            (first, second) = (second, first)
+        self.Parents[second] = first
+        self.Sizes[first] += self.Sizes[second]
+
+    def resolve(self, row_id):
+        # The first entry that isn't obsolete, searching the links breadth
+        # first in the order in which they're listed, so that an entry
+        # linked directly is preferred as it is in TemplateHelper. Also
+        # returns whether the search led back to the entry itself
+        queue = [row_id]
+        visited = {row_id}
+        cycle = False
+        for entry in queue:
+            for link in self.Links.get(entry, []):
+                if(self.Obsolete[link] is False):
+                    return (link, cycle)
+                if(link == row_id):
+                    cycle = True
+                if(link not in visited):
+                    visited.add(link)
+                    queue.append(link)
+        return (None, cycle)
+
+    def canonical(self, row_id):
+        """
+        @param row_id: ModelSEED identifier, i.e. cpd00001
+        @return: the identifier itself if it isn't obsolete, otherwise its
+        replacement, or None if there isn't one or the identifier is unknown
+        """
+        return self.Canonical.get(row_id)
+
+    def reason(self, row_id):
+        """
+        @return: why the obsolete entry has no replacement, or None if it has
+        """
+        return self.Unresolved.get(row_id)
+
+    def links(self, row_id):
+        """
+        @return: list of the entries linked to the entry that exist
+        """
+        return list(self.Links.get(row_id, []))
+
+    def group(self, row_id):
+        """
+        @return: sorted list of the entries linked to the entry, directly or
+        through other entries, including the entry itself
+        """
+        return list(self.Groups[self.find(row_id)])
+
+    def groups(self):
+        """
+        @return: list of the groups of more than one entry, each sorted
+        """
+        return [list(members) for members in self.Groups.values() if len(members) > 1]
+
+    def diagnostics(self):
+        """
+        @return: dictionary of the 'dangling' links, as (id, link) tuples,
+        the 'unresolved' obsolete entries and why, the groups with 'cycles'
+        of obsolete entries that have no replacement, and the groups with
+        more than one entry that isn't obsolete ('conflicts')
+        """
+        return {'dangling': list(self.Dangling),
+                'unresolved': dict(self.Unresolved),
+                'cycles': [list(members) for members in self.Cycles],
+                'conflicts': [list(members) for members in self.Conflicts]}
@@ -1,9 +1,22 @@
 import re
 import os
-import json
 from csv import DictReader
+from csv import reader as csv_reader
+from concurrent.futures import ThreadPoolExecutor
+from .Snapshots import Snapshot
+from .AliasIndex import AliasIndex
+from .AliasLookup import AliasLookup
+from .CanonicalMap import CanonicalMap
+from .NameIndex import NameIndex, NAME_INDEX_VERSION
+from .StructureIndex import StructureIndex, STRUCTURE_INDEX_VERSION
+from . import Writers
+from . import Formulas
 
 class Compounds:
+    # Compounds most recently loaded in this process, by file, so that
+    # Reactions() can share them instead of parsing the file again
+    Shared_Compounds = dict()
+
     def __init__(self, biochem_root='../../../Biochemistry/',
                  cpds_file='compounds.tsv'):
 
@@ -16,40 +29,108 @@ class Compounds:
         reader = DictReader(open(self.CpdsFile), dialect='excel-tab')
         self.Headers = reader.fieldnames
 
-    def loadCompounds(self):
+    def loadCompounds(self, use_snapshot=True):
+        # Parsing the whole file is slow, so the parsed rows are kept in a
+        # snapshot next to the file and re-used for as long as its unchanged
+        snapshot = Snapshot(self.CpdsFile, 'rows')
+        if(use_snapshot is True):
+            cpds_dict = snapshot.load()
+            if(cpds_dict is not None):
+                self.shareCompounds(cpds_dict)
+                return cpds_dict
+
         reader = DictReader(open(self.CpdsFile), dialect='excel-tab')
+        cpds_dict = dict()
+        for line in reader:
+            cpds_dict[line['id']] = self.parseCompound(line)
+
+        if(use_snapshot is True):
+            snapshot.save(cpds_dict)
+
+        self.shareCompounds(cpds_dict)
+        return cpds_dict
+
+    def shareCompounds(self, cpds_dict):
+        Compounds.Shared_Compounds[os.path.realpath(self.CpdsFile)] = cpds_dict
+
+    def sharedCompounds(self):
+        # If no script has loaded the compounds yet, they're read on demand
+        cpds_file = os.path.realpath(self.CpdsFile)
+        if(cpds_file not in Compounds.Shared_Compounds):
+            from .LazyTables import LazyTable
+            Compounds.Shared_Compounds[cpds_file] = LazyTable(self.CpdsFile, self.parseCompound)
+        return Compounds.Shared_Compounds[cpds_file]
+
+    @staticmethod
+    def parseCompound(line):
         type_mapping = {"is_core": int, "is_obsolete": int, "is_cofactor": int, "charge": int,
                         "mass": float, "deltag": float, "deltagerr": float}
         lists = ["aliases","notes"]
         dicts = []
 
-        cpds_dict = dict()
-        for line in reader:
-            for list_type in lists:
-                if(line[list_type] != "null"):
-                    line[list_type]=line[list_type].split("|")
-            for dict_type in dicts:
-                if(line[dict_type] != "null"):
-                    entries = line[dict_type].split('|')
-                    line[dict_type]=dict()
-                    for entry in entries:
-                        (type,list) = entry.split(':')
-                        line[dict_type][type]=list
-            for heading, target_type in type_mapping.items():
-                try:
-                    line[heading] = target_type(line[heading])
-                except ValueError:  # Generally caused by "null" strings
-                    line[heading] = None
-            cpds_dict[line['id']] = line
-
-        return cpds_dict
+        for list_type in lists:
+            if(line[list_type] != "null"):
+                line[list_type]=line[list_type].split("|")
+        for dict_type in dicts:
+            if(line[dict_type] != "null"):
+                entries = line[dict_type].split('|')
+                line[dict_type]=dict()
+                for entry in entries:
+                    (type,list) = entry.split(':')
+                    line[dict_type][type]=list
+        for heading, target_type in type_mapping.items():
+            try:
+                line[heading] = target_type(line[heading])
+            except ValueError:  # Generally caused by "null" strings
+                line[heading] = None
+
+        return line
+
+    def canonicalMap(self, cpds_dict=None):
+        # The replacement of every obsolete compound is resolved once, for the
+        # compounds loaded by the script, or those in the file if none are given
+        if(cpds_dict is None):
+            cpds_dict = self.loadCompounds()
+        return CanonicalMap(cpds_dict, 'linked_compound')
+
+    def aliasIndex(self):
+        # The alias and name files are parsed once per process
+        return AliasIndex.sharedIndex(self.AliasFile, self.NameFile, "cpd")
+
+    def aliasLookup(self):
+        # For resolving a few aliases without parsing the alias file
+        return AliasLookup.sharedLookup(self.AliasFile, "cpd")
 
     def loadMSAliases(self,sources_array=[]):
         if(len(sources_array)==0):
             sources_array.append("All")
 
+        alias_index = self.aliasIndex()
+        if("All" in sources_array):
+            return AliasIndex.copyNestedLists(alias_index.msAliases())
+
+        aliases_dict = dict()
+        for (msid, alias, source_field, sources) in alias_index.aliasRows():
+            for source in sources:
+                if(source not in sources_array):
+                    continue
+
+                if(msid not in aliases_dict):
+                   aliases_dict[msid]=dict()
+
+                if(source not in aliases_dict[msid]):
+                    aliases_dict[msid][source]=list()
+
+                aliases_dict[msid][source].append(alias)
+
+        return aliases_dict
+
+    def readMSAliases(self, aliases_file, sources_array):
+        if(len(sources_array)==0):
+            sources_array.append("All")
+
         aliases_dict = dict()
-        reader = DictReader(open(self.AliasFile), dialect = 'excel-tab')
+        reader = DictReader(aliases_file, dialect = 'excel-tab')
         for line in reader:
             if("cpd" not in line['ModelSEED ID']):
                 continue
@@ -70,26 +151,32 @@ class Compounds:
         return aliases_dict
 
     def loadSourceAliases(self):
-        aliases_dict = dict()
-        reader = DictReader(open(self.AliasFile), dialect = 'excel-tab')
-        for line in reader:
-            if("cpd" not in line['ModelSEED ID']):
-                continue
+        return AliasIndex.copyNestedLists(self.aliasIndex().sourceAliases())
 
-            for source in line['Source'].split('|'):
-                if(source not in aliases_dict):
-                    aliases_dict[source]=dict()
+    def loadNames(self):
+        return AliasIndex.copyLists(self.aliasIndex().msNames())
 
-                if(line['External ID'] not in aliases_dict[source]):
-                    aliases_dict[source][line['External ID']]=list()
+    def loadNameIDs(self):
+        return AliasIndex.copyLists(self.aliasIndex().nameIDs())
 
-                aliases_dict[source][line['External ID']].append(line['ModelSEED ID'])
+    def nameIndex(self, use_snapshot=True):
+        # The searchname of every name, and the n-grams used to find similar
+        # names, are kept in a snapshot next to the names file
+        snapshot = Snapshot(self.NameFile, 'searchnames')
+        if(use_snapshot is True):
+            index_data = snapshot.load()
+            if(index_data is not None and index_data.get('version') == NAME_INDEX_VERSION):
+                return NameIndex(index_data)
 
-        return aliases_dict
+        index_data = NameIndex.build(self.loadNames(), self.searchname)
+        if(use_snapshot is True):
+            snapshot.save(index_data)
 
-    def loadNames(self):
+        return NameIndex(index_data)
+
+    def readNames(self, names_file):
         names_dict = dict()
-        reader = DictReader(open(self.NameFile), dialect = 'excel-tab')
+        reader = DictReader(names_file, dialect = 'excel-tab')
         for line in reader:
             if("cpd" not in line['ModelSEED ID']):
                 continue
@@ -101,7 +188,7 @@ class Compounds:
 
         return names_dict
 
-    def loadStructures(self,sources_array=[],db_array=[],unique=True):
+    def loadStructures(self,sources_array=[],db_array=[],unique=True,threads=None):
         if(len(sources_array)==0):
             sources_array=["SMILE","InChIKey","InChI"]
 
@@ -135,6 +222,9 @@ class Compounds:
 
             return structures_dict
 
+        if(threads is not None):
+            return self.loadStructureSets(sources_array,db_array,threads)
+
         for struct_type in sources_array:
             structures_dict[struct_type]=dict()
             for db in db_array:
@@ -157,6 +247,99 @@ class Compounds:
 
         return structures_dict
 
+    def structureFiles(self,sources_array,db_array):
+        # The structure files of each database, in the order they're loaded
+        for struct_type in sources_array:
+            for db in db_array:
+                for struct_stage in ["Charged","Original"]:
+                    struct_file = self.StructRoot+db+"/"+struct_type+"_"+struct_stage+"Strings.txt"
+                    if(os.path.isfile(struct_file)==False):
+                        continue
+                    yield (struct_type,db,struct_stage,struct_file)
+
+    @staticmethod
+    def readStructureFile(struct_file):
+        # The same as reading the file with DictReader, but faster
+        structures_dict = dict()
+        with open(struct_file) as fh:
+            for row in csv_reader(fh, dialect = "excel-tab"):
+                if(len(row)==0):
+                    continue
+                structure = row[1] if len(row)>1 else None
+                if(row[0] not in structures_dict):
+                    structures_dict[row[0]]={structure}
+                else:
+                    structures_dict[row[0]].add(structure)
+        return structures_dict
+
+    def loadStructureSets(self,sources_array,db_array,threads):
+        # Same as loadStructures() except that the files are read at the same
+        # time and the structures of each stage are a set, not a dictionary
+        struct_files = list(self.structureFiles(sources_array,db_array))
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            files_structures = list(executor.map(self.readStructureFile,
+                                                 [struct_file for (_,_,_,struct_file) in struct_files]))
+
+        # Merged in the same order as loadStructures(), so that the
+        # identifiers are in the same order too
+        structures_dict = dict()
+        for struct_type in sources_array:
+            structures_dict[struct_type]=dict()
+        for ((struct_type,db,struct_stage,struct_file),file_structures) in zip(struct_files,files_structures):
+            type_dict = structures_dict[struct_type]
+            for (external_id,structures) in file_structures.items():
+                if(external_id not in type_dict):
+                    type_dict[external_id]={struct_stage:structures}
+                elif(struct_stage not in type_dict[external_id]):
+                    type_dict[external_id][struct_stage]=structures
+                else:
+                    type_dict[external_id][struct_stage].update(structures)
+
+        return structures_dict
+
+    def iterStructures(self,sources_array=[],db_array=[]):
+        # Yields (type, db, stage, external id, structure) for every line of
+        # the structure files, in the same order as loadStructures() reads them
+        if(len(sources_array)==0):
+            sources_array=["SMILE","InChIKey","InChI"]
+
+        if(len(db_array)==0):
+            db_array=["KEGG","MetaCyc"]
+
+        for (struct_type,db,struct_stage,struct_file) in self.structureFiles(sources_array,db_array):
+            with open(struct_file) as fh:
+                reader = DictReader(fh, dialect = "excel-tab", fieldnames = ['ID','Structure','Name'])
+                for line in reader:
+                    yield (struct_type,db,struct_stage,line['ID'],line['Structure'])
+
+    def structureIndex(self, db_array=["ModelSEED"]):
+        # The index of each structure file is kept in a snapshot next to it
+        # i.e. Biochemistry/Structures/.Unique_ModelSEED_Structures.txt.structures.pickle
+        struct_files = list()
+        for db in db_array:
+            if(db == "ModelSEED"):
+                struct_files.append((self.StructRoot+"Unique_ModelSEED_Structures.txt",
+                                     ['ID','Source','Alias','Formula','Charge','Structure'], None))
+                continue
+
+            for struct_type in ["SMILE","InChIKey","InChI"]:
+                for struct_stage in ["Charged","Original"]:
+                    struct_file = self.StructRoot+db+"/"+struct_type+"_"+struct_stage+"Strings.txt"
+                    if(os.path.isfile(struct_file)==False):
+                        continue
+                    struct_files.append((struct_file, ['ID','Structure','Name'], struct_type))
+
+        index_data_list = list()
+        for (struct_file, fields_array, struct_type) in struct_files:
+            snapshot = Snapshot(struct_file, 'structures')
+            index_data = snapshot.load()
+            if(index_data is None or index_data.get('version') != STRUCTURE_INDEX_VERSION):
+                index_data = StructureIndex.build(struct_file, fields_array, struct_type)
+                snapshot.save(index_data)
+            index_data_list.append(index_data)
+
+        return StructureIndex(index_data_list)
+
     @staticmethod
     def searchname(name):
         searchname = name.lower()
@@ -184,66 +367,12 @@ class Compounds:
 
     @staticmethod
     def parseFormula(formula):
-        if (formula.strip() in {None, "", "noFormula", "null"}):
-            return {}
-
-        atoms = re.findall("\D[a-z]?\d*", formula)
-
-        atoms_dict = dict()
-        for atom in atoms:
-            match = re.match("(\D[a-z]?)(\d*)", atom)
-            atoms_dict[match.group(1)] = match.group(2)
-
-            # Default empty string to 1
-            if (atoms_dict[match.group(1)] == ""):
-                atoms_dict[match.group(1)] = 1
-            else:
-                atoms_dict[match.group(1)] = int(atoms_dict[match.group(1)])
-
-        return atoms_dict
+        # Parsed formulas are cached in Formulas, a copy is returned
+        return Formulas.parse(formula)
 
     @staticmethod
     def mergeFormula(formula):
-        formula = formula.strip()
-        Notes = ""
-        if (formula is None or formula == "" or "null" in formula or len(
-                re.findall("no[Ff]ormula", formula)) > 0):
-            return ("null", Notes)
-
-        if (len(re.findall("(\)[nx])", formula)) > 0):
-            Notes = "PO"
-
-        global_atoms_dict = dict()
-        for subformula in re.findall("\(?([\w\s\.]+)\)?([nx*]?)?(\d?)",
-                                     formula):
-            # The regex works, but returns empty hits for either beginning or end of string
-            # The regex is trying to find formulas outside and within parentheses eg: Mg(Al,Fe)Si4O10(OH).4H2O
-            subformula_string = subformula[0].strip()
-            if (subformula_string != ''):
-                bracketed_multiplier = 1
-                # Redundant but worth being explicit: generic polymeric formulas assumed to be 1 unit
-                if (len(re.findall("[nx*]", subformula[1])) == 0 and
-                            subformula[2] != ""):
-                    bracketed_multiplier = int(subformula[2])
-
-                # Avoid empty strings
-                for fragment in (x for x in subformula_string.split(".") if x):
-                    fragment = fragment.strip()
-                    fragment_multiplier = 1
-                    # Fragments can have a multiplier at the beginning of the string, such as 4H2O
-                    if (len(re.findall("^(\d+)(.*)$", fragment))):
-                        (fragment_multiplier, fragment) = \
-                        re.findall("^(\d+)(.*)$", fragment)[0]
-                        fragment_multiplier = int(fragment_multiplier)
-
-                    fragment_atoms_dict = Compounds.parseFormula(fragment)
-                    for atom in fragment_atoms_dict:
-                        if atom not in global_atoms_dict.keys():
-                            global_atoms_dict[atom] = 0
-                        global_atoms_dict[atom] += fragment_atoms_dict[atom] \
-                            * bracketed_multiplier * fragment_multiplier
-
-        return (Compounds.buildFormula(global_atoms_dict), Notes)
+        return Formulas.merge(formula)
 
     @staticmethod
     def buildFormula(Atoms_Dict):
@@ -270,59 +399,51 @@ class Compounds:
 
         # Print to TXT
         names_file = open(names_root + ".txt", 'w')
+        self.writeNames(names_dict, names_file)
+        names_file.close()
+
+    def writeNames(self, names_dict, names_file):
         names_file.write("\t".join(("ModelSEED ID","External ID","Source")) + "\n")
         for cpd in sorted(names_dict.keys()):
             for name in sorted(names_dict[cpd]):
                 names_file.write("\t".join((cpd,name,'name')) + "\n")
-        names_file.close()
 
     def saveAliases(self, alias_dict):
         alias_root = os.path.splitext(self.AliasFile)[0]
 
         # Print to TXT
         alias_file = open(alias_root + ".txt", 'w')
+        self.writeAliases(alias_dict, alias_file)
+        alias_file.close()
+
+    def writeAliases(self, alias_dict, alias_file):
         alias_file.write("\t".join(("ModelSEED ID","External ID","Source")) + "\n")
         for cpd in sorted(alias_dict.keys()):
             for source in sorted (alias_dict[cpd].keys()):
                 for alias in sorted(alias_dict[cpd][source]):
                     alias_file.write("\t".join((cpd,alias,source)) + "\n")
-        alias_file.close()
+
+    def formatCompound(self, cpd_dict):
+        values_list=list()
+        for header in self.Headers:
+            value=cpd_dict[header]
+            if(isinstance(value,list)):
+                value = "|".join(value)
+            if(isinstance(value,dict)):
+                entries = list()
+                for entry in value:
+                    entries.append(entry+':'+value[entry])
+                value = "|".join(entries)
+            values_list.append(str(value))
+        return "\t".join(values_list)
 
     def saveCompounds(self, compounds_dict):
         cpds_root = os.path.splitext(self.CpdsFile)[0]
 
-        # Print to TSV
-        cpds_file = open(cpds_root + ".tsv", 'w')
-        cpds_file.write("\t".join(self.Headers) + "\n")
+        # Print to TSV and JSON at the same time, each file is only
+        # re-written if a compound changed
+        cpds_lines = ["\t".join(self.Headers)]
         for cpd in sorted(compounds_dict.keys()):
-            values_list=list()
-            for header in self.Headers:
-                value=compounds_dict[cpd][header]
-                if(isinstance(value,list)):
-                    value = "|".join(value)
-                if(isinstance(value,dict)):
-                    entries = list()
-                    for entry in value:
-                        entries.append(entry+':'+value[entry])
-                    value = "|".join(entries)
-                values_list.append(str(value))
-            cpds_file.write("\t".join(values_list)+"\n")
-        cpds_file.close()
-
-        #Re-configure JSON
-        new_compounds_dict = list()
-        for cpd_id in sorted(compounds_dict):
-            cpd_obj = compounds_dict[cpd_id]
-            for key in cpd_obj:
-                if(isinstance(cpd_obj[key],dict)):
-                    for entry in cpd_obj[key]:
-                        if(cpd_obj[key][entry]=="null"):
-                            cpd_obj[key][entry]=None
-                if(cpd_obj[key]=="null"):
-                    cpd_obj[key]=None
-            new_compounds_dict.append(cpd_obj)
-
-        # Print to JSON
-        cpds_file = open(cpds_root + ".json", 'w', newline='\n')
-        cpds_file.write(json.dumps(new_compounds_dict, indent=4, sort_keys=True))
-        cpds_file.close()
+            cpds_lines.append(self.formatCompound(compounds_dict[cpd]))
+        Writers.writeFiles(cpds_root + ".tsv", cpds_lines,
+                           cpds_root + ".json", Writers.jsonRecords(compounds_dict), newline='\n')
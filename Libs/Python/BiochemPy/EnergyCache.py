@@ -0,0 +1,79 @@
+import os
+import pickle
+
+# Version of the cache layout, bump it whenever the records change so that
+# existing caches are started again
+ENERGY_CACHE_VERSION = 2
+
+class EnergyCache:
+    """
+    Energies retrieved for reactions, kept in a hidden file next to the
+    energies they're written to, i.e.
+    Biochemistry/Thermodynamics/eQuilibrator/.MetaNetX_Reaction_Energies.tbl.cache.pickle
+    Each result is appended and flushed as soon as it's added, so that a
+    retrieval that is stopped can carry on from where it was
+    """
+
+    def __init__(self, energies_file):
+        (energies_dir, energies_name) = os.path.split(energies_file)
+        self.CacheFile = os.path.join(energies_dir, '.' + energies_name + '.cache.pickle')
+
+        # Result of each key: {key: result}
+        self.Results = dict()
+        self.Handle = None
+        self.loadCache()
+
+    def loadCache(self):
+        # The records are read up to the first broken one, which is left by
+        # a retrieval that was stopped while writing, and the cache is cut
+        # back to the last complete record so that new records follow it
+        if(os.path.isfile(self.CacheFile) is False):
+            return
+
+        complete_size = 0
+        try:
+            with open(self.CacheFile, 'rb') as fh:
+                header = pickle.load(fh)
+                if(isinstance(header, dict) and header.get('version') == ENERGY_CACHE_VERSION):
+                    complete_size = fh.tell()
+
+                    while(True):
+                        (key, result) = pickle.load(fh)
+                        self.Results[key] = result
+                        complete_size = fh.tell()
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ValueError, TypeError):
+            pass
+
+        if(complete_size == 0):
+            # A cache of another version, or without a header, is started again
+            os.remove(self.CacheFile)
+        elif(complete_size < os.path.getsize(self.CacheFile)):
+            with open(self.CacheFile, 'r+b') as fh:
+                fh.truncate(complete_size)
+
+    def get(self, key):
+        """
+        @param key: tuple that identifies the result, i.e. (equation, pH, ...)
+        @return: the result, or None if it isn't cached
+        """
+        return self.Results.get(key)
+
+    def add(self, key, result):
+        """
+        @param key: tuple that identifies the result
+        @param result: the result, which has to be picklable
+        """
+        if(self.Handle is None):
+            new_file = not os.path.isfile(self.CacheFile)
+            self.Handle = open(self.CacheFile, 'ab')
+            if(new_file is True):
+                pickle.dump({'version': ENERGY_CACHE_VERSION}, self.Handle, protocol=pickle.HIGHEST_PROTOCOL)
+
+        pickle.dump((key, result), self.Handle, protocol=pickle.HIGHEST_PROTOCOL)
+        self.Handle.flush()
+        self.Results[key] = result
+
+    def close(self):
+        if(self.Handle is not None):
+            self.Handle.close()
+            self.Handle = None
@@ -0,0 +1,149 @@
+import re
+from functools import lru_cache
+
+# The same formulas are parsed over and over (i.e. once per reaction
+# a compound appears in) so the results are cached, up to a limit
+Formula_Cache_Size = 65536
+
+Atom_Pattern = re.compile(r"(\D[a-z]?)(\d*)")
+Multiplier_Pattern = re.compile(r"^(\d+)(.*)$")
+Polymer_Pattern = re.compile(r"(\)[nx])")
+NoFormula_Pattern = re.compile(r"no[Ff]ormula")
+Subformula_Pattern = re.compile(r"\(?([\w\s\.]+)\)?([nx*]?)?(\d?)")
+
+# Fixed order of the elements in a formula vector, the periodic table
+# followed by 'R', which is used for generic groups
+Elements = ('H', 'He',
+            'Li', 'Be', 'B', 'C', 'N', 'O', 'F', 'Ne',
+            'Na', 'Mg', 'Al', 'Si', 'P', 'S', 'Cl', 'Ar',
+            'K', 'Ca', 'Sc', 'Ti', 'V', 'Cr', 'Mn', 'Fe', 'Co', 'Ni', 'Cu', 'Zn',
+            'Ga', 'Ge', 'As', 'Se', 'Br', 'Kr',
+            'Rb', 'Sr', 'Y', 'Zr', 'Nb', 'Mo', 'Tc', 'Ru', 'Rh', 'Pd', 'Ag', 'Cd',
+            'In', 'Sn', 'Sb', 'Te', 'I', 'Xe',
+            'Cs', 'Ba', 'La', 'Ce', 'Pr', 'Nd', 'Pm', 'Sm', 'Eu', 'Gd', 'Tb',
+            'Dy', 'Ho', 'Er', 'Tm', 'Yb', 'Lu', 'Hf', 'Ta', 'W', 'Re', 'Os',
+            'Ir', 'Pt', 'Au', 'Hg', 'Tl', 'Pb', 'Bi', 'Po', 'At', 'Rn',
+            'Fr', 'Ra', 'Ac', 'Th', 'Pa', 'U', 'Np', 'Pu', 'Am', 'Cm', 'Bk',
+            'Cf', 'Es', 'Fm', 'Md', 'No', 'Lr', 'Rf', 'Db', 'Sg', 'Bh', 'Hs',
+            'Mt', 'Ds', 'Rg', 'Cn', 'Nh', 'Fl', 'Mc', 'Lv', 'Ts', 'Og',
+            'R')
+Element_Indices = dict((element, index) for index, element in enumerate(Elements))
+
+@lru_cache(maxsize=Formula_Cache_Size)
+def _parse(formula):
+    if (formula.strip() in {None, "", "noFormula", "null"}):
+        return ()
+
+    atoms_dict = dict()
+    for (atom, count) in Atom_Pattern.findall(formula):
+        # Default empty string to 1
+        atoms_dict[atom] = int(count) if count != "" else 1
+
+    return tuple(atoms_dict.items())
+
+def parse(formula):
+    """
+    @param formula: formula string, i.e. C6H12O6
+    @return: dictionary of atoms where key is the element and value is the count,
+    the dictionary is a copy that the caller is free to change
+    """
+    return dict(_parse(formula))
+
+@lru_cache(maxsize=Formula_Cache_Size)
+def merge(formula):
+    """
+    @param formula: formula string that may contain components and brackets,
+    i.e. Mg(Al,Fe)Si4O10(OH).4H2O
+    @return: merged formula string and notes ("PO" for polymers)
+    """
+    formula = formula.strip()
+    Notes = ""
+    if (formula is None or formula == "" or "null" in formula or
+            NoFormula_Pattern.search(formula) is not None):
+        return ("null", Notes)
+
+    if (Polymer_Pattern.search(formula) is not None):
+        Notes = "PO"
+
+    global_atoms_dict = dict()
+    for subformula in Subformula_Pattern.findall(formula):
+        # The regex works, but returns empty hits for either beginning or end of string
+        # The regex is trying to find formulas outside and within parentheses eg: Mg(Al,Fe)Si4O10(OH).4H2O
+        subformula_string = subformula[0].strip()
+        if (subformula_string != ''):
+            bracketed_multiplier = 1
+            # Redundant but worth being explicit: generic polymeric formulas assumed to be 1 unit
+            if ("n" not in subformula[1] and "x" not in subformula[1] and
+                    "*" not in subformula[1] and subformula[2] != ""):
+                bracketed_multiplier = int(subformula[2])
+
+            # Avoid empty strings
+            for fragment in (x for x in subformula_string.split(".") if x):
+                fragment = fragment.strip()
+                fragment_multiplier = 1
+                # Fragments can have a multiplier at the beginning of the string, such as 4H2O
+                match = Multiplier_Pattern.match(fragment)
+                if (match is not None):
+                    (fragment_multiplier, fragment) = match.groups()
+                    fragment_multiplier = int(fragment_multiplier)
+
+                for (atom, count) in _parse(fragment):
+                    if atom not in global_atoms_dict:
+                        global_atoms_dict[atom] = 0
+                    global_atoms_dict[atom] += count \
+                        * bracketed_multiplier * fragment_multiplier
+
+    return (build(global_atoms_dict), Notes)
+
+def build(atoms_dict):
+    """
+    @param atoms_dict: dictionary of atoms where key is the element and value is the count
+    @return: formula string with the atoms in Hill order
+    """
+    formula = ""
+    for atom in hill_sorted(atoms_dict.keys()):
+        if (atoms_dict[atom] == 1):
+            formula += atom
+        else:
+            formula += atom + str(atoms_dict[atom])
+    return formula
+
+def hill_sorted(atoms):
+    atoms = set(atoms)
+    if ("C" in atoms):
+        atoms.remove("C")
+        yield "C"
+    if ("H" in atoms):
+        atoms.remove("H")
+        yield "H"
+    for atom in sorted(atoms):
+        yield atom
+
+@lru_cache(maxsize=Formula_Cache_Size)
+def _vector(formula):
+    import numpy
+
+    formula_vector = numpy.zeros(len(Elements), dtype=numpy.int64)
+    for (atom, count) in _parse(formula):
+        if (atom not in Element_Indices):
+            raise ValueError("Unknown element '" + atom + "' in formula " + formula)
+        formula_vector[Element_Indices[atom]] = count
+
+    formula_vector.flags.writeable = False
+    return formula_vector
+
+def vector(formula):
+    """
+    @param formula: formula string, i.e. C6H12O6
+    @return: NumPy integer array of the count of each element, in the order
+    given by Elements, so that formulas can be added and subtracted directly
+    """
+    return _vector(formula).copy()
+
+def unvector(formula_vector):
+    """
+    @param formula_vector: NumPy array as returned by vector()
+    @return: dictionary of atoms, without the elements whose count is zero
+    """
+    return dict((Elements[index], int(formula_vector[index]))
+                for index in formula_vector.nonzero()[0])
@@ -0,0 +1,118 @@
+import os
+import csv
+from collections.abc import Mapping
+from .Snapshots import Snapshot
+from .Compounds import Compounds
+from .Reactions import Reactions
+
+def parseLine(headers, line):
+    fields = next(csv.reader([line], dialect='excel-tab'))
+
+    # Same handling of short and long rows as DictReader
+    row = dict(zip(headers, fields))
+    if(len(fields) > len(headers)):
+        row[None] = fields[len(headers):]
+    for header in headers[len(fields):]:
+        row[header] = None
+
+    return row
+
+class LazyTable(Mapping):
+    def __init__(self, table_file, parse_row):
+        self.TableFile = table_file
+        self.ParseRow = parse_row
+        self.loadIndex()
+
+        # Rows are only parsed, and kept, once they are accessed
+        self.Rows = dict()
+        self.Handle = None
+
+    def loadIndex(self):
+        # The byte offset of every row is kept in a snapshot next to the file
+        # so that it only has to be re-built when the file changes
+        snapshot = Snapshot(self.TableFile, 'offsets')
+        index = snapshot.load()
+        if(index is None):
+            index = self.buildIndex()
+            snapshot.save(index)
+        (self.Headers, self.Offsets) = index
+        self.Signature = (snapshot.Size, snapshot.MTime)
+
+    def buildIndex(self):
+        offsets = dict()
+        with open(self.TableFile, 'rb') as fh:
+            header = fh.readline()
+            headers = next(csv.reader([header.decode('utf-8')], dialect='excel-tab'))
+
+            offset = len(header)
+            for line in fh:
+                # DictReader skips blank lines too
+                if(line.strip() != b''):
+                    row_id = line.split(b'\t', 1)[0].decode('utf-8')
+                    offsets[row_id] = offset
+                offset += len(line)
+
+        return (headers, offsets)
+
+    def checkIndex(self):
+        # The file may have been re-written since it was indexed
+        # (i.e. by saveCompounds()), in which case the offsets, and
+        # the rows already read, are stale
+        stat = os.stat(self.TableFile)
+        if((stat.st_size, stat.st_mtime_ns) != self.Signature):
+            self.close()
+            self.loadIndex()
+            self.Rows.clear()
+
+    def readRow(self, row_id):
+        if(self.Handle is None):
+            self.Handle = open(self.TableFile, 'rb')
+
+        self.Handle.seek(self.Offsets[row_id])
+        line = self.Handle.readline().decode('utf-8')
+        return self.ParseRow(parseLine(self.Headers, line))
+
+    def __getitem__(self, row_id):
+        self.checkIndex()
+        if(row_id not in self.Rows):
+            if(row_id not in self.Offsets):
+                raise KeyError(row_id)
+            self.Rows[row_id] = self.readRow(row_id)
+        return self.Rows[row_id]
+
+    def __contains__(self, row_id):
+        self.checkIndex()
+        return row_id in self.Offsets
+
+    def __iter__(self):
+        self.checkIndex()
+        return iter(self.Offsets)
+
+    def __len__(self):
+        self.checkIndex()
+        return len(self.Offsets)
+
+    def close(self):
+        if(self.Handle is not None):
+            self.Handle.close()
+            self.Handle = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+class LazyCompounds(LazyTable):
+    def __init__(self, biochem_root='../../../Biochemistry/',
+                 cpds_file='compounds.tsv'):
+
+        biochem_root = os.path.dirname(__file__)+'/'+biochem_root
+        super().__init__(biochem_root + cpds_file, Compounds.parseCompound)
+
+class LazyReactions(LazyTable):
+    def __init__(self, biochem_root='../../../Biochemistry/',
+                 rxns_file='reactions.tsv'):
+
+        biochem_root = os.path.dirname(__file__)+'/'+biochem_root
+        super().__init__(biochem_root + rxns_file, Reactions.parseReaction)
@@ -0,0 +1,158 @@
+import heapq
+
+# Version of the index layout, bump it whenever the way names are
+# normalised or indexed changes, so that persisted indexes are rebuilt
+NAME_INDEX_VERSION = 1
+
+# Length of the character n-grams used for approximate matching
+Gram_Size = 3
+
+def grams(searchname):
+    """
+    @param searchname: name as returned by Compounds.searchname()
+    @return: set of the character n-grams of the name, padded at both ends
+    so that short names, and the start and end of names, still count
+    """
+    padded = "^" + searchname + "$"
+    if(len(padded) <= Gram_Size):
+        return {padded}
+    return set(padded[index:index + Gram_Size] for index in range(len(padded) - Gram_Size + 1))
+
+def editDistance(first, second):
+    """
+    @return: Levenshtein distance between the two strings
+    """
+    if(len(first) < len(second)):
+        (first, second) = (second, first)
+
+    previous = list(range(len(second) + 1))
+    for (first_index, first_char) in enumerate(first, 1):
+        current = [first_index]
+        for (second_index, second_char) in enumerate(second, 1):
+            current.append(min(previous[second_index] + 1,
+                               current[second_index - 1] + 1,
+                               previous[second_index - 1] + (first_char != second_char)))
+        previous = current
+    return previous[-1]
+
+class NameIndex:
+    """
+    Compound names indexed by their searchname, along with an inverted
+    index of the n-grams of each searchname for approximate matching.
+    Use Compounds.nameIndex(), which keeps the index in a snapshot of the
+    names file, rather than building it directly
+    """
+
+    def __init__(self, index_data):
+        # The ModelSEED IDs that share each searchname, sorted:
+        # {searchname: [msids]}
+        self.MSIDs = index_data['msids']
+
+        # Every searchname, and the number of n-grams in each
+        self.SearchNames = index_data['searchnames']
+        self.GramCounts = index_data['gram_counts']
+
+        # Position of the searchnames that have each n-gram: {gram: [index]}
+        self.Grams = index_data['grams']
+
+    @staticmethod
+    def build(names_dict, searchname):
+        """
+        @param names_dict: dictionary of names, as returned by Compounds.loadNames()
+        @param searchname: function that normalises a name, i.e. Compounds.searchname
+        @return: data of the index, which can be pickled
+        """
+        msids_dict = dict()
+        for msid in names_dict:
+            for name in names_dict[msid]:
+                name_searchname = searchname(name)
+                if(name_searchname not in msids_dict):
+                    msids_dict[name_searchname] = set()
+                msids_dict[name_searchname].add(msid)
+
+        searchnames = sorted(msids_dict)
+        gram_counts = list()
+        grams_dict = dict()
+        for (index, name_searchname) in enumerate(searchnames):
+            name_grams = grams(name_searchname)
+            gram_counts.append(len(name_grams))
+            for gram in name_grams:
+                if(gram not in grams_dict):
+                    grams_dict[gram] = list()
+                grams_dict[gram].append(index)
+
+        return {'version': NAME_INDEX_VERSION,
+                'msids': dict((key, sorted(value)) for key, value in msids_dict.items()),
+                'searchnames': searchnames,
+                'gram_counts': gram_counts,
+                'grams': grams_dict}
+
+    def exactMatch(self, searchname):
+        """
+        @param searchname: name as returned by Compounds.searchname()
+        @return: sorted list of the ModelSEED IDs with a name that has the
+        same searchname, the first of which is the one the curation scripts use
+        """
+        return list(self.MSIDs.get(searchname, []))
+
+    def approximateMatch(self, searchname, top_k=5, min_score=0.5):
+        """
+        @param searchname: name as returned by Compounds.searchname()
+        @param top_k: maximum number of candidates
+        @param min_score: minimum Jaccard similarity of the n-grams of the names
+        @return: list of the best candidates, best first, as tuples of
+        (searchname, msids, jaccard similarity, edit distance)
+        """
+        query_grams = grams(searchname)
+        query_count = len(query_grams)
+
+        # Only names that share enough n-grams can reach the score, as the
+        # similarity is at most shared / query_count and query_count / count
+        min_shared = min_score * query_count
+        max_count = query_count / min_score if min_score > 0 else float('inf')
+
+        shared_counts = dict()
+        for gram in query_grams:
+            for index in self.Grams.get(gram, []):
+                shared_counts[index] = shared_counts.get(index, 0) + 1
+
+        candidates = list()
+        for (index, shared) in shared_counts.items():
+            if(shared < min_shared or self.GramCounts[index] > max_count):
+                continue
+
+            score = shared / (query_count + self.GramCounts[index] - shared)
+            if(score >= min_score):
+                candidates.append((score, self.SearchNames[index]))
+
+        # The edit distance is slow, so it's only used to order the
+        # candidates that have the same similarity, which includes every
+        # candidate that ties with the last of the best top_k
+        if(top_k <= 0 or len(candidates) == 0):
+            return list()
+        cutoff = heapq.nlargest(top_k, [score for (score, candidate) in candidates])[-1]
+        matches = list()
+        for (score, candidate) in candidates:
+            if(score >= cutoff):
+                matches.append((candidate, list(self.MSIDs[candidate]), score, editDistance(searchname, candidate)))
+        matches.sort(key=lambda match: (-match[2], match[3], match[0]))
+        del matches[top_k:]
+        return matches
+
+    def matchNames(self, searchnames, top_k=5, min_score=0.5):
+        """
+        @param searchnames: list of names as returned by Compounds.searchname()
+        @return: dictionary of the candidates for each searchname, exact
+        matches are returned on their own, with a score of 1 and a distance of 0
+        """
+        matches_dict = dict()
+        for searchname in searchnames:
+            if(searchname in matches_dict):
+                continue
+
+            if(searchname in self.MSIDs):
+                matches_dict[searchname] = [(searchname, self.exactMatch(searchname), 1.0, 0)]
+            else:
+                matches_dict[searchname] = self.approximateMatch(searchname, top_k, min_score)
+
+        return matches_dict
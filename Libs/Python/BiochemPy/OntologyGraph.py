@@ -0,0 +1,240 @@
+from csv import DictReader
+
+class OntologyGraph:
+    """
+    Compound ontology, with edges from a generic parent compound to a more
+    specific child compound, i.e. Scripts/Ontology/Ontology_Donors.tsv.
+    The ancestors and descendants of every compound are computed in a single
+    pass over the compounds in topological order, and kept as bitsets of the
+    position of each compound. Compounds in a cycle are their own ancestors
+    and descendants, as they would be by following the edges
+    """
+
+    def __init__(self, edges=[]):
+        """
+        @param edges: list of (parent, child) tuples
+        """
+        self.Nodes = list()
+        self.Index = dict()
+        self.Parents = list()
+        self.Children = list()
+        for (parent, child) in edges:
+            self.addEdge(parent, child)
+
+        self.Components = None
+        self.Ancestor_Bits = None
+        self.Descendant_Bits = None
+
+    @classmethod
+    def load(cls, ontology_file):
+        """
+        @param ontology_file: file with a 'from' column, the parent, and a 'to'
+        column, the child
+        """
+        reader = DictReader(open(ontology_file), dialect='excel-tab')
+        return cls([(edge['from'], edge['to']) for edge in reader])
+
+    def addNode(self, node):
+        if(node not in self.Index):
+            self.Index[node] = len(self.Nodes)
+            self.Nodes.append(node)
+            self.Parents.append(list())
+            self.Children.append(list())
+        return self.Index[node]
+
+    def addEdge(self, parent, child):
+        parent_index = self.addNode(parent)
+        child_index = self.addNode(child)
+        if(parent_index not in self.Parents[child_index]):
+            self.Parents[child_index].append(parent_index)
+            self.Children[parent_index].append(child_index)
+
+        # Anything computed has to be computed again
+        self.Components = None
+        self.Ancestor_Bits = None
+        self.Descendant_Bits = None
+
+    def findComponents(self):
+        # Tarjan's strongly connected components, without recursion, so that
+        # deep ontologies don't reach the recursion limit. The components are
+        # found children first, so they're reversed to list parents first
+        node_order = [None] * len(self.Nodes)
+        lowest = [0] * len(self.Nodes)
+        on_stack = [False] * len(self.Nodes)
+        stack = list()
+        components = list()
+        counter = 0
+        for root in range(len(self.Nodes)):
+            if(node_order[root] is not None):
+                continue
+
+            node_order[root] = lowest[root] = counter
+            counter += 1
+            stack.append(root)
+            on_stack[root] = True
+            work = [(root, 0)]
+            while(len(work) > 0):
+                (node, edge) = work[-1]
+                if(edge < len(self.Children[node])):
+                    work[-1] = (node, edge + 1)
+                    child = self.Children[node][edge]
+                    if(node_order[child] is None):
+                        node_order[child] = lowest[child] = counter
+                        counter += 1
+                        stack.append(child)
+                        on_stack[child] = True
+                        work.append((child, 0))
+                    elif(on_stack[child] is True):
+                        lowest[node] = min(lowest[node], node_order[child])
+                    continue
+
+                work.pop()
+                if(len(work) > 0):
+                    parent = work[-1][0]
+                    lowest[parent] = min(lowest[parent], lowest[node])
+
+                if(lowest[node] == node_order[node]):
+                    component = list()
+                    while(True):
+                        member = stack.pop()
+                        on_stack[member] = False
+                        component.append(member)
+                        if(member == node):
+                            break
+                    components.append(sorted(component))
+
+        components.reverse()
+        return components
+
+    def components(self):
+        if(self.Components is None):
+            self.Components = self.findComponents()
+
+            self.Component_Of = [None] * len(self.Nodes)
+            for (position, component) in enumerate(self.Components):
+                for member in component:
+                    self.Component_Of[member] = position
+
+            # Components with more than one compound, or a compound that is
+            # its own parent, are cycles
+            self.Cycles = list()
+            self.Cyclic = [False] * len(self.Components)
+            for (position, component) in enumerate(self.Components):
+                member = component[0]
+                if(len(component) > 1 or member in self.Parents[member]):
+                    self.Cyclic[position] = True
+                    self.Cycles.append([self.Nodes[member] for member in component])
+        return self.Components
+
+    def cycles(self):
+        """
+        @return: list of the compounds in each cycle
+        """
+        self.components()
+        return [list(cycle) for cycle in self.Cycles]
+
+    def iterClosures(self, ancestors=True):
+        # Yields the position of each component, and the bitset of its
+        # ancestors (or descendants), parents (or children) first. The bitset
+        # of a component is only kept until every component that needs it
+        # has been yielded, so that only the bitsets of the components still
+        # being worked through are held
+        components = self.components()
+        order = range(len(components))
+        if(ancestors is True):
+            edges = self.Parents
+        else:
+            edges = self.Children
+            order = reversed(order)
+
+        linked_components = list()
+        pending = [0] * len(components)
+        for position in range(len(components)):
+            linked = set()
+            for member in components[position]:
+                for linked_node in edges[member]:
+                    if(self.Component_Of[linked_node] != position):
+                        linked.add(self.Component_Of[linked_node])
+            linked_components.append(linked)
+            for linked_position in linked:
+                pending[linked_position] += 1
+
+        closures = dict()
+        for position in order:
+            members = 0
+            for member in components[position]:
+                members |= 1 << member
+
+            closure = 0
+            if(self.Cyclic[position] is True):
+                closure = members
+            for linked_position in linked_components[position]:
+                closure |= closures[linked_position][0] | closures[linked_position][1]
+                pending[linked_position] -= 1
+                if(pending[linked_position] == 0):
+                    del closures[linked_position]
+
+            if(pending[position] > 0):
+                closures[position] = (closure, members)
+            yield (position, closure)
+
+    def bitNodes(self, bits):
+        """
+        @return: set of the compounds in a bitset
+        """
+        nodes = set()
+        while(bits):
+            lowest_bit = bits & -bits
+            nodes.add(self.Nodes[lowest_bit.bit_length() - 1])
+            bits ^= lowest_bit
+        return nodes
+
+    def iterAncestors(self):
+        """
+        @return: yields each compound that has a parent, and the set of its
+        ancestors, parents first, holding as few bitsets as possible
+        """
+        for (position, closure) in self.iterClosures(ancestors=True):
+            if(closure == 0):
+                continue
+            ancestors = self.bitNodes(closure)
+            for member in self.Components[position]:
+                yield (self.Nodes[member], set(ancestors))
+
+    def closureBits(self, ancestors=True):
+        bits_list = [0] * len(self.Nodes)
+        for (position, closure) in self.iterClosures(ancestors):
+            for member in self.Components[position]:
+                bits_list[member] = closure
+        return bits_list
+
+    def ancestors(self, node):
+        """
+        @param node: compound, i.e. cpd00003
+        @return: set of the compounds that are parents of the compound, or
+        parents of its parents etc.
+        """
+        if(node not in self.Index):
+            return set()
+        if(self.Ancestor_Bits is None):
+            self.Ancestor_Bits = self.closureBits(ancestors=True)
+        return self.bitNodes(self.Ancestor_Bits[self.Index[node]])
+
+    def descendants(self, node):
+        """
+        @param node: compound, i.e. cpd27638
+        @return: set of the compounds that are children of the compound, or
+        children of its children etc.
+        """
+        if(node not in self.Index):
+            return set()
+        if(self.Descendant_Bits is None):
+            self.Descendant_Bits = self.closureBits(ancestors=False)
+        return self.bitNodes(self.Descendant_Bits[self.Index[node]])
+
+    def ancestorSets(self):
+        """
+        @return: dictionary of the set of ancestors of each compound that
+        has a parent, as used by Reactions.generateOntologyReactionCodes()
+        """
+        return dict(self.iterAncestors())
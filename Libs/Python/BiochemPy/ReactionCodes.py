@@ -0,0 +1,106 @@
+import os
+import pickle
+import hashlib
+from .Snapshots import savePickles
+
+# Version of the index layout, bump it whenever the way codes are
+# generated changes so that existing indexes are rebuilt
+CODES_VERSION = 1
+
+class ReactionCodes:
+    def __init__(self, rxns_file, generate_code):
+
+        # The index is a hidden file that sits next to the reactions
+        # i.e. Biochemistry/.reactions.tsv.codes.pickle
+        (rxns_dir, rxns_name) = os.path.split(rxns_file)
+        self.IndexFile = os.path.join(rxns_dir, '.' + rxns_name + '.codes.pickle')
+        self.GenerateCode = generate_code
+
+        # Code of each reaction, along with the hash of the stoichiometry
+        # it was generated from: {rxn: (stoich_hash, code)}
+        self.Codes = dict()
+        self.Changed = False
+        self.loadIndex()
+
+        # Reactions that share each code: {code: set(rxns)}
+        self.Reactions = dict()
+        for rxn in self.Codes:
+            self.addReaction(rxn, self.Codes[rxn][1])
+
+    @staticmethod
+    def hashStoich(stoichiometry):
+        return hashlib.blake2b(stoichiometry.encode('utf-8'), digest_size=16).digest()
+
+    def loadIndex(self):
+        if(os.path.isfile(self.IndexFile) is False):
+            return
+
+        try:
+            with open(self.IndexFile, 'rb') as fh:
+                header = pickle.load(fh)
+                if(not isinstance(header, dict) or header.get('version') != CODES_VERSION):
+                    return
+                self.Codes = pickle.load(fh)
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ValueError):
+            # A broken index is simply rebuilt
+            self.Codes = dict()
+
+    def saveIndex(self):
+        if(self.Changed is False):
+            return True
+
+        if(savePickles(self.IndexFile, {'version': CODES_VERSION}, self.Codes) is False):
+            return False
+
+        self.Changed = False
+        return True
+
+    def addReaction(self, rxn, code):
+        if(code not in self.Reactions):
+            self.Reactions[code] = set()
+        self.Reactions[code].add(rxn)
+
+    def removeReaction(self, rxn):
+        if(rxn not in self.Codes):
+            return
+
+        code = self.Codes.pop(rxn)[1]
+        self.Reactions[code].discard(rxn)
+        if(len(self.Reactions[code]) == 0):
+            del self.Reactions[code]
+        self.Changed = True
+
+    def updateReaction(self, rxn, stoichiometry):
+        # Only reactions whose stoichiometry changed get a new code
+        stoich_hash = self.hashStoich(stoichiometry)
+        if(rxn in self.Codes and self.Codes[rxn][0] == stoich_hash):
+            return False
+
+        self.removeReaction(rxn)
+        code = self.GenerateCode(stoichiometry)
+        self.Codes[rxn] = (stoich_hash, code)
+        self.addReaction(rxn, code)
+        self.Changed = True
+        return True
+
+    def update(self, rxns_dict, prune=False):
+        # Brings the codes of the reactions in rxns_dict up to date,
+        # returning the number of reactions whose code had to be
+        # generated. The reactions that aren't in rxns_dict are only
+        # removed if it has every reaction (prune), as scripts also
+        # generate the codes of a subset of the reactions
+        if(prune is True):
+            for rxn in [rxn for rxn in self.Codes if rxn not in rxns_dict]:
+                self.removeReaction(rxn)
+
+        updated = 0
+        for rxn in rxns_dict:
+            if(self.updateReaction(rxn, rxns_dict[rxn]['stoichiometry']) is True):
+                updated += 1
+        return updated
+
+    def codeOf(self, rxn):
+        return self.Codes[rxn][1]
+
+    def reactionsFor(self, code):
+        return self.Reactions.get(code, set())
@@ -1,13 +1,17 @@
 import os
 import re
-import json
 import copy
 import itertools
 from csv import DictReader
+from .Snapshots import Snapshot
+from .AliasIndex import AliasIndex
+from .AliasLookup import AliasLookup
+from .CanonicalMap import CanonicalMap
+from . import Writers
 
 class Reactions:
     def __init__(self, biochem_root='../../../Biochemistry/',
-                 rxns_file='reactions.tsv'):
+                 rxns_file='reactions.tsv', compounds_dict=None):
 
         self.BiochemRoot = os.path.dirname(__file__)+'/'+biochem_root
         self.RxnsFile = self.BiochemRoot + rxns_file
@@ -19,37 +23,66 @@ class Reactions:
         reader = DictReader(open(self.RxnsFile), dialect='excel-tab')
         self.Headers = reader.fieldnames
 
-        from BiochemPy import Compounds
-        self.CompoundsHelper = Compounds()
-        self.Compounds_Dict = self.CompoundsHelper.loadCompounds()
+        # The compounds are only retrieved when first needed, either those
+        # passed in, or those already loaded by the script (see Compounds_Dict)
+        from .Compounds import Compounds
+        self.CompoundsHelper = Compounds(biochem_root)
+        self.Loaded_Compounds_Dict = compounds_dict
+        self.Codes_Index = None
+
+    @property
+    def Compounds_Dict(self):
+        if(self.Loaded_Compounds_Dict is None):
+            self.Loaded_Compounds_Dict = self.CompoundsHelper.sharedCompounds()
+        return self.Loaded_Compounds_Dict
+
+    @Compounds_Dict.setter
+    def Compounds_Dict(self, compounds_dict):
+        self.Loaded_Compounds_Dict = compounds_dict
+
+    def loadReactions(self, use_snapshot=True):
+        # Parsing the whole file is slow, so the parsed rows are kept in a
+        # snapshot next to the file and re-used for as long as its unchanged
+        snapshot = Snapshot(self.RxnsFile, 'rows')
+        if(use_snapshot is True):
+            rxns_dict = snapshot.load()
+            if(rxns_dict is not None):
+                return rxns_dict
 
-    def loadReactions(self):
         reader = DictReader(open(self.RxnsFile), dialect='excel-tab')
+        rxns_dict = dict()
+        for line in reader:
+            rxns_dict[line['id']] = self.parseReaction(line)
+
+        if(use_snapshot is True):
+            snapshot.save(rxns_dict)
+
+        return rxns_dict
+
+    @staticmethod
+    def parseReaction(line):
         type_mapping = {"is_transport": int, "is_obsolete": int,
                         "deltag": float, "deltagerr": float}
         lists = ["aliases","pathways","ec_numbers","notes"]
         dicts = []
 
-        rxns_dict = dict()
-        for line in reader:
-            for list_type in lists:
-                if(line[list_type] != "null"):
-                    line[list_type]=line[list_type].split("|")
-            for dict_type in dicts:
-                if(line[dict_type] != "null"):
-                    entries = line[dict_type].split('|')
-                    line[dict_type]=dict()
-                    for entry in entries:
-                        (type,list) = entry.split(':')
-                        line[dict_type][type]=list
-            for heading, target_type in type_mapping.items():
-                try:
-                    line[heading] = target_type(line[heading])
-                except ValueError:  # Generally caused by "null" strings
-                    line[heading] = None
-            rxns_dict[line['id']] = line
-
-        return rxns_dict
+        for list_type in lists:
+            if(line[list_type] != "null"):
+                line[list_type]=line[list_type].split("|")
+        for dict_type in dicts:
+            if(line[dict_type] != "null"):
+                entries = line[dict_type].split('|')
+                line[dict_type]=dict()
+                for entry in entries:
+                    (type,list) = entry.split(':')
+                    line[dict_type][type]=list
+        for heading, target_type in type_mapping.items():
+            try:
+                line[heading] = target_type(line[heading])
+            except ValueError:  # Generally caused by "null" strings
+                line[heading] = None
+
+        return line
 
     def parseEquation(self, equation_string):
         rxn_cpds_array = list()
@@ -141,11 +174,30 @@ class Reactions:
 
     # The basis for this code, and producing combinations of ontologically related reactions
     # was found in Filipe's code (see commit: 92db86)
-    def generateOntologyReactionCodes(self, rxn_id, rxn_cpds, cpds_neighbors):
+    def generateOntologyReactionCodes(self, rxn_id, rxn_cpds, cpds_neighbors,
+                                      reagents_index=None, max_combinations=None):
 
         # returns list of reaction codes to match with biochemistry
+        # if a reagents_index is given, only the codes that could match
+        # one of the indexed codes are returned (see iterOntologyReactionCodes)
         new_codes = dict()
+        for (new_code, entry) in self.iterOntologyReactionCodes(rxn_cpds, cpds_neighbors,
+                                                                 reagents_index, max_combinations):
+            new_codes[new_code]=entry
+        return new_codes
 
+    def iterOntologyReactionCodes(self, rxn_cpds, cpds_neighbors,
+                                  reagents_index=None, max_combinations=None):
+        """
+        @param rxn_cpds: reagents of the reaction, as returned by parseStoichOnt()
+        @param cpds_neighbors: the compounds each compound can be replaced with
+        @param reagents_index: optional index returned by indexCodeReagents(), if
+        given the replacements that can't make any of the indexed codes are skipped
+        @param max_combinations: optional maximum number of codes to generate
+        @return: yields the code of each combination of replacements, and the
+        replacements, in the order in which they're combined (one compound,
+        then two compounds etc.), without holding the combinations in memory
+        """
         replacements = list()
         for cpd_cpt_tuple in rxn_cpds:
             replace_list = list()
@@ -159,43 +211,125 @@ class Reactions:
 
         # Iterate through different numbers of compounds to replace
         # i.e. replace 1 compound, replace 2 compounds etc.
-        # The output is a list of all the possible combination of replacements to explore
-        replacement_product=list()
+        n_codes = 0
         for n_cpds in range(1,len(replacements)+1):
-            combination = list(itertools.combinations(replacements,n_cpds))
-            for entry in combination:
-                product_list = list(itertools.product(*entry))
-                replacement_product += product_list
-
-        if(len(replacements) == 0):
-            return new_codes
-
-        for entry in replacement_product:
-
-            # Old code assumed that all "new" compounds were unique
-            # cpd_swap_dict = {x:y for x, y in entry}
-            # new_swapped_rxn_cpds = { (x if not x in cpd_swap_dict else cpd_swap_dict[x], c):y 
-            #                          for (x, c), y in rxn_cpds.items() }
-
-            # Regenerate array of cpd dicts for use with generateCode()
-            swapped_rxn_cpds_array=list()
-            for (cpd, cpt), coeff in rxn_cpds.items():
-                new_cpd = cpd
-                for old, new in entry:
-                    if(cpd == old):
-                        new_cpd = new
-                reagent = { "reagent":new_cpd+'_'+cpt+'0',
-                            "compartment":cpt,
-                            "coefficient":float(coeff) }
+            for combination in itertools.combinations(replacements,n_cpds):
+                if(reagents_index is None):
+                    entries = itertools.product(*combination)
+                else:
+                    entries = self.matchReplacements(rxn_cpds, combination, reagents_index)
+
+                for entry in entries:
+                    if(max_combinations is not None and n_codes >= max_combinations):
+                        return
+                    n_codes += 1
+                    yield (self.swapCode(rxn_cpds, entry), entry)
+
+    def swapCode(self, rxn_cpds, entry):
+
+        # Old code assumed that all "new" compounds were unique
+        # cpd_swap_dict = {x:y for x, y in entry}
+        # new_swapped_rxn_cpds = { (x if not x in cpd_swap_dict else cpd_swap_dict[x], c):y 
+        #                          for (x, c), y in rxn_cpds.items() }
+
+        # Regenerate array of cpd dicts for use with generateCode()
+        swapped_rxn_cpds_array=list()
+        for (cpd, cpt), coeff in rxn_cpds.items():
+            new_cpd = cpd
+            for old, new in entry:
+                if(cpd == old):
+                    new_cpd = new
+            reagent = { "reagent":new_cpd+'_'+cpt+'0',
+                        "compartment":cpt,
+                        "coefficient":float(coeff) }
 
-                # Correct for redundant ".0" in floats
-                if (str(reagent["coefficient"])[-2:] == ".0"):
-                    reagent["coefficient"] = int(round(reagent["coefficient"]))
+            # Correct for redundant ".0" in floats
+            if (str(reagent["coefficient"])[-2:] == ".0"):
+                reagent["coefficient"] = int(round(reagent["coefficient"]))
 
-                swapped_rxn_cpds_array.append(reagent)
-            new_code = self.generateCode(swapped_rxn_cpds_array)
-            new_codes[new_code]=entry
-        return new_codes
+            swapped_rxn_cpds_array.append(reagent)
+        return self.generateCode(swapped_rxn_cpds_array)
+
+    @staticmethod
+    def indexCodeReagents(codes):
+        # The codes in which each reagent (i.e. cpd00001_00) is found
+        reagents_index = dict()
+        for code in codes:
+            for entry in code.split("|"):
+                if(entry == "=" or entry == ""):
+                    continue
+                reagent = entry.rsplit(":", 1)[0]
+                if(reagent not in reagents_index):
+                    reagents_index[reagent] = set()
+                reagents_index[reagent].add(code)
+        return reagents_index
+
+    @staticmethod
+    def matchReplacements(rxn_cpds, combination, reagents_index):
+        # Yields the same entries as itertools.product(*combination), in the
+        # same order, except those that can't make any of the indexed codes.
+        # Every reagent of a code is in the code, apart from protons (which
+        # are left out of codes that aren't transport) and zero coefficients,
+        # so the codes that are left must have every other reagent
+        def codeReagents(cpd, new_cpd):
+            reagents = list()
+            for (rgt_cpd, cpt), coeff in rxn_cpds.items():
+                if(rgt_cpd == cpd and new_cpd != "cpd00067" and float(coeff) != 0):
+                    reagents.append(new_cpd+'_'+cpt+'0')
+            return reagents
+
+        def matchCodes(codes, reagents):
+            # codes is None until a reagent has been matched
+            for reagent in reagents:
+                if(reagent not in reagents_index):
+                    return set()
+                if(codes is None):
+                    codes = reagents_index[reagent]
+                else:
+                    codes = codes & reagents_index[reagent]
+                if(len(codes) == 0):
+                    break
+            return codes
+
+        # The reagents that aren't replaced
+        old_cpds = set(replace_list[0][0] for replace_list in combination)
+        kept_reagents = list()
+        for (cpd, cpt) in rxn_cpds:
+            if(cpd not in old_cpds):
+                kept_reagents += codeReagents(cpd, cpd)
+        codes = matchCodes(None, kept_reagents)
+        if(codes is not None and len(codes) == 0):
+            return
+
+        # If a compound is found in more than one compartment, the last
+        # replacement of the compound is used for all of them, so the
+        # replacements are only matched once all are chosen
+        if(len(old_cpds) < len(combination)):
+            for entry in itertools.product(*combination):
+                reagents = list()
+                for (old, new) in dict(entry).items():
+                    reagents += codeReagents(old, new)
+                entry_codes = matchCodes(codes, reagents)
+                if(entry_codes is None or len(entry_codes) > 0):
+                    yield entry
+            return
+
+        # Otherwise the replacements are chosen one compound at a time, and
+        # a choice is dropped as soon as no code is left
+        def chooseReplacements(index, codes, entry):
+            if(index == len(combination)):
+                yield tuple(entry)
+                return
+
+            for (old, new) in combination[index]:
+                choice_codes = matchCodes(codes, codeReagents(old, new))
+                if(choice_codes is not None and len(choice_codes) == 0):
+                    continue
+                entry.append((old, new))
+                yield from chooseReplacements(index + 1, choice_codes, entry)
+                entry.pop()
+
+        yield from chooseReplacements(0, codes, list())
 
     @staticmethod
     def isTransport(rxn_cpds_array):
@@ -207,20 +341,53 @@ class Reactions:
         else:
             return 0
 
-    def generateCodes(self, rxns_dict,check_obsolete=True):
+    def loadCodes(self, rxns_dict, prune=False):
+        # The codes are kept in an index next to the reactions file,
+        # so that only those of new or changed reactions are generated
+        # Only pass prune if rxns_dict has every reaction, as those that
+        # aren't in it are then removed from the index
+        if(self.Codes_Index is None):
+            from .ReactionCodes import ReactionCodes
+            self.Codes_Index = ReactionCodes(self.RxnsFile, self.generateStoichCode)
+
+        self.Codes_Index.update(rxns_dict, prune)
+        self.Codes_Index.saveIndex()
+        return self.Codes_Index
+
+    def generateCodes(self, rxns_dict,check_obsolete=True,prune=False):
+        codes_index = self.loadCodes(rxns_dict, prune)
+
         codes_dict=dict()
         for rxn in rxns_dict:
             if(rxns_dict[rxn]['status']=="EMPTY"):
                 continue
             if(check_obsolete is False and rxns_dict[rxn]['is_obsolete']==1):
                 continue
-            rxn_cpds_array = self.parseStoich(rxns_dict[rxn]['stoichiometry'])
-            code = self.generateCode(rxn_cpds_array)
+            code = codes_index.codeOf(rxn)
             if(code not in codes_dict):
                 codes_dict[code]=dict()
             codes_dict[code][rxn]=1
         return codes_dict
 
+    def generateStoichCode(self, stoichiometry):
+        # Same as generateCode(parseStoich(stoichiometry)), but only the
+        # fields used for the code are parsed, so no compounds are needed
+        rxn_cpds_array = list()
+        if(stoichiometry != ""):
+            for rgt in stoichiometry.split(";"):
+                (coeff, cpd, cpt, index, name) = rgt.split(":", 4)
+                coeff = float(coeff)
+
+                # Correct for redundant ".0" in floats
+                if (str(coeff)[-2:] == ".0"):
+                    coeff = int(round(coeff))
+
+                rxn_cpds_array.append({"reagent": cpd + "_" + cpt + index,
+                                       "coefficient": coeff,
+                                       "compartment": int(cpt)})
+
+        return self.generateCode(rxn_cpds_array)
+
     def generateCode(self,rxn_cpds_array):
 
         #It matters if its a transport reaction, and we include protons when matching transport
@@ -374,6 +541,10 @@ class Reactions:
         if(len(cpdformerror)>0):
             return "CPDFORMERROR"
 
+        return self.reportImbalance(rxn_net_mass, rxn_net_charge)
+
+    @staticmethod
+    def reportImbalance(rxn_net_mass, rxn_net_charge):
         # Round out tiny numbers that occur because we add/substract floats
         # Threshold of 1e-6 found to capture all these instances without
         # removing actual small differences in mass.
@@ -420,6 +591,128 @@ class Reactions:
             
         return status
 
+    def balanceAll(self, rxns_dict):
+        # Balances every reaction in one go, returning the same status
+        # that balanceReaction() returns for each reaction.
+        # Each compound formula is only parsed once, into a sparse
+        # compound x element matrix, and the net mass and charge of
+        # every reaction is then a single product with the sparse
+        # reaction x compound stoichiometric matrix
+        try:
+            from scipy.sparse import csr_matrix
+        except ImportError:
+            statuses = dict()
+            for rxn in rxns_dict:
+                rxn_cpds_array = self.parseStoich(rxns_dict[rxn]["stoichiometry"])
+                statuses[rxn] = self.balanceReaction(rxn_cpds_array)
+            return statuses
+
+        statuses = dict()
+        cpd_indices = dict()
+        balanced_rxns = list()
+
+        # Stoichiometric matrix, compounds are kept in the order in which
+        # they appear in the reaction so that the sums in the matrix
+        # product are done in the same order as balanceReaction()
+        stoich_indptr = [0]
+        stoich_indices = list()
+        stoich_data = list()
+
+        for rxn in rxns_dict:
+            stoichiometry = rxns_dict[rxn]["stoichiometry"]
+            if(stoichiometry == ""):
+                statuses[rxn] = "EMPTY"
+                continue
+
+            rgts_set = set()
+            cpds_coeff_dict = dict()
+            for rgt in stoichiometry.split(";"):
+                (coeff, cpd, cpt, index, name) = rgt.split(":", 4)
+                rgts_set.add(cpd + "_" + cpt + index)
+
+                if (cpd not in cpds_coeff_dict):
+                    cpds_coeff_dict[cpd] = 0
+                cpds_coeff_dict[cpd] += float(coeff)
+
+            if(len(rgts_set) < len(stoichiometry.split(";"))):
+                statuses[rxn] = "Duplicate reagents"
+                continue
+
+            for cpd in cpds_coeff_dict:
+                #Skip trans-compartmental compounds
+                if (cpds_coeff_dict[cpd] == 0):
+                    continue
+
+                if(cpd not in cpd_indices):
+                    cpd_indices[cpd] = len(cpd_indices)
+                stoich_indices.append(cpd_indices[cpd])
+                stoich_data.append(cpds_coeff_dict[cpd])
+
+            stoich_indptr.append(len(stoich_indices))
+            balanced_rxns.append(rxn)
+
+        # Compound matrix, the last column is the charge
+        atom_indices = dict()
+        cpdformerror = set()
+        cpd_indptr = [0]
+        cpd_indices_array = list()
+        cpd_data = list()
+
+        for cpd in cpd_indices:
+            cpd_atoms = self.CompoundsHelper.parseFormula(
+                self.Compounds_Dict[cpd]["formula"])
+
+            if (len(cpd_atoms.keys()) == 0):
+                #Here we can skip photons and electrons
+                #They are the valid compounds with no mass
+                if(cpd=='cpd11632' or cpd=='cpd12713'):
+                    pass
+                else:
+                    cpdformerror.add(cpd_indices[cpd])
+
+            for atom in cpd_atoms.keys():
+                if(atom not in atom_indices):
+                    atom_indices[atom] = len(atom_indices)
+                cpd_indices_array.append(atom_indices[atom])
+                cpd_data.append(float(cpd_atoms[atom]))
+
+            cpd_indices_array.append(-1)
+            cpd_data.append(float(self.Compounds_Dict[cpd]["charge"]))
+            cpd_indptr.append(len(cpd_indices_array))
+
+        # The charge column is only placed once all the atoms are known
+        charge_index = len(atom_indices)
+        cpd_indices_array = [charge_index if index == -1 else index for index in cpd_indices_array]
+
+        stoich_matrix = csr_matrix((stoich_data, stoich_indices, stoich_indptr),
+                                   shape=(len(balanced_rxns), len(cpd_indices)))
+        cpd_matrix = csr_matrix((cpd_data, cpd_indices_array, cpd_indptr),
+                                shape=(len(cpd_indices), charge_index + 1))
+        net_matrix = (stoich_matrix @ cpd_matrix).tocsr()
+
+        atoms_array = sorted(atom_indices, key=atom_indices.get)
+        stoich_indices = stoich_matrix.indices.tolist()
+        net_indptr = net_matrix.indptr.tolist()
+        net_indices = net_matrix.indices.tolist()
+        net_data = net_matrix.data.tolist()
+
+        for row, rxn in enumerate(balanced_rxns):
+            if(not cpdformerror.isdisjoint(stoich_indices[stoich_indptr[row]:stoich_indptr[row+1]])):
+                statuses[rxn] = "CPDFORMERROR"
+                continue
+
+            rxn_net_charge = 0.0
+            rxn_net_mass = dict()
+            for entry in range(net_indptr[row], net_indptr[row+1]):
+                if(net_indices[entry] == charge_index):
+                    rxn_net_charge = net_data[entry]
+                else:
+                    rxn_net_mass[atoms_array[net_indices[entry]]] = net_data[entry]
+
+            statuses[rxn] = self.reportImbalance(rxn_net_mass, rxn_net_charge)
+
+        return statuses
+
     def adjustCompound(self, rxn_cpds_array, compound, adjustment,
                        compartment=0):
 
@@ -560,80 +853,117 @@ class Reactions:
 
         # Print to TXT
         ecs_file = open(ecs_root + ".txt", 'w')
+        self.writeECs(ecs_dict, ecs_file)
+        ecs_file.close()
+
+    def writeECs(self, ecs_dict, ecs_file):
         ecs_file.write("\t".join(("ModelSEED ID","External ID","Source")) + "\n")
         for rxn in sorted(ecs_dict.keys()):
             for name in sorted(ecs_dict[rxn]):
                 ecs_file.write("\t".join((rxn,name,'Enzyme Class')) + "\n")
-        ecs_file.close()
 
     def saveNames(self, names_dict):
         names_root = os.path.splitext(self.NameFile)[0]
 
         # Print to TXT
         names_file = open(names_root + ".txt", 'w')
+        self.writeNames(names_dict, names_file)
+        names_file.close()
+
+    def writeNames(self, names_dict, names_file):
         names_file.write("\t".join(("ModelSEED ID","External ID","Source")) + "\n")
         for rxn in sorted(names_dict.keys()):
             for name in sorted(names_dict[rxn]):
                 names_file.write("\t".join((rxn,name,'name')) + "\n")
-        names_file.close()
 
     def saveAliases(self, alias_dict):
         alias_root = os.path.splitext(self.AliasFile)[0]
 
         # Print to TXT
         alias_file = open(alias_root + ".txt", 'w')
+        self.writeAliases(alias_dict, alias_file)
+        alias_file.close()
+
+    def writeAliases(self, alias_dict, alias_file):
         alias_file.write("\t".join(("ModelSEED ID","External ID","Source")) + "\n")
         for rxn in sorted(alias_dict.keys()):
             for source in sorted (alias_dict[rxn].keys()):
                 for alias in sorted(alias_dict[rxn][source]):
                     alias_file.write("\t".join((rxn,alias,source)) + "\n")
-        alias_file.close()
+
+    def formatReaction(self, rxn_dict):
+        values_list=list()
+        for header in self.Headers:
+            value=rxn_dict[header]
+            if(isinstance(value,list)):
+                value = "|".join(value)
+            if(isinstance(value,dict)):
+                entries = list()
+                for entry in value:
+                    entries.append(entry+':'+value[entry])
+                value = "|".join(entries)
+            values_list.append(str(value))
+        return "\t".join(values_list)
 
     def saveReactions(self, reactions_dict):
         rxns_root = os.path.splitext(self.RxnsFile)[0]
 
-        # Print to TSV
-        rxns_file = open(rxns_root + ".tsv", 'w')
-        rxns_file.write("\t".join(self.Headers) + "\n")
+        # Print to TSV and JSON at the same time, each file is only
+        # re-written if a reaction changed
+        rxns_lines = ["\t".join(self.Headers)]
         for rxn in sorted(reactions_dict.keys()):
-            values_list=list()
-            for header in self.Headers:
-                value=reactions_dict[rxn][header]
-                if(isinstance(value,list)):
-                    value = "|".join(value)
-                if(isinstance(value,dict)):
-                    entries = list()
-                    for entry in value:
-                        entries.append(entry+':'+value[entry])
-                    value = "|".join(entries)
-                values_list.append(str(value))
-            rxns_file.write("\t".join(values_list)+"\n")
-        rxns_file.close()
-
-        #Re-configure JSON
-        new_reactions_dict = list()
-        for rxn_id in sorted(reactions_dict):
-            rxn_obj = reactions_dict[rxn_id]
-            for key in rxn_obj:
-                if(isinstance(rxn_obj[key],dict)):
-                    for entry in rxn_obj[key]:
-                        if(rxn_obj[key][entry]=="null"):
-                            rxn_obj[key][entry]=None
-                if(rxn_obj[key]=="null"):
-                    rxn_obj[key]=None
-            new_reactions_dict.append(rxn_obj)
-
-        # Print to JSON
-        rxns_file = open(rxns_root + ".json", 'w')
-        rxns_file.write(json.dumps(new_reactions_dict, indent=4, sort_keys=True))
-        rxns_file.close()
+            rxns_lines.append(self.formatReaction(reactions_dict[rxn]))
+        Writers.writeFiles(rxns_root + ".tsv", rxns_lines,
+                           rxns_root + ".json", Writers.jsonRecords(reactions_dict))
+
+    def canonicalMap(self, rxns_dict=None):
+        # The replacement of every obsolete reaction is resolved once, for the
+        # reactions loaded by the script, or those in the file if none are given
+        if(rxns_dict is None):
+            rxns_dict = self.loadReactions()
+        return CanonicalMap(rxns_dict, 'linked_reaction')
+
+    def aliasIndex(self):
+        # The alias and name files are parsed once per process
+        return AliasIndex.sharedIndex(self.AliasFile, self.NameFile, "rxn")
+
+    def aliasLookup(self):
+        # For resolving a few aliases without parsing the alias file
+        return AliasLookup.sharedLookup(self.AliasFile, "rxn")
 
     def loadMSAliases(self,sources_array=[]):
         if(len(sources_array)==0):
             sources_array.append("All")
 
+        alias_index = self.aliasIndex()
+        if("All" in sources_array):
+            return AliasIndex.copyNestedLists(alias_index.msAliases())
+
         aliases_dict = dict()
-        reader = DictReader(open(self.AliasFile), dialect = 'excel-tab')
+        for (msid, alias, source_field, sources) in alias_index.aliasRows():
+            if(source_field not in sources_array):
+                continue
+
+            if(msid not in aliases_dict):
+                   aliases_dict[msid]=dict()
+
+            for source in sources:
+                if(source not in aliases_dict[msid]):
+                    aliases_dict[msid][source]=list()
+
+                aliases_dict[msid][source].append(alias)
+
+        return aliases_dict
+
+    def loadSourceAliases(self):
+        return AliasIndex.copyNestedLists(self.aliasIndex().sourceAliases())
+
+    def readMSAliases(self, aliases_file, sources_array):
+        if(len(sources_array)==0):
+            sources_array.append("All")
+
+        aliases_dict = dict()
+        reader = DictReader(aliases_file, dialect = 'excel-tab')
         for line in reader:
             if("rxn" not in line['ModelSEED ID']):
                 continue
@@ -653,8 +983,14 @@ class Reactions:
         return aliases_dict
 
     def loadNames(self):
+        return AliasIndex.copyLists(self.aliasIndex().msNames())
+
+    def loadNameIDs(self):
+        return AliasIndex.copyLists(self.aliasIndex().nameIDs())
+
+    def readNames(self, names_file):
         names_dict = dict()
-        reader = DictReader(open(self.NameFile), dialect = 'excel-tab')
+        reader = DictReader(names_file, dialect = 'excel-tab')
         for line in reader:
             if("rxn" not in line['ModelSEED ID']):
                 continue
@@ -684,8 +1020,11 @@ class Reactions:
         return pathways_dict
 
     def loadECs(self):
+        return self.readECs(open(self.ECFile))
+
+    def readECs(self, ecs_file):
         ecs_dict = dict()
-        reader = DictReader(open(self.ECFile), dialect = 'excel-tab')
+        reader = DictReader(ecs_file, dialect = 'excel-tab')
         for line in reader:
             if("rxn" not in line['ModelSEED ID']):
                 continue
@@ -0,0 +1,491 @@
+import io
+import re
+import time
+from csv import DictReader
+from .Compounds import Compounds
+from .Reactions import Reactions
+from .LazyTables import parseLine
+from .CanonicalMap import CanonicalMap
+
+# The stages of Scripts/Biochemistry/Refresh, each of which changes the
+# loaded dictionaries in place and returns the number of changes made.
+# The scripts run one stage each, RefreshDatabase runs them all in turn.
+
+def loadSourceClasses(biochem_root):
+    Source_Classes=dict()
+    reader = DictReader(open(biochem_root + 'Aliases/Source_Classifiers.txt'), dialect='excel-tab')
+    for line in reader:
+        if(line['Source Type'] not in Source_Classes):
+            Source_Classes[line['Source Type']]=dict()
+        Source_Classes[line['Source Type']][line['Source ID']]=1
+    return Source_Classes
+
+def rebuildReactions(ReactionsHelper, Reactions_Dict):
+    Update_Reactions=0
+    for rxn in sorted(Reactions_Dict.keys()):
+        if(Reactions_Dict[rxn]["status"] == "EMPTY"):
+            continue
+
+        Rxn_Cpds_Array = ReactionsHelper.parseStoich(Reactions_Dict[rxn]["stoichiometry"])
+        New_Rxn_Cpds_Array = ReactionsHelper.removeCpdRedundancy(Rxn_Cpds_Array)
+        Stoichiometry=ReactionsHelper.buildStoich(New_Rxn_Cpds_Array)
+        if(Stoichiometry != Reactions_Dict[rxn]["stoichiometry"]):
+            print("Rebuilding "+rxn)
+            ReactionsHelper.rebuildReaction(Reactions_Dict[rxn],Stoichiometry)
+            Update_Reactions+=1
+
+    return Update_Reactions
+
+def mergeReactions(ReactionsHelper, Reactions_Dict):
+    # Every reaction is here, so those that were removed are pruned from the index
+    Reactions_Codes = ReactionsHelper.generateCodes(Reactions_Dict,prune=True)
+
+    Update_Reactions=0
+    for code in sorted(Reactions_Codes.keys()):
+
+        primary_rxn = sorted(Reactions_Codes[code].keys())[0]
+
+        if(len(Reactions_Codes[code].keys())==1):
+            if(Reactions_Dict[primary_rxn]["is_obsolete"]==1):
+                Update_Reactions+=1
+                Reactions_Dict[primary_rxn]["is_obsolete"]=0
+                Reactions_Dict[primary_rxn]["linked_reaction"]="null"
+        else:
+            for rxn in Reactions_Codes[code].keys():
+                rxn_list = ";".join(sorted(x for x in Reactions_Codes[code].keys() if x != rxn))
+                if(rxn == primary_rxn and ( Reactions_Dict[rxn]["is_obsolete"]==1 or rxn_list != Reactions_Dict[rxn]["linked_reaction"] )):
+                    print("Updating primary reaction "+rxn+" and removing any indication that its obsolete")
+                    Update_Reactions+=1
+                    Reactions_Dict[rxn]["linked_reaction"] = rxn_list
+                    Reactions_Dict[rxn]["is_obsolete"]=0
+                elif(rxn != primary_rxn and ( Reactions_Dict[rxn]["is_obsolete"]==0 or rxn_list != Reactions_Dict[rxn]["linked_reaction"] )):
+                    print("Updating reaction "+rxn+" to indicate that its obsolete")
+                    Update_Reactions+=1
+                    Reactions_Dict[rxn]["linked_reaction"] = rxn_list
+                    Reactions_Dict[rxn]["is_obsolete"]=1
+
+    return Update_Reactions
+
+def rebalanceReactions(ReactionsHelper, Reactions_Dict, status_file):
+    Reactions_Statuses = ReactionsHelper.balanceAll(Reactions_Dict)
+
+    Update_Reactions=0
+    for rxn in sorted(Reactions_Dict.keys()):
+        if(Reactions_Dict[rxn]["status"] == "EMPTY"):
+            continue
+
+        new_status = Reactions_Statuses[rxn]
+        old_status=Reactions_Dict[rxn]["status"]
+
+        #Need to handle reactions with polymers
+        if(new_status=="Duplicate reagents"):
+            new_status = "NB"
+            continue
+
+        if(new_status != old_status and "CK" not in old_status):
+            print("Changing Status for "+rxn+" from "+old_status+" to "+new_status)
+            status_file.write(rxn+"\t"+old_status+"\t"+new_status+"\n")
+            Reactions_Dict[rxn]["status"]=new_status
+            Update_Reactions+=1
+
+    return Update_Reactions
+
+def adjustReactionProtons(ReactionsHelper, Reactions_Dict, status_file):
+    Update_Reactions=0
+    for rxn in sorted(Reactions_Dict.keys()):
+
+        if(Reactions_Dict[rxn]["status"] == "EMPTY"):
+            continue
+
+        #Find statuses that only have proton imbalance
+        if("MI" not in Reactions_Dict[rxn]["status"]):
+            continue
+
+        Status_Blocks = Reactions_Dict[rxn]["status"].split("|")
+        for block in Status_Blocks:
+            if("MI" not in block):
+                continue
+
+            block = block.replace("MI:","")
+            elements = block.split("/")
+
+            #only making adjustments if mass imbalance is a single element,
+            #and the element is hydrogen
+            if(len(elements)>1 or not elements[0].startswith("H:")):
+                continue
+
+            (element,number)=elements[0].split(":")
+
+            #Parse old stoichiometry into array
+            old_stoichiometry=Reactions_Dict[rxn]["stoichiometry"]
+            Rxn_Cpds_Array=ReactionsHelper.parseStoich(old_stoichiometry)
+
+            #Adjust for protons
+            ReactionsHelper.adjustCompound(Rxn_Cpds_Array,"cpd00067",float(number))
+
+            #Recompute new status and stoichiometry
+            new_status = ReactionsHelper.balanceReaction(Rxn_Cpds_Array)
+            new_stoichiometry = ReactionsHelper.buildStoich(Rxn_Cpds_Array)
+
+            if(new_status != Reactions_Dict[rxn]['status']):
+                status_file.write(rxn+"\t"+Reactions_Dict[rxn]['status']+"\t"+new_status+"\n")
+
+            if(new_stoichiometry != old_stoichiometry):
+                print("Rebuilding reaction :",rxn)
+                ReactionsHelper.rebuildReaction(Reactions_Dict[rxn],new_stoichiometry)
+                Reactions_Dict[rxn]["status"]=new_status
+                if("HB" not in Reactions_Dict[rxn]["notes"]):
+                    Reactions_Dict[rxn]["notes"].append("HB")
+                Update_Reactions+=1
+
+    return Update_Reactions
+
+def adjustReactionWater(ReactionsHelper, Reactions_Dict, status_file):
+    Update_Reactions=0
+    for rxn in sorted(Reactions_Dict.keys()):
+        #Find statuses that only have water imbalance
+        if("MI:H:2/O:1" != Reactions_Dict[rxn]["status"] and
+           "MI:H:-2/O:-1" != Reactions_Dict[rxn]["status"]):
+            continue
+
+        #Parse old stoichiometry into array
+        old_stoichiometry=Reactions_Dict[rxn]["stoichiometry"]
+        Rxn_Cpds_Array=ReactionsHelper.parseStoich(old_stoichiometry)
+
+        #Don't adjust reactions that only have water
+        if(len(Rxn_Cpds_Array)==1):
+            continue
+
+        Water_Adjustment = 1
+        if("-1" in Reactions_Dict[rxn]["status"]):
+            Water_Adjustment = -1
+
+        #Adjust for water
+        ReactionsHelper.adjustCompound(Rxn_Cpds_Array,"cpd00001",float(Water_Adjustment))
+
+        #Recompute new status and stoichiometry
+        new_status = ReactionsHelper.balanceReaction(Rxn_Cpds_Array)
+        new_stoichiometry = ReactionsHelper.buildStoich(Rxn_Cpds_Array)
+
+        if(new_status != Reactions_Dict[rxn]['status']):
+            status_file.write(rxn+"\t"+Reactions_Dict[rxn]['status']+"\t"+new_status+"\n")
+
+        if(new_stoichiometry != old_stoichiometry):
+            print("Rebuilding reaction :",rxn)
+            ReactionsHelper.rebuildReaction(Reactions_Dict[rxn],new_stoichiometry)
+            Reactions_Dict[rxn]["status"]=new_status
+            if("WB" not in Reactions_Dict[rxn]["notes"]):
+                if(Reactions_Dict[rxn]["notes"]=="" or Reactions_Dict[rxn]["notes"]=="null"):
+                    Reactions_Dict[rxn]["notes"]="WB"
+                else:
+                    Reactions_Dict[rxn]["notes"]+="|WB"
+            Update_Reactions+=1
+
+    return Update_Reactions
+
+def mergeLinkedGroups(canonical_map, lists_dicts, nested_dicts):
+    # Every compound or reaction in a linked group ends up with the
+    # aliases, names and ECs of the whole group. Each group is merged once
+    # with sets, and each member is given its own sorted copy, so that
+    # changing the entries of one member doesn't change the others
+    merged=0
+    for members in canonical_map.groups():
+        for lists_dict in lists_dicts:
+            values=set()
+            for member in members:
+                values.update(lists_dict.get(member,[]))
+            for member in members:
+                lists_dict[member]=sorted(values)
+
+        for nested_dict in nested_dicts:
+            values_dict=dict()
+            for member in members:
+                for source, values in nested_dict.get(member,dict()).items():
+                    if(source not in values_dict):
+                        values_dict[source]=set()
+                    values_dict[source].update(values)
+            for member in members:
+                nested_dict[member]=dict((source, sorted(values)) for source, values in values_dict.items())
+
+        merged+=len(members)
+
+    return merged
+
+def mergeObsoleteCompoundAliases(compounds_dict, cpds_aliases_dict, cpds_names_dict):
+    canonical_map = CanonicalMap(compounds_dict, 'linked_compound')
+    return mergeLinkedGroups(canonical_map, [cpds_names_dict], [cpds_aliases_dict])
+
+def mergeObsoleteReactionAliases(reactions_dict, rxns_aliases_dict, rxns_names_dict, rxns_ecs_dict):
+    canonical_map = CanonicalMap(reactions_dict, 'linked_reaction')
+    return mergeLinkedGroups(canonical_map, [rxns_names_dict, rxns_ecs_dict], [rxns_aliases_dict])
+
+def updateCompoundAliases(Compounds_Dict, Aliases_Dict, Names_Dict, Source_Classes):
+    Update_Compounds=0
+    for cpd in sorted(Compounds_Dict.keys()):
+        if(cpd not in Aliases_Dict):
+            continue
+
+        Cpd_Aliases=dict()
+        Alias_Count=0
+        for source_type in 'Primary Database', 'Secondary Database', 'Published Model':
+            for source in sorted(Aliases_Dict[cpd].keys()):
+
+                if(len(Cpd_Aliases)>4):
+                    break
+
+                if(source == "BiGG1"):
+                    continue
+
+                if(source in Source_Classes[source_type] or source == "BiGG"):
+                    if(source not in Cpd_Aliases):
+                        Cpd_Aliases[source]=dict()
+                    for alias in Aliases_Dict[cpd][source]:
+                        Cpd_Aliases[source][alias]=1
+                        Alias_Count+=1
+
+        Alias_List=list()
+        if(cpd in Names_Dict):
+            name_line="Name: "+"; ".join(sorted(Names_Dict[cpd]))
+            Alias_List.append(name_line)
+
+        for source in sorted(Cpd_Aliases.keys()):
+            source_line=source+": "+"; ".join(sorted(Cpd_Aliases[source].keys()))
+            Alias_List.append(source_line)
+
+        if(len(Alias_List)==0):
+            Alias_List="null"
+
+        if(Compounds_Dict[cpd]['aliases'] != Alias_List):
+            Update_Compounds+=1
+        Compounds_Dict[cpd]['aliases']=Alias_List
+
+    return Update_Compounds
+
+def updateReactionAliases(Reactions_Dict, Aliases_Dict, Names_Dict, ECs_Dict, Pwys_Dict, Source_Classes):
+    Update_Reactions=0
+    for rxn in sorted(Reactions_Dict.keys()):
+        if(rxn not in Aliases_Dict):
+            continue
+
+        Rxn_Source_Aliases=dict()
+        Rxn_Aliases=dict()
+        Alias_Count=0
+        for source_type in 'Primary Database', 'Secondary Database', 'Published Model':
+            for source in sorted(Aliases_Dict[rxn].keys()):
+
+                if(len(Rxn_Source_Aliases)>4):
+                    break
+
+                if(source == "BiGG1"):
+                    continue
+
+                if("KEGG" in source and len(source)>4):
+                    continue
+
+                if(source in Source_Classes[source_type] or source == "BiGG"):
+                    if(source not in Rxn_Source_Aliases):
+                        Rxn_Source_Aliases[source]=dict()
+                    for alias in Aliases_Dict[rxn][source]:
+                        Rxn_Aliases[alias]=1
+
+                        if("Cyc" in source and bool(re.search('.[a-z]$',alias))):
+                            alias=re.sub(".[a-z]$","",alias)
+                        Rxn_Source_Aliases[source][alias]=1
+                        Rxn_Aliases[alias]=1
+
+        Alias_List=list()
+        for source in sorted(Rxn_Source_Aliases.keys()):
+            source_line=source+": "+"; ".join(sorted(Rxn_Source_Aliases[source].keys()))
+            Alias_List.append(source_line)
+
+        if(rxn in Names_Dict):
+            name_list=list()
+            for name in Names_Dict[rxn]:
+                if(name in Rxn_Aliases):
+                    #This happens because often a reaction identifier is used as a name
+                    continue
+
+                name_list.append(name)
+
+            name_line="Name: "+"; ".join(sorted(name_list))
+            Alias_List.append(name_line)
+
+        if(len(Alias_List)==0):
+            Alias_List="null"
+
+        ECs_List=list()
+        if(rxn in ECs_Dict):
+            for ec in sorted(ECs_Dict[rxn]):
+                Rxn_Aliases[ec]=1
+                ECs_List.append(ec)
+
+        if(len(ECs_List)==0):
+            ECs_List="null"
+
+        Pwys_List=list()
+        if(rxn in Pwys_Dict):
+            for biochem in Pwys_Dict[rxn]:
+                pwy_list=list()
+                for pwy in Pwys_Dict[rxn][biochem]:
+                    pwy_list.append(pwy)
+                pwy_string = biochem+": "+"; ".join(pwy_list)
+                Pwys_List.append(pwy_string)
+
+        if(len(Pwys_List)==0):
+            Pwys_List="null"
+
+        if(Reactions_Dict[rxn]['aliases'] != Alias_List or
+           Reactions_Dict[rxn]['ec_numbers'] != ECs_List or
+           Reactions_Dict[rxn]['pathways'] != Pwys_List):
+            Update_Reactions+=1
+        Reactions_Dict[rxn]['aliases']=Alias_List
+        Reactions_Dict[rxn]['ec_numbers']=ECs_List
+        Reactions_Dict[rxn]['pathways']=Pwys_List
+
+    return Update_Reactions
+
+class RefreshDatabase:
+    # Runs all the stages on a single in-memory copy of the database,
+    # and only writes the files once, at the end. Each script saved the
+    # files it changed, and the next script loaded them again, so the
+    # rows a stage saves are re-read from the lines they'd be saved as,
+    # and the changes of a stage that didn't save are dropped, to give
+    # the same files as running the scripts one after the other
+
+    def __init__(self, biochem_root='../../../Biochemistry/'):
+        self.CompoundsHelper = Compounds(biochem_root)
+        self.Compounds_Dict = self.CompoundsHelper.loadCompounds()
+        self.Cpds_Aliases_Dict = self.CompoundsHelper.loadMSAliases()
+        self.Cpds_Names_Dict = self.CompoundsHelper.loadNames()
+
+        self.ReactionsHelper = Reactions(biochem_root, compounds_dict=self.Compounds_Dict)
+        self.Reactions_Dict = self.ReactionsHelper.loadReactions()
+        self.Rxns_Aliases_Dict = self.ReactionsHelper.loadMSAliases()
+        self.Rxns_Names_Dict = self.ReactionsHelper.loadNames()
+        self.Rxns_ECs_Dict = self.ReactionsHelper.loadECs()
+        self.Rxns_Pwys_Dict = self.ReactionsHelper.loadPathways()
+
+        self.Source_Classes = loadSourceClasses(self.CompoundsHelper.BiochemRoot)
+
+        # The line each row was last saved as
+        self.Compound_Lines = dict()
+        for cpd in self.Compounds_Dict:
+            self.Compound_Lines[cpd] = self.CompoundsHelper.formatCompound(self.Compounds_Dict[cpd])
+        self.Reaction_Lines = dict()
+        for rxn in self.Reactions_Dict:
+            self.Reaction_Lines[rxn] = self.ReactionsHelper.formatReaction(self.Reactions_Dict[rxn])
+
+        self.Timings = list()
+
+    @staticmethod
+    def syncRows(rows_dict, rows_lines, format_row, parse_row, headers, saved):
+        for row_id in rows_dict:
+            line = format_row(rows_dict[row_id])
+            if(line == rows_lines[row_id]):
+                continue
+
+            if(saved is True):
+                rows_lines[row_id] = line
+            rows_dict[row_id] = parse_row(parseLine(headers, rows_lines[row_id]))
+
+        # A saved file is sorted, and is read back in that order
+        if(saved is True and list(rows_dict) != sorted(rows_dict)):
+            sorted_rows = [(row_id, rows_dict[row_id]) for row_id in sorted(rows_dict)]
+            rows_dict.clear()
+            rows_dict.update(sorted_rows)
+
+    def syncCompounds(self, saved):
+        self.syncRows(self.Compounds_Dict, self.Compound_Lines,
+                      self.CompoundsHelper.formatCompound, self.CompoundsHelper.parseCompound,
+                      self.CompoundsHelper.Headers, saved)
+
+    def syncReactions(self, saved):
+        self.syncRows(self.Reactions_Dict, self.Reaction_Lines,
+                      self.ReactionsHelper.formatReaction, self.ReactionsHelper.parseReaction,
+                      self.ReactionsHelper.Headers, saved)
+
+    @staticmethod
+    def reloadFile(write_file, read_file, data_dict, *read_args):
+        text_file = io.StringIO(newline=None)
+        write_file(data_dict, text_file)
+        text_file.seek(0)
+        return read_file(text_file, *read_args)
+
+    def runStage(self, stage, function, *args):
+        print(stage)
+        start = time.time()
+        changes = function(*args)
+        self.Timings.append((stage, changes, time.time() - start))
+        return changes
+
+    def run(self):
+        self.Timings = list()
+
+        changes = self.runStage("Rebuild", rebuildReactions,
+                                self.ReactionsHelper, self.Reactions_Dict)
+        self.syncReactions(changes > 0)
+
+        changes = self.runStage("Merge reactions", mergeReactions,
+                                self.ReactionsHelper, self.Reactions_Dict)
+        self.syncReactions(changes > 0)
+
+        with open("Status_Changes.txt", 'w') as status_file:
+            changes = self.runStage("Rebalance", rebalanceReactions,
+                                    self.ReactionsHelper, self.Reactions_Dict, status_file)
+        self.syncReactions(changes > 0)
+
+        with open("Status_Changes_After_Proton_Adjustment.txt", 'w') as status_file:
+            changes = self.runStage("Adjust protons", adjustReactionProtons,
+                                    self.ReactionsHelper, self.Reactions_Dict, status_file)
+        self.syncReactions(changes > 0)
+
+        with open("Status_Changes_After_Water_Adjustment.txt", 'w') as status_file:
+            changes = self.runStage("Adjust water", adjustReactionWater,
+                                    self.ReactionsHelper, self.Reactions_Dict, status_file)
+        self.syncReactions(changes > 0)
+
+        self.runStage("Merge obsolete compound aliases", mergeObsoleteCompoundAliases,
+                      self.Compounds_Dict, self.Cpds_Aliases_Dict, self.Cpds_Names_Dict)
+        self.runStage("Merge obsolete reaction aliases", mergeObsoleteReactionAliases,
+                      self.Reactions_Dict, self.Rxns_Aliases_Dict, self.Rxns_Names_Dict,
+                      self.Rxns_ECs_Dict)
+        self.syncCompounds(True)
+        self.syncReactions(True)
+
+        # The merged aliases are used as they'd be read from the saved files
+        Cpds_Aliases_Dict = self.reloadFile(self.CompoundsHelper.writeAliases,
+                                            self.CompoundsHelper.readMSAliases,
+                                            self.Cpds_Aliases_Dict, [])
+        Cpds_Names_Dict = self.reloadFile(self.CompoundsHelper.writeNames,
+                                          self.CompoundsHelper.readNames,
+                                          self.Cpds_Names_Dict)
+        Rxns_Aliases_Dict = self.reloadFile(self.ReactionsHelper.writeAliases,
+                                            self.ReactionsHelper.readMSAliases,
+                                            self.Rxns_Aliases_Dict, [])
+        Rxns_Names_Dict = self.reloadFile(self.ReactionsHelper.writeNames,
+                                          self.ReactionsHelper.readNames,
+                                          self.Rxns_Names_Dict)
+        Rxns_ECs_Dict = self.reloadFile(self.ReactionsHelper.writeECs,
+                                        self.ReactionsHelper.readECs,
+                                        self.Rxns_ECs_Dict)
+
+        self.runStage("Update compound aliases", updateCompoundAliases,
+                      self.Compounds_Dict, Cpds_Aliases_Dict, Cpds_Names_Dict,
+                      self.Source_Classes)
+        self.runStage("Update reaction aliases", updateReactionAliases,
+                      self.Reactions_Dict, Rxns_Aliases_Dict, Rxns_Names_Dict,
+                      Rxns_ECs_Dict, self.Rxns_Pwys_Dict, self.Source_Classes)
+
+        return self.Timings
+
+    def save(self):
+        start = time.time()
+        self.CompoundsHelper.saveCompounds(self.Compounds_Dict)
+        self.CompoundsHelper.saveNames(self.Cpds_Names_Dict)
+        self.CompoundsHelper.saveAliases(self.Cpds_Aliases_Dict)
+
+        self.ReactionsHelper.saveReactions(self.Reactions_Dict)
+        self.ReactionsHelper.saveNames(self.Rxns_Names_Dict)
+        self.ReactionsHelper.saveAliases(self.Rxns_Aliases_Dict)
+        self.ReactionsHelper.saveECs(self.Rxns_ECs_Dict)
+        self.Timings.append(("Save", None, time.time() - start))
@@ -0,0 +1,90 @@
+import os
+import pickle
+import hashlib
+
+# Version of the snapshot layout, bump it to invalidate existing snapshots
+SNAPSHOT_VERSION = 1
+
+class Snapshot:
+    def __init__(self, source_file, kind):
+
+        # The snapshot is a hidden file that sits next to the file it caches
+        # i.e. Biochemistry/.compounds.tsv.rows.pickle
+        (source_dir, source_name) = os.path.split(source_file)
+        self.SourceFile = source_file
+        self.SnapshotFile = os.path.join(source_dir, '.' + source_name + '.' + kind + '.pickle')
+
+        # The size and modification time are taken before the source is read
+        # so that a change that happens whilst parsing invalidates the snapshot
+        stat = os.stat(source_file)
+        self.Size = stat.st_size
+        self.MTime = stat.st_mtime_ns
+        self.Hash = None
+
+    def contentHash(self):
+        if(self.Hash is None):
+            sha1 = hashlib.sha1()
+            with open(self.SourceFile, 'rb') as fh:
+                for block in iter(lambda: fh.read(1 << 20), b''):
+                    sha1.update(block)
+            self.Hash = sha1.hexdigest()
+        return self.Hash
+
+    def isFresh(self, header):
+        if(header.get('version') != SNAPSHOT_VERSION):
+            return False
+
+        if(header.get('size') != self.Size):
+            return False
+
+        # Same size and modification time is trusted, otherwise
+        # the content hash decides (i.e. after a git checkout)
+        if(header.get('mtime') == self.MTime):
+            return True
+
+        return header.get('hash') == self.contentHash()
+
+    def load(self):
+        if(os.path.isfile(self.SnapshotFile) is False):
+            return None
+
+        try:
+            with open(self.SnapshotFile, 'rb') as fh:
+                header = pickle.load(fh)
+                if(not isinstance(header, dict) or self.isFresh(header) is False):
+                    return None
+                return pickle.load(fh)
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ValueError):
+            # A broken snapshot is simply rebuilt
+            return None
+
+    def header(self):
+        return {'version': SNAPSHOT_VERSION, 'size': self.Size,
+                'mtime': self.MTime, 'hash': self.contentHash()}
+
+    def save(self, data):
+        header = self.header()
+
+        # Don't store a snapshot of a file that changed whilst it was read
+        stat = os.stat(self.SourceFile)
+        if(stat.st_size != self.Size or stat.st_mtime_ns != self.MTime):
+            return False
+
+        return savePickles(self.SnapshotFile, header, data)
+
+def savePickles(pickle_file, *objects):
+    # Written to a temporary file first, so that an interrupted
+    # write never leaves a truncated file behind
+    temp_file = pickle_file + '.' + str(os.getpid()) + '.tmp'
+    try:
+        with open(temp_file, 'wb') as fh:
+            for data in objects:
+                pickle.dump(data, fh, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_file, pickle_file)
+    except OSError:
+        # i.e. a read-only checkout, the file is only an optimization
+        if(os.path.isfile(temp_file)):
+            os.remove(temp_file)
+        return False
+
+    return True
@@ -0,0 +1,155 @@
+from csv import DictReader
+
+# Version of the index layout, bump it whenever the way structures are
+# indexed changes, so that persisted indexes are rebuilt
+STRUCTURE_INDEX_VERSION = 1
+
+# InChIKeys are matched on three levels, the full key, the first two
+# blocks, which ignores the protonation state, and the first block, which
+# ignores stereochemistry too
+InChIKey_Levels = ('full', 'proton-neutral', 'stereo-neutral')
+
+def inchikeyLevels(inchikey):
+    """
+    @param inchikey: InChIKey, i.e. XLYOFNOQVPJJNP-UHFFFAOYSA-N
+    @return: list of the key at each level in InChIKey_Levels,
+    i.e. [XLYOFNOQVPJJNP-UHFFFAOYSA-N, XLYOFNOQVPJJNP-UHFFFAOYSA, XLYOFNOQVPJJNP]
+    """
+    blocks = inchikey.split('-')
+    return [inchikey, "-".join(blocks[0:2]), blocks[0]]
+
+class StructureIndex:
+    """
+    Structures of compounds, and the compounds that have each structure,
+    so that SMILES, InChI and InChIKey are looked up directly. InChIKeys
+    can also be looked up whilst ignoring the protonation state or the
+    stereochemistry. Use Compounds.structureIndex(), which keeps the index
+    in a snapshot of each structure file, rather than building it directly
+    """
+
+    def __init__(self, index_data_list):
+        # The data of each structure file, in the order the files were read
+        if(len(index_data_list) == 1):
+            self.Compounds = index_data_list[0]['compounds']
+            self.Structures = index_data_list[0]['structures']
+            return
+
+        self.Compounds = dict()
+        self.Structures = dict()
+        for index_data in index_data_list:
+            for (cpd, cpd_structures) in index_data['compounds'].items():
+                if(cpd not in self.Compounds):
+                    self.Compounds[cpd] = dict()
+                for (struct_type, structures) in cpd_structures.items():
+                    self.Compounds[cpd].setdefault(struct_type, list())
+                    self.addUnique(self.Compounds[cpd][struct_type], structures)
+
+            for (struct_type, structures_dict) in index_data['structures'].items():
+                if(struct_type not in self.Structures):
+                    self.Structures[struct_type] = dict()
+                for (structure, cpds) in structures_dict.items():
+                    self.Structures[struct_type].setdefault(structure, list())
+                    self.addUnique(self.Structures[struct_type][structure], cpds)
+
+    @staticmethod
+    def addUnique(values, new_values):
+        for value in new_values:
+            if(value not in values):
+                values.append(value)
+
+    @staticmethod
+    def build(struct_file, fields_array, struct_type=None):
+        """
+        @param struct_file: structure file, i.e. Unique_ModelSEED_Structures.txt
+        @param fields_array: columns of the file, which has no header
+        @param struct_type: type of the structures, for files where it
+        isn't given in a 'Source' column, i.e. KEGG/InChIKey_OriginalStrings.txt
+        @return: data of the index, which can be pickled
+        """
+        compounds_dict = dict()
+        structures_dict = dict()
+        reader = DictReader(open(struct_file), dialect = "excel-tab", fieldnames = fields_array)
+        for line in reader:
+            line_type = struct_type
+            if(line_type is None):
+                # The ModelSEED files contain the type of each structure
+                if("cpd" not in line['ID']):
+                    continue
+                line_type = line['Source']
+
+            keys = [(line_type, line['Structure'])]
+            if(line_type == 'InChIKey'):
+                levels = inchikeyLevels(line['Structure'])
+                keys = [(line_type + ':' + level, key) for (level, key) in zip(InChIKey_Levels, levels)]
+
+            if(line['ID'] not in compounds_dict):
+                compounds_dict[line['ID']] = dict()
+            if(line_type not in compounds_dict[line['ID']]):
+                compounds_dict[line['ID']][line_type] = list()
+            if(line['Structure'] not in compounds_dict[line['ID']][line_type]):
+                compounds_dict[line['ID']][line_type].append(line['Structure'])
+
+            for (key_type, key) in keys:
+                if(key_type not in structures_dict):
+                    structures_dict[key_type] = dict()
+                if(key not in structures_dict[key_type]):
+                    structures_dict[key_type][key] = list()
+                if(line['ID'] not in structures_dict[key_type][key]):
+                    structures_dict[key_type][key].append(line['ID'])
+
+        # The compounds that share a structure are listed in the order in
+        # which they first appear in the file, as loadStructures() does
+        positions = dict((cpd, position) for (position, cpd) in enumerate(compounds_dict))
+        for key_type in structures_dict:
+            for cpds in structures_dict[key_type].values():
+                cpds.sort(key=positions.get)
+
+        return {'version': STRUCTURE_INDEX_VERSION,
+                'compounds': compounds_dict,
+                'structures': structures_dict}
+
+    def compoundStructures(self, cpd, struct_type):
+        """
+        @param cpd: compound identifier
+        @param struct_type: SMILE, InChI or InChIKey
+        @return: list of the structures of the compound, in the order of the file
+        """
+        return list(self.Compounds.get(cpd, dict()).get(struct_type, []))
+
+    def compoundsWith(self, struct_type):
+        """
+        @return: list of the compounds that have a structure of the type,
+        in the order of the file
+        """
+        return [cpd for cpd in self.Compounds if struct_type in self.Compounds[cpd]]
+
+    def findCompounds(self, structure, struct_type):
+        """
+        @param structure: SMILES, InChI or full InChIKey
+        @param struct_type: SMILE, InChI or InChIKey
+        @return: list of the compounds with exactly that structure, in the order of the file
+        """
+        if(struct_type == 'InChIKey'):
+            return self.findInChIKey(structure)
+        return list(self.Structures.get(struct_type, dict()).get(structure, []))
+
+    def findInChIKey(self, inchikey, level='full'):
+        """
+        @param inchikey: InChIKey, either full or already truncated to the level
+        @param level: one of InChIKey_Levels
+        @return: list of the compounds with an InChIKey that matches at that level
+        """
+        key = inchikeyLevels(inchikey)[InChIKey_Levels.index(level)]
+        return list(self.Structures.get('InChIKey:' + level, dict()).get(key, []))
+
+    def matchInChIKey(self, inchikey):
+        """
+        @param inchikey: full InChIKey
+        @return: the first level, in the order of InChIKey_Levels, at which any
+        compound matches, and the compounds that match, or (None, [])
+        """
+        for level in InChIKey_Levels:
+            cpds = self.findInChIKey(inchikey, level)
+            if(len(cpds) > 0):
+                return (level, cpds)
+        return (None, [])
@@ -0,0 +1,257 @@
+import os
+from csv import DictReader
+from .Reactions import Reactions
+
+# Version of the matrix layout, bump it whenever the arrays change
+TEMPLATE_MATRIX_VERSION = 1
+
+# The compartments of a template reaction are ordered as they are in
+# TemplateHelper, the index of each compartment in the stoichiometry
+# of the master reaction is its position in this order
+Compartment_Order = ["m", "n", "p", "x", "z", "c", "e"]
+
+# Fluxes are bounded as they are in the template objects
+Max_Flux = 100.0
+
+# Lower and upper bound of each direction, reactions of unknown
+# direction ("?") are left reversible
+Direction_Bounds = {">": (0.0, Max_Flux),
+                    "<": (-Max_Flux, 0.0),
+                    "=": (-Max_Flux, Max_Flux)}
+
+def compartmentRank(compartment):
+    """
+    @param compartment: template compartment, i.e. c or c0
+    @return: position of the compartment in Compartment_Order, the
+    compartments that aren't listed are placed with the organelles
+    """
+    letter = compartment.rstrip("0123456789")
+    if(letter in Compartment_Order):
+        return Compartment_Order.index(letter)
+    return Compartment_Order.index("z")
+
+class Templates:
+    """
+    Exports the model templates in Templates/ as sparse stoichiometric
+    matrices, so that tools which only need the network of a template
+    don't have to expand the master reactions one at a time
+    """
+
+    def __init__(self, templates_root='../../../Templates/',
+                 biochem_root='../../../Biochemistry/', rxns_dict=None):
+
+        self.TemplatesRoot = os.path.dirname(__file__)+'/'+templates_root
+        self.ReactionsHelper = Reactions(biochem_root)
+
+        # The master reactions are only loaded when first needed, and then
+        # shared by every template that is exported
+        self.Loaded_Reactions_Dict = rxns_dict
+
+    @property
+    def Reactions_Dict(self):
+        if(self.Loaded_Reactions_Dict is None):
+            self.Loaded_Reactions_Dict = self.ReactionsHelper.loadReactions()
+        return self.Loaded_Reactions_Dict
+
+    def listTemplates(self):
+        """
+        @return: sorted list of the templates, i.e. [Core, Fungi, ...]
+        """
+        return sorted(entry for entry in os.listdir(self.TemplatesRoot)
+                      if os.path.isfile(os.path.join(self.TemplatesRoot, entry, 'Reactions.tsv')))
+
+    def loadCompartments(self, template):
+        """
+        @param template: name of the template, i.e. GramNegative
+        @return: list of the identifiers of its compartments
+        """
+        compartments_file = os.path.join(self.TemplatesRoot, template, 'Compartments.tsv')
+        reader = DictReader(open(compartments_file), dialect='excel-tab')
+        return [line['id'] for line in reader]
+
+    def loadTemplateReactions(self, template):
+        """
+        @param template: name of the template, i.e. GramNegative
+        @return: list of the rows of its Reactions.tsv, in the order of the file
+        """
+        reactions_file = os.path.join(self.TemplatesRoot, template, 'Reactions.tsv')
+        reader = DictReader(open(reactions_file), dialect='excel-tab')
+        return [line for line in reader]
+
+    def masterReaction(self, rxn):
+        # Obsolete reactions are replaced by the first of their linked
+        # reactions that isn't obsolete, as they are in TemplateHelper
+        if(rxn not in self.Reactions_Dict):
+            raise ValueError("Reaction " + rxn + " not found in master biochemistry")
+
+        rxn_dict = self.Reactions_Dict[rxn]
+        if(rxn_dict['is_obsolete'] != 1):
+            return rxn_dict
+
+        if(rxn_dict['linked_reaction'] != 'null'):
+            for linked_rxn in rxn_dict['linked_reaction'].split(';'):
+                if(linked_rxn not in self.Reactions_Dict):
+                    raise ValueError("Reaction " + rxn + " is obsolete and replacement " + linked_rxn + " not found")
+                if(self.Reactions_Dict[linked_rxn]['is_obsolete'] != 1):
+                    return self.Reactions_Dict[linked_rxn]
+
+        raise ValueError("Reaction " + rxn + " is obsolete and has no replacement that isn't obsolete")
+
+    def buildMatrix(self, template):
+        """
+        @param template: name of the template, i.e. GramNegative
+        @return: dictionary of the arrays of the template: a SciPy CSR
+        'matrix' of compartment compounds (rows) by template reactions
+        (columns), the identifiers of the 'compounds' (i.e. cpd00001_c)
+        and 'reactions' (i.e. rxn00001_c), the 'types' of the reactions,
+        their 'lower_bounds' and 'upper_bounds' from their direction,
+        the 'gapfill_lower_bounds' and 'gapfill_upper_bounds' from their
+        gapfilling direction, and their 'base_costs', 'forward_costs'
+        and 'reverse_costs'
+        """
+        import numpy
+        from scipy.sparse import coo_matrix
+
+        template_compartments = set(self.loadCompartments(template))
+
+        reactions = list()
+        reactions_set = set()
+        types = list()
+        bounds = list()
+        gapfill_bounds = list()
+        costs = list()
+
+        compound_indices = dict()
+        rows = list()
+        columns = list()
+        coefficients = list()
+
+        for line in self.loadTemplateReactions(template):
+            compartments = sorted(line['compartment'].split('|'), key=compartmentRank)
+            for compartment in compartments:
+                if(compartment not in template_compartments):
+                    raise ValueError("Compartment " + compartment + " of reaction " + line['id'] + " not found in template " + template)
+
+            rxn_id = line['id'] + "_" + compartments[0]
+            if(rxn_id in reactions_set):
+                raise ValueError("Reaction " + rxn_id + " is a duplicate in template " + template)
+
+            column = len(reactions)
+            reactions.append(rxn_id)
+            reactions_set.add(rxn_id)
+            types.append(line['type'])
+
+            direction_bounds = Direction_Bounds.get(line['direction'], Direction_Bounds["="])
+            bounds.append(direction_bounds)
+
+            # Without a gapfilling direction, gapfilling can't open
+            # the reaction any further than its direction does
+            gapfill_bounds.append(Direction_Bounds.get(line['gfdir'], direction_bounds))
+
+            costs.append(tuple(float(line[cost]) if line[cost] != 'null' else default
+                               for (cost, default) in (('base_cost', 1.0), ('forward_cost', 0.0), ('reverse_cost', 0.0))))
+
+            stoichiometry = self.masterReaction(line['id'])['stoichiometry']
+            if(stoichiometry == "" or stoichiometry == "null"):
+                continue
+
+            for rgt in stoichiometry.split(";"):
+                (coeff, cpd, cpt) = rgt.split(":", 4)[0:3]
+                cpt = int(cpt)
+                if(cpt >= len(compartments)):
+                    raise ValueError("Reaction " + line['id'] + " has compartment " + str(cpt) + " but template " + template + " only lists " + line['compartment'])
+
+                cpd_id = cpd + "_" + compartments[cpt]
+                if(cpd_id not in compound_indices):
+                    compound_indices[cpd_id] = len(compound_indices)
+                rows.append(compound_indices[cpd_id])
+                columns.append(column)
+                coefficients.append(float(coeff))
+
+        # The compounds are sorted so that the rows don't depend on
+        # the order of the reactions
+        compounds = sorted(compound_indices)
+        positions = numpy.empty(len(compounds), dtype=numpy.int64)
+        for (position, cpd_id) in enumerate(compounds):
+            positions[compound_indices[cpd_id]] = position
+
+        # Compounds found on both sides of a reaction are summed
+        matrix = coo_matrix((numpy.array(coefficients, dtype=numpy.float64),
+                             (positions[numpy.array(rows, dtype=numpy.int64)],
+                              numpy.array(columns, dtype=numpy.int64))),
+                            shape=(len(compounds), len(reactions))).tocsr()
+        matrix.sum_duplicates()
+        matrix.eliminate_zeros()
+
+        bounds = numpy.array(bounds, dtype=numpy.float64).reshape(-1, 2)
+        gapfill_bounds = numpy.array(gapfill_bounds, dtype=numpy.float64).reshape(-1, 2)
+        costs = numpy.array(costs, dtype=numpy.float64).reshape(-1, 3)
+
+        return {'matrix': matrix,
+                'compounds': numpy.array(compounds, dtype=str),
+                'reactions': numpy.array(reactions, dtype=str),
+                'types': numpy.array(types, dtype=str),
+                'lower_bounds': bounds[:, 0],
+                'upper_bounds': bounds[:, 1],
+                'gapfill_lower_bounds': gapfill_bounds[:, 0],
+                'gapfill_upper_bounds': gapfill_bounds[:, 1],
+                'base_costs': costs[:, 0],
+                'forward_costs': costs[:, 1],
+                'reverse_costs': costs[:, 2]}
+
+    @staticmethod
+    def saveMatrix(matrix_dict, npz_file):
+        """
+        @param matrix_dict: dictionary returned by buildMatrix()
+        @param npz_file: file to write, the arrays are stored uncompressed
+        so that they are loaded without being decoded
+        """
+        import numpy
+
+        arrays = dict((key, value) for (key, value) in matrix_dict.items() if key != 'matrix')
+        matrix = matrix_dict['matrix']
+        arrays['data'] = matrix.data
+        arrays['indices'] = matrix.indices
+        arrays['indptr'] = matrix.indptr
+        arrays['shape'] = numpy.array(matrix.shape, dtype=numpy.int64)
+        arrays['version'] = numpy.array(TEMPLATE_MATRIX_VERSION)
+
+        # The file is replaced at once, numpy.savez() appends .npz to
+        # file names that don't have it, so the temporary file has it too
+        temp_file = npz_file + '.' + str(os.getpid()) + '.tmp.npz'
+        try:
+            numpy.savez(temp_file, **arrays)
+            os.replace(temp_file, npz_file)
+        except BaseException:
+            if(os.path.isfile(temp_file)):
+                os.remove(temp_file)
+            raise
+
+    @staticmethod
+    def loadMatrix(npz_file):
+        """
+        @param npz_file: file written by saveMatrix()
+        @return: dictionary of the arrays, as returned by buildMatrix()
+        """
+        import numpy
+        from scipy.sparse import csr_matrix
+
+        with numpy.load(npz_file, allow_pickle=False) as npz:
+            if(int(npz['version']) != TEMPLATE_MATRIX_VERSION):
+                raise ValueError("Template matrix " + npz_file + " has version " + str(npz['version']))
+
+            matrix_dict = dict((key, npz[key]) for key in npz.files
+                               if key not in ('data', 'indices', 'indptr', 'shape', 'version'))
+            matrix_dict['matrix'] = csr_matrix((npz['data'], npz['indices'], npz['indptr']),
+                                               shape=tuple(npz['shape']))
+        return matrix_dict
+
+    def exportTemplate(self, template, npz_file):
+        """
+        @param template: name of the template, i.e. GramNegative
+        @param npz_file: file to write
+        @return: dictionary returned by buildMatrix()
+        """
+        matrix_dict = self.buildMatrix(template)
+        self.saveMatrix(matrix_dict, npz_file)
+        return matrix_dict
@@ -0,0 +1,221 @@
+from math import log
+
+# Constants, the energies are in kcal/mol
+TEMPERATURE = 298.15
+GAS_CONSTANT = 0.0019858775
+RT_CONST = TEMPERATURE*GAS_CONSTANT
+
+# The range of intracellular concentrations, and the concentration at
+# which a compound is fixed, in M: (min, max, fixed)
+Default_Concentrations = (0.00001, 0.02, 0.001)
+
+# The energy of a reaction that can't be estimated
+Missing_Energy = 10000000
+
+class Thermodynamics:
+    """
+    Estimates the range of the Gibbs free energy of every reaction over the
+    concentrations of its reagents at once, from a reaction x reagent matrix
+    of coefficients and the logarithms of the concentrations of the reagents
+    """
+
+    def __init__(self, compartment_concentrations=dict(), compound_concentrations=dict(),
+                 default_concentrations=Default_Concentrations):
+        """
+        @param compartment_concentrations: (min, max, fixed) concentrations of
+        the compounds in a compartment, by the index of the compartment in the
+        stoichiometry, i.e. {1: (0.0001, 0.1, 0.01)}
+        @param compound_concentrations: (min, max, fixed) concentrations of a
+        compound in any compartment, these take precedence over those of the
+        compartment, i.e. {'cpd00011': (0.00001, 0.02, 0.0001)}
+        @param default_concentrations: (min, max, fixed) concentrations of
+        every other compound
+        """
+        self.Compartment_Concentrations = dict(compartment_concentrations)
+        self.Compound_Concentrations = dict(compound_concentrations)
+        self.Default_Concentrations = default_concentrations
+
+    def concentrations(self, cpd, cpt):
+        """
+        @param cpd: compound, i.e. cpd00011
+        @param cpt: index of the compartment in the stoichiometry, i.e. 0
+        @return: (min, max, fixed) concentrations of the compound
+        """
+        if(cpd in self.Compound_Concentrations):
+            return self.Compound_Concentrations[cpd]
+        if(cpt in self.Compartment_Concentrations):
+            return self.Compartment_Concentrations[cpt]
+        return self.Default_Concentrations
+
+    def buildMatrix(self, rxns_dict):
+        """
+        @param rxns_dict: reactions, as returned by loadReactions()
+        @return: dictionary of the sorted 'reactions', the 'reagents' as
+        (compound, compartment) tuples, the reaction x reagent 'matrix' of
+        coefficients and its 'products' and 'reactants' apart, the sorted
+        'compounds', and the reaction x compound 'compound_matrix' of
+        coefficients summed across compartments and 'compartment_matrix'
+        of the number of compartments the compound is in
+        """
+        from scipy.sparse import csr_matrix
+
+        reactions = sorted(rxns_dict)
+        reagent_indices = dict()
+        compounds = set()
+
+        # The reagents of each reaction are kept in the order of the
+        # stoichiometry, so that the sums in the matrix products are done
+        # in the same order as adding one reagent at a time
+        stoich_indptr = [0]
+        stoich_indices = list()
+        stoich_data = list()
+        rxns_cpds = list()
+        for rxn in reactions:
+            rxn_cpds = dict()
+            if(rxns_dict[rxn]['stoichiometry'] != ""):
+                for rgt in rxns_dict[rxn]['stoichiometry'].split(';'):
+                    (coeff, cpd, cpt, index, name) = rgt.split(":", 4)
+                    coeff = float(coeff)
+                    reagent = (cpd, int(cpt))
+
+                    if(reagent not in reagent_indices):
+                        reagent_indices[reagent] = len(reagent_indices)
+                    stoich_indices.append(reagent_indices[reagent])
+                    stoich_data.append(coeff)
+
+                    if(cpd not in rxn_cpds):
+                        rxn_cpds[cpd] = [0.0, 0]
+                    rxn_cpds[cpd][0] += coeff
+                    rxn_cpds[cpd][1] += 1
+                    compounds.add(cpd)
+
+            stoich_indptr.append(len(stoich_indices))
+            rxns_cpds.append(rxn_cpds)
+
+        compounds = sorted(compounds)
+        compound_indices = dict((cpd, index) for (index, cpd) in enumerate(compounds))
+        cpd_indptr = [0]
+        cpd_indices = list()
+        cpd_data = list()
+        cpt_data = list()
+        for rxn_cpds in rxns_cpds:
+            for cpd in sorted(rxn_cpds):
+                cpd_indices.append(compound_indices[cpd])
+                cpd_data.append(rxn_cpds[cpd][0])
+                cpt_data.append(rxn_cpds[cpd][1])
+            cpd_indptr.append(len(cpd_indices))
+
+        shape = (len(reactions), len(reagent_indices))
+        products_data = [coeff if coeff > 0 else 0.0 for coeff in stoich_data]
+        reactants_data = [coeff if coeff < 0 else 0.0 for coeff in stoich_data]
+
+        matrix_dict = dict()
+        matrix_dict['reactions'] = reactions
+        matrix_dict['reagents'] = sorted(reagent_indices, key=reagent_indices.get)
+        matrix_dict['matrix'] = csr_matrix((stoich_data, stoich_indices, stoich_indptr), shape=shape)
+        matrix_dict['products'] = csr_matrix((products_data, stoich_indices, stoich_indptr), shape=shape)
+        matrix_dict['reactants'] = csr_matrix((reactants_data, stoich_indices, stoich_indptr), shape=shape)
+        matrix_dict['compounds'] = compounds
+
+        shape = (len(reactions), len(compounds))
+        matrix_dict['compound_matrix'] = csr_matrix((cpd_data, cpd_indices, cpd_indptr), shape=shape)
+        matrix_dict['compartment_matrix'] = csr_matrix((cpt_data, cpd_indices, cpd_indptr), shape=shape)
+        return matrix_dict
+
+    def logConcentrations(self, reagents):
+        """
+        @param reagents: list of (compound, compartment) tuples
+        @return: tuple of arrays of the logarithm of the min, max and fixed
+        concentrations of each reagent
+        """
+        import numpy
+
+        log_concs = numpy.empty((3, len(reagents)))
+        for (index, (cpd, cpt)) in enumerate(reagents):
+            (cpt_min, cpt_max, cpt_conc) = self.concentrations(cpd, cpt)
+            log_concs[:, index] = (log(cpt_min), log(cpt_max), log(cpt_conc))
+        return (log_concs[0], log_concs[1], log_concs[2])
+
+    def estimateEnergies(self, rxns_dict, matrix_dict=None):
+        """
+        @param rxns_dict: reactions, as returned by loadReactions()
+        @param matrix_dict: optional matrices, as returned by buildMatrix()
+        @return: dictionary of arrays, in the order of the reactions in the
+        matrices, of the 'min' and 'max' Gibbs free energy of each reaction,
+        given the error of its energy and the range of the concentrations,
+        and of its energy at the 'fixed' concentrations. These are nan for
+        the reactions whose energy is unknown
+        """
+        import numpy
+
+        if(matrix_dict is None):
+            matrix_dict = self.buildMatrix(rxns_dict)
+
+        deltag = numpy.full(len(matrix_dict['reactions']), numpy.nan)
+        deltagerr = numpy.full(len(matrix_dict['reactions']), numpy.nan)
+        for (index, rxn) in enumerate(matrix_dict['reactions']):
+            rxn_dg = rxns_dict[rxn]['deltag']
+            if(rxn_dg is None or rxn_dg == Missing_Energy):
+                continue
+            deltag[index] = rxn_dg
+            deltagerr[index] = rxns_dict[rxn]['deltagerr']
+
+        (log_min, log_max, log_conc) = self.logConcentrations(matrix_dict['reagents'])
+
+        # The energy is highest with the most products and the fewest
+        # reactants, and lowest the other way around
+        pdt_min = matrix_dict['products'] @ log_min
+        pdt_max = matrix_dict['products'] @ log_max
+        rct_min = matrix_dict['reactants'] @ log_min
+        rct_max = matrix_dict['reactants'] @ log_max
+
+        energies_dict = dict()
+        energies_dict['max'] = (deltag + deltagerr) + ((RT_CONST*pdt_max) + (RT_CONST*rct_min))
+        energies_dict['min'] = (deltag - deltagerr) + ((RT_CONST*pdt_min) + (RT_CONST*rct_max))
+        energies_dict['fixed'] = deltag + (RT_CONST*(matrix_dict['matrix'] @ log_conc))
+        return energies_dict
+
+    @staticmethod
+    def reactionEnergies(matrix_dict, cpds_energies):
+        """
+        @param matrix_dict: matrices, as returned by buildMatrix()
+        @param cpds_energies: dictionary of the (deltag, deltagerr) of each
+        compound with an energy, i.e. {'cpd00001': (-56.69, 0.5)}
+        @return: dictionary of arrays, in the order of the reactions in the
+        matrices, of the 'deltag' of each reaction, summed from its reagents,
+        and its 'deltagerr', the root of the sum of the squared errors, and
+        of the number of reagents 'missing' an energy, the energy and error
+        of a reaction are only meaningful where none are missing
+        """
+        import numpy
+        from scipy.sparse import csr_matrix
+
+        # The energy and error of each reagent, and whether it's missing
+        reagents = matrix_dict['reagents']
+        rgt_deltag = numpy.zeros(len(reagents))
+        rgt_deltagerr = numpy.zeros(len(reagents))
+        rgt_missing = numpy.zeros(len(reagents))
+        for (index, (cpd, cpt)) in enumerate(reagents):
+            if(cpd in cpds_energies):
+                (rgt_deltag[index], rgt_deltagerr[index]) = cpds_energies[cpd]
+            else:
+                rgt_missing[index] = 1.0
+
+        # The errors are squared before they're summed, so they're weighted
+        # by the coefficients in a matrix with the same layout, which keeps
+        # the sums in the order of the stoichiometry
+        matrix = matrix_dict['matrix']
+        error_data = (rgt_deltagerr[matrix.indices] * matrix.data)**2
+        error_matrix = csr_matrix((error_data, matrix.indices, matrix.indptr), shape=matrix.shape)
+        reagent_matrix = csr_matrix((numpy.ones(len(matrix.data)), matrix.indices, matrix.indptr), shape=matrix.shape)
+
+        # The root of each sum is taken with pow(), as it was when the errors
+        # were summed one reagent at a time, numpy takes the square root of
+        # an array with sqrt(), which can differ from it in the last digit
+        error_sums = error_matrix @ numpy.ones(len(reagents))
+
+        energies_dict = dict()
+        energies_dict['deltag'] = matrix @ rgt_deltag
+        energies_dict['deltagerr'] = numpy.array([float(error_sum)**0.5 for error_sum in error_sums])
+        energies_dict['missing'] = (reagent_matrix @ rgt_missing).astype(int)
+        return energies_dict
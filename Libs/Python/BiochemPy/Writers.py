@@ -0,0 +1,161 @@
+import os
+import json
+import pickle
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from .Snapshots import savePickles
+
+# Saving compounds.json and reactions.json with a single
+# json.dumps(list, indent=4, sort_keys=True) is slow, and holds the
+# whole text in memory. Here the same text is written one record at a
+# time, and the records that didn't change are copied from the old file
+
+def formatRecord(record):
+    # The text of a record as it appears in the indented list
+    record_text = json.dumps(record, indent=4, sort_keys=True)
+    return "    " + record_text.replace("\n", "\n    ")
+
+def hashRecord(record):
+    # The compact encoding is done in C, and is several times faster than
+    # the indented one, two records with the same compact encoding also
+    # have the same indented encoding
+    record_text = json.dumps(record, sort_keys=True)
+    return hashlib.blake2b(record_text.encode('utf-8'), digest_size=16).digest()
+
+def readRecords(json_file):
+    # Yields the text of each record in a file written by writeJSON()
+    # one at a time, the file is read in blocks
+    separator = "\n    },\n    {\n"
+    with open(json_file) as fh:
+        if(fh.read(2) != "[\n"):
+            return
+
+        text = ""
+        for block in iter(lambda: fh.read(1 << 20), ""):
+            records = (text + block).split(separator)
+            text = records.pop()
+            for record_text in records:
+                # The brackets between records are part of the separator
+                if(not record_text.startswith("    {\n")):
+                    record_text = "    {\n" + record_text
+                yield record_text + "\n    }"
+
+        if(not text.startswith("    {\n")):
+            text = "    {\n" + text
+        yield text[:-len("\n]")]
+
+def writeJSON(json_file, records, newline=None):
+    # Records have to be sorted by id. Returns False if the file was
+    # already up to date, in which case it isn't written at all
+    records = list(records)
+    records_hashes = [(record.get('id'), hashRecord(record)) for record in records]
+
+    # Hashes of the records in the file, from when it was last written
+    hashes_file = os.path.join(os.path.dirname(json_file), '.' + os.path.basename(json_file) + '.records.pickle')
+    old_hashes = loadHashes(json_file, hashes_file)
+    if(old_hashes == records_hashes):
+        return False
+
+    old_records = iter(())
+    if(old_hashes is not None):
+        old_records = readRecords(json_file)
+    old_positions = dict((entry, position) for position, entry in enumerate(old_hashes or []))
+    old_position = -1
+    old_record = None
+
+    def writeRecords(fh):
+        nonlocal old_position, old_record
+        for index, record in enumerate(records):
+            # Unchanged records are copied from the old file, both are
+            # in the same order, so the old file is only read once
+            record_text = None
+            position = old_positions.get(records_hashes[index])
+            if(position is not None and position > old_position):
+                while(old_position < position):
+                    old_record = next(old_records)
+                    old_position += 1
+                record_text = old_record
+            else:
+                record_text = formatRecord(record)
+
+            fh.write(("[\n" if index == 0 else ",\n") + record_text)
+
+        fh.write("\n]" if len(records) > 0 else "[]")
+
+    replaceFile(json_file, writeRecords, newline=newline)
+
+    stat = os.stat(json_file)
+    savePickles(hashes_file, {'size': stat.st_size, 'mtime': stat.st_mtime_ns}, records_hashes)
+    return True
+
+def loadHashes(json_file, hashes_file):
+    # The hashes are only used if the file hasn't changed since
+    if(os.path.isfile(json_file) is False or os.path.isfile(hashes_file) is False):
+        return None
+
+    stat = os.stat(json_file)
+    try:
+        with open(hashes_file, 'rb') as fh:
+            header = pickle.load(fh)
+            if(header != {'size': stat.st_size, 'mtime': stat.st_mtime_ns}):
+                return None
+            return pickle.load(fh)
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ValueError):
+        return None
+
+def writeTSV(tsv_file, lines):
+    # The file is left untouched if it already has the same lines,
+    # so that its snapshot stays valid. Returns False if it was
+    if(os.path.isfile(tsv_file)):
+        with open(tsv_file) as fh:
+            for line in lines:
+                if(fh.readline() != line + "\n"):
+                    break
+            else:
+                if(fh.readline() == ""):
+                    return False
+
+    def writeLines(fh):
+        for line in lines:
+            fh.write(line + "\n")
+
+    replaceFile(tsv_file, writeLines)
+    return True
+
+def replaceFile(file_name, write_function, newline=None):
+    # The content is written to a temporary file in the same directory
+    # which then replaces the file, so an interrupted save never leaves
+    # a half-written file behind
+    temp_file = file_name + '.' + str(os.getpid()) + '.tmp'
+    try:
+        with open(temp_file, 'w', newline=newline) as fh:
+            write_function(fh)
+        os.replace(temp_file, file_name)
+    except BaseException:
+        if(os.path.isfile(temp_file)):
+            os.remove(temp_file)
+        raise
+
+def writeFiles(tsv_file, lines, json_file, records, newline=None):
+    # Writes the TSV on a separate thread while the JSON is written,
+    # from lines formatted beforehand. Returns whether each file was written
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        tsv_future = executor.submit(writeTSV, tsv_file, lines)
+        json_written = writeJSON(json_file, records, newline=newline)
+        return (tsv_future.result(), json_written)
+
+def jsonRecords(rows_dict):
+    # "null" is saved as None in the JSON files. The rows are converted
+    # in copies, as the rows themselves may be shared with other helpers
+    # (see Compounds.sharedCompounds()) which still expect "null"
+    for row_id in sorted(rows_dict):
+        row_obj = dict(rows_dict[row_id])
+        for key in row_obj:
+            if(isinstance(row_obj[key],dict)):
+                row_obj[key] = dict(row_obj[key])
+                for entry in row_obj[key]:
+                    if(row_obj[key][entry]=="null"):
+                        row_obj[key][entry]=None
+            if(row_obj[key]=="null"):
+                row_obj[key]=None
+        yield row_obj
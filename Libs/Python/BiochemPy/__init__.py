@@ -1,2 +1,6 @@
 from .Reactions import Reactions
 from .Compounds import Compounds
+from .LazyTables import LazyCompounds, LazyReactions
+from .Templates import Templates
+from .OntologyGraph import OntologyGraph
+from .Thermodynamics import Thermodynamics
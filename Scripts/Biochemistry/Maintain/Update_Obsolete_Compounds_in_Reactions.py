@@ -12,6 +12,17 @@ from BiochemPy import Reactions, Compounds
 compounds_helper = Compounds()
 compounds_dict = compounds_helper.loadCompounds()
 
+# The replacement of each obsolete compound is resolved once
+canonical_map = compounds_helper.canonicalMap(compounds_dict)
+
+# The replacement is the lowest of the linked compounds that aren't obsolete,
+# and only where every linked compound is obsolete are their links followed
+def replacementCompound(cpd):
+    current_links = [link for link in canonical_map.links(cpd) if canonical_map.canonical(link) == link]
+    if(len(current_links) > 0):
+        return min(current_links)
+    return canonical_map.canonical(cpd)
+
 reactions_helper = Reactions()
 reactions_dict = reactions_helper.loadReactions()
 
@@ -22,11 +33,10 @@ for rxn in reactions_dict:
 
     for cpd in reactions_dict[rxn]['compound_ids'].split(';'):
         if(compounds_dict[cpd]['is_obsolete'] == 1):
-            if(compounds_dict[cpd]['linked_compound'] == 'null'):
+            lnkd_cpd = replacementCompound(cpd)
+            if(lnkd_cpd is None):
                 print("Warning: missing linked compound for obsolete compound: "+cpd)
                 continue
-            
-            lnkd_cpd = sorted(compounds_dict[cpd]['linked_compound'].split(';'))[0]
 
             # Replace cpd with lnkd_cpd in reaction fields:
             # code, compound_ids, equation, stoichiometry
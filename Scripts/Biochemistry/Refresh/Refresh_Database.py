@@ -0,0 +1,15 @@
+#!/usr/bin/env python
+import time
+from BiochemPy.Refresh import RefreshDatabase
+
+# Same as Refresh_Database.sh, but the database is loaded and saved once
+print(time.ctime())
+refresh = RefreshDatabase()
+refresh.run()
+refresh.save()
+
+print("Stage\tChanges\tSeconds")
+for (stage, changes, seconds) in refresh.Timings:
+    print("\t".join([stage, "-" if changes is None else str(changes), "{0:.2f}".format(seconds)]))
+print("Refresh complete: use git diff to observe changes")
+print(time.ctime())
@@ -14,17 +14,14 @@ compounds_helper = Compounds()
 compounds_dict = compounds_helper.loadCompounds()
 
 names_dict = compounds_helper.loadNames()
-searchnames_dict = dict()
 all_names_dict = dict()
 new_name_count = dict()
 for msid in sorted(names_dict):
     for name in names_dict[msid]:
         all_names_dict[name]=1
 
-        searchname = compounds_helper.searchname(name)
-        #Avoid redundancy where possible
-        if(searchname not in searchnames_dict):
-            searchnames_dict[searchname]=msid
+#The searchnames of existing names are kept in an index
+name_index = compounds_helper.nameIndex()
 
 original_alias_dict=compounds_helper.loadMSAliases()
 source_alias_dict = dict()
@@ -167,9 +164,10 @@ with open(Biochem_Root+Biochem+"_Compounds.tbl") as fh:
         elif(matched_cpd is None):
             msids=dict()
             for name in cpd['NAMES'].split('|'):
-                searchname = compounds_helper.searchname(name)
-                if(searchname in searchnames_dict):
-                    msids[searchnames_dict[searchname]]=1
+                #Avoid redundancy where possible, using the first compound with the name
+                searchname_msids = name_index.exactMatch(compounds_helper.searchname(name))
+                if(len(searchname_msids)>0):
+                    msids[searchname_msids[0]]=1
             msids=list(sorted(msids))
             if(len(msids)>0):
                 matched_cpd=msids[0]
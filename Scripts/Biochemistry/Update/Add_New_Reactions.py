@@ -13,7 +13,7 @@ from BiochemPy import Reactions, Compounds, InChIs
 
 compounds_helper = Compounds()
 compounds_dict = compounds_helper.loadCompounds()
-reactions_helper = Reactions()
+reactions_helper = Reactions(compounds_dict=compounds_dict)
 reactions_dict = reactions_helper.loadReactions()
 reactions_codes = reactions_helper.generateCodes(reactions_dict)
 
@@ -24,16 +24,7 @@ Default_Rxn = {"id":"cpd00001","name":"null","abbreviation":"null","aliases":"nu
                "abstract_reaction":"null","pathways":"null","ec_numbers":"null",
                "compound_ids":"null","linked_reaction":"null","notes":"null","source":""}
 
-Compounds_Alias_Dict=compounds_helper.loadMSAliases()
-Source_Alias_Dict = dict()
-for msid in Compounds_Alias_Dict:
-    for source in Compounds_Alias_Dict[msid]:
-        if(source not in Source_Alias_Dict):
-            Source_Alias_Dict[source]=dict()
-        for alias in Compounds_Alias_Dict[msid][source]:
-            if(alias not in Source_Alias_Dict[source]):
-                Source_Alias_Dict[source][alias]=list()
-            Source_Alias_Dict[source][alias].append(msid)
+Source_Alias_Dict = compounds_helper.loadSourceAliases()
 
 Original_Alias_Dict=reactions_helper.loadMSAliases()
 New_Alias_Count=dict()
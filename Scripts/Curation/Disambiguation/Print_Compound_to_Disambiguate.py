@@ -55,10 +55,11 @@ Disambiguation_Object['metadata']['date_time']=time_str
 # Collect compound data
 #
 ##########################################################
-from BiochemPy import Reactions, Compounds
+from BiochemPy import Reactions, Compounds, LazyCompounds
 
+#Only a handful of compounds are looked up, so they're read on demand
 compounds_helper = Compounds()
-compounds_dict = compounds_helper.loadCompounds()
+compounds_dict = LazyCompounds()
 
 if(disambiguating_cpd not in compounds_dict):
     print("Error: compound "+disambiguating_cpd+" is not found in the ModelSEED database")
@@ -18,16 +18,7 @@ sys.path.append('../../Libs/Python')
 from BiochemPy import Reactions, Compounds, InChIs
 
 compounds_helper = Compounds()
-Compounds_Alias_Dict=compounds_helper.loadMSAliases()
-Source_Alias_Dict = dict()
-for msid in Compounds_Alias_Dict:
-    for source in Compounds_Alias_Dict[msid]:
-        if(source not in Source_Alias_Dict):
-            Source_Alias_Dict[source]=dict()
-        for alias in Compounds_Alias_Dict[msid][source]:
-            if(alias not in Source_Alias_Dict[source]):
-                Source_Alias_Dict[source][alias]=list()
-            Source_Alias_Dict[source][alias].append(msid)
+Source_Alias_Dict = compounds_helper.loadSourceAliases()
 
 #Check compound source
 if(args.compound_source != "ModelSEED" and args.compound_source not in Source_Alias_Dict):
@@ -1,54 +1,41 @@
 #!/usr/bin/env python
-from BiochemPy import Reactions
-from csv import DictReader
+from BiochemPy import Reactions, OntologyGraph
+import os
 import sys
+import time
+import multiprocessing
 
 ONTOLOGY_FILE  = 'Ontology_Donors.tsv'
 
+# Optional limit on the number of combinations of replacements tried for each reaction
+MAX_COMBINATIONS = None
+
 # The ontology file really needs just two columns with the headers 'from' and 'to'
 # Its important to note that the 'from' column must contain the parent (and more generic) metabolite
 # and the 'to' column contains the child (and more specific/characterized) metabolite
-reader = DictReader(open(ONTOLOGY_FILE), dialect='excel-tab')
-compounds_dict = dict()
-compounds_ft_dict = dict()
-for edge in reader:
-    if(edge['to'] not in compounds_dict):
-        compounds_dict[edge['to']]=set()
-    compounds_dict[edge['to']].add(edge['from'])
-
-# Recursive function for going down through n layers of ontological links
-def traverse_ontological_network(node, cpd_dict, neighbor_list):
-    for neighbor in cpd_dict[node]:
-        if(neighbor not in neighbor_list):
-            neighbor_list.add(neighbor)
-        if(neighbor in cpd_dict):
-            traverse_ontological_network(neighbor, cpd_dict, neighbor_list)
-
-# We iterate through the compounds, and create lists of all their generic parents
+ontology_graph = OntologyGraph.load(ONTOLOGY_FILE)
+for cycle in ontology_graph.cycles():
+    print("Warning: cycle in "+ONTOLOGY_FILE+": "+";".join(cycle))
+
+# We find, for each compound, all of its generic parents
 # Doesn't have to be their immediate parent.
 # We do this as we want to explore all possible links between generic and specific reactions
-child_parent_sets = dict()
-for child in compounds_dict:
-    parents_list=set()
-    traverse_ontological_network(child, compounds_dict, parents_list)
-    child_parent_sets[child]=parents_list
+child_parent_sets = ontology_graph.ancestorSets()
 
 # load reactions and their codes for matching
 reactions_helper = Reactions()
 reactions_dict = reactions_helper.loadReactions()
 reactions_codes = reactions_helper.generateCodes(reactions_dict)
 
-(file_stub,suffix) = ONTOLOGY_FILE.rsplit('.', 1)
-result_file='.'.join([file_stub,'out'])
+# The codes each reagent is found in, so that only the replacements
+# that can produce the code of an existing reaction are tried
+reagents_index = reactions_helper.indexCodeReagents(reactions_codes)
 
-outfile = open(result_file,'w')
-outfile.write('\t'.join(["Original Reaction","Matched Reaction","Original Description","Matched Description","Swapped Compounds",'\n']))
-for rxn in sorted(reactions_dict.keys()):
-    if(reactions_dict[rxn]["status"] == "EMPTY"):
-        continue
+# The reactions are matched independently of each other, so they are split
+# across processes that share the codes and ancestor sets loaded above
+PROCESSES = os.cpu_count()
 
-    if(reactions_dict[rxn]["is_obsolete"] == 1):
-        continue
+def match_reaction(rxn):
 
     # The use of this parseStoichOnt() function assumes that the biochemistry has been rebuilt and
     # does not include any duplicate reagents or badly formatted floats
@@ -56,19 +43,63 @@ for rxn in sorted(reactions_dict.keys()):
 
     # We use generateOntologyReactionCodes to generate a list of all possible reactions
     # from a single reaction, that could contain the generic neighbors of the child reagents
-    result = reactions_helper.generateOntologyReactionCodes(rxn,rxn_cpds_dict,child_parent_sets)
+    result = reactions_helper.generateOntologyReactionCodes(rxn,rxn_cpds_dict,child_parent_sets,
+                                                            reagents_index,MAX_COMBINATIONS)
 
     # We go through the codes and see what matches
+    # The matches are sorted, as the order of the codes depends on the order of the sets
+    matches = list()
     for new_code in result:
         if(new_code in reactions_codes):
             matched_rxn = sorted(reactions_codes[new_code])[0]
-            rxn_desc = reactions_dict[rxn]['definition']
-            matched_rxn_desc = reactions_dict[matched_rxn]['definition']
 
             old_new_array=list()
             for (old,new) in result[new_code]:
                 old_new_array.append(old+':'+new)
             old_new = ';'.join(old_new_array)
 
-            outfile.write('\t'.join([rxn,matched_rxn,rxn_desc,matched_rxn_desc,old_new,'\n']))
+            matches.append((rxn,matched_rxn,old_new))
+    return sorted(matches)
+
+rxns_list = list()
+for rxn in sorted(reactions_dict.keys()):
+    if(reactions_dict[rxn]["status"] == "EMPTY"):
+        continue
+
+    if(reactions_dict[rxn]["is_obsolete"] == 1):
+        continue
+
+    rxns_list.append(rxn)
+
+(file_stub,suffix) = ONTOLOGY_FILE.rsplit('.', 1)
+result_file='.'.join([file_stub,'out'])
+
+outfile = open(result_file,'w')
+outfile.write('\t'.join(["Original Reaction","Matched Reaction","Original Description","Matched Description","Swapped Compounds",'\n']))
+
+# The processes are forked, where that isn't possible the reactions are done in turn
+# Either way, the matches of each reaction are written in the order of the reactions
+start = time.time()
+pool = None
+if(PROCESSES is not None and PROCESSES > 1 and 'fork' in multiprocessing.get_all_start_methods()):
+    pool = multiprocessing.get_context('fork').Pool(PROCESSES)
+    rxns_matches = pool.imap(match_reaction, rxns_list, chunksize=max(1,len(rxns_list)//(PROCESSES*16)))
+else:
+    rxns_matches = map(match_reaction, rxns_list)
+
+n_matches = 0
+for matches in rxns_matches:
+    for (rxn,matched_rxn,old_new) in matches:
+        rxn_desc = reactions_dict[rxn]['definition']
+        matched_rxn_desc = reactions_dict[matched_rxn]['definition']
+        outfile.write('\t'.join([rxn,matched_rxn,rxn_desc,matched_rxn_desc,old_new,'\n']))
+    n_matches += len(matches)
+
+if(pool is not None):
+    pool.close()
+    pool.join()
 outfile.close()
+
+seconds = time.time()-start
+print("Matched "+str(len(rxns_list))+" reactions in "+"{0:.2f}".format(seconds)+"s ("+ \
+      "{0:.2f}".format(len(rxns_list)/max(seconds,1e-6))+" reactions/s), "+str(n_matches)+" matches written to "+result_file)
@@ -0,0 +1,138 @@
+#! /usr/bin/env python
+
+import argparse
+import multiprocessing
+import os
+import json
+import time
+from Scripts.TemplateHelper import TemplateHelper, loadMasterBiochemistry
+
+desc1 = '''
+NAME
+      Build_Model_Templates -- build the Model Template objects of several templates
+
+SYNOPSIS
+'''
+
+desc2 = '''
+DESCRIPTION
+      The master compounds and reactions are loaded, and the replacements of the
+      obsolete compounds and reactions resolved, once for all of the templates.
+      The templates are then built in separate processes that share the master
+      biochemistry, and each Model Template object is saved as <id>.json in its
+      source directory, as Build_Model_Template.py does.
+'''
+
+desc3 = '''
+EXAMPLES
+      Build every Model Template object in ../../Templates:
+      > Build_Model_Templates.py
+
+      Build the GramNegative and GramPositive Model Template objects:
+      > Build_Model_Templates.py GramNegative GramPositive
+
+SEE ALSO
+      Build_Model_Template.py
+'''
+
+# The master biochemistry is loaded before the processes are started so that
+# it is shared by them, rather than copied to each one
+Master = None
+
+def buildTemplate(templateId):
+    ''' Build a Model Template object from the source files of a template.
+
+        @param templateId: Name of a directory in the templates directory, i.e. GramNegative
+        @return Tuple of the template ID, seconds taken, statistics and error, if any
+    '''
+
+    start = time.time()
+    try:
+        helper = TemplateHelper(args.compoundfile, args.reactionfile, master=Master)
+        templateDir = os.path.join(args.templatesdir, templateId)
+
+        # The following fields are required in a Model Template object.
+        template = dict()
+        template['id'] = templateId
+        template['name'] = templateId
+        template['type'] = args.type
+        template['domain'] = args.domain
+        template['biochemistry_ref'] = args.biochemref
+        template['pathways'] = list() # Always an empty for now
+
+        # Order is important so references can be made between sections of the Model Template.
+        helper.readCompartmentsFile(os.path.join(templateDir, 'Compartments.tsv'), includeLinenum=False)
+        template['compartments'] = [ helper.compartments[key] for key in helper.compartments ]
+
+        helper.readBiomassesFile(os.path.join(templateDir, 'Biomasses.tsv'), os.path.join(templateDir, 'BiomassCompounds.tsv'), includeLinenum=False)
+        template['biomasses'] = [ helper.biomasses[key] for key in helper.biomasses ]
+
+        helper.readRolesFile(args.rolefile, includeLinenum=False)
+        template['roles'] = [ helper.roles[key] for key in helper.roles ]
+
+        helper.readComplexesFile(args.complexfile, includeLinenum=False)
+        template['complexes'] = [ helper.complexes[key] for key in helper.complexes ]
+
+        helper.readReactionsFile(os.path.join(templateDir, 'Reactions.tsv'), includeLinenum=False)
+        template['reactions'] = [ helper.reactions[key] for key in helper.reactions ]
+
+        # Add the template compounds and comp compounds (constructed from reagents in reactions).
+        template['compounds'] = [ helper.compounds[key] for key in helper.compounds ]
+        template['compcompounds'] = [ helper.compCompounds[key] for key in helper.compCompounds ]
+
+        with open(os.path.join(templateDir, templateId+'.json'), 'w') as handle:
+            json.dump(template, handle, indent=4)
+    except Exception as e:
+        return (templateId, time.time() - start, None, '%s: %s' %(type(e).__name__, e))
+
+    stats = [ ('compartments', len(template['compartments'])), ('biomasses', len(template['biomasses'])),
+              ('roles', len(template['roles'])), ('complexes', len(template['complexes'])),
+              ('reactions', len(template['reactions'])), ('compounds', len(template['compounds'])),
+              ('compcompounds', len(template['compcompounds'])) ]
+    return (templateId, time.time() - start, stats, None)
+
+if __name__ == "__main__":
+    # Parse options.
+    parser = argparse.ArgumentParser(formatter_class=argparse.RawDescriptionHelpFormatter, prog='Build_Model_Templates', epilog=desc3)
+    parser.add_argument('templates', help='names of templates to build, all of them by default', action='store', nargs='*')
+    parser.add_argument('--templatesdir', help='path to directory containing a directory of source files for each template', action='store', default='../../Templates')
+    parser.add_argument('--biochemref', help='reference to Biochemistry object in workspace', action='store', default='default/default.biochem')
+    parser.add_argument('--compoundfile', help='path to master compounds file', action='store', default='../../Biochemistry/compounds.json')
+    parser.add_argument('--reactionfile', help='path to master reactions file', action='store', default='../../Biochemistry/reactions.json')
+    parser.add_argument('--complexfile', help='path to master complexes file', action='store', default='../../Annotations/Complexes.tsv')
+    parser.add_argument('--rolefile', help='path to master roles file', action='store', default='../../Annotations/Roles.tsv')
+    parser.add_argument('--type', help='type of model', action='store', default='GenomeScale')
+    parser.add_argument('--domain', help='domain of organisms', action='store', default='Bacteria')
+    parser.add_argument('--processes', help='number of templates built at the same time', action='store', type=int, default=os.cpu_count())
+    usage = parser.format_usage()
+    parser.description = desc1 + '      ' + usage + desc2
+    parser.usage = argparse.SUPPRESS
+    args = parser.parse_args()
+
+    templates = args.templates
+    if len(templates) == 0:
+        templates = sorted(entry for entry in os.listdir(args.templatesdir)
+                           if os.path.isfile(os.path.join(args.templatesdir, entry, 'Reactions.tsv')))
+
+    start = time.time()
+    Master = loadMasterBiochemistry(args.compoundfile, args.reactionfile)
+    print('Loaded master biochemistry in %.2fs' %(time.time() - start))
+
+    # Only forked processes share the master biochemistry without copying it.
+    processes = min(args.processes, len(templates))
+    if processes > 1 and 'fork' in multiprocessing.get_all_start_methods():
+        with multiprocessing.get_context('fork').Pool(processes) as pool:
+            results = pool.map(buildTemplate, templates, chunksize=1)
+    else:
+        results = [ buildTemplate(templateId) for templateId in templates ]
+
+    failed = 0
+    for (templateId, seconds, stats, error) in results:
+        if error is not None:
+            failed += 1
+            print('%s failed after %.2fs, %s' %(templateId, seconds, error))
+        else:
+            print('%s built in %.2fs, %s' %(templateId, seconds, ', '.join('%d %s' %(count, name) for (name, count) in stats)))
+    print('Built %d of %d templates in %.2fs' %(len(templates) - failed, len(templates), time.time() - start))
+
+    exit(1 if failed > 0 else 0)
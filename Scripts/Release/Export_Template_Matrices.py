@@ -0,0 +1,23 @@
+#!/usr/bin/env python
+import os
+import sys
+import time
+from BiochemPy import Templates
+
+#Exports the stoichiometric matrix, bounds and costs of each model template
+#as <template>.npz, either in the given directory or the current one
+#./Export_Template_Matrices.py [output directory] [template ...]
+Output_Dir = sys.argv[1] if len(sys.argv) > 1 else "."
+if(os.path.isdir(Output_Dir) is False):
+    os.makedirs(Output_Dir)
+
+TemplatesHelper = Templates()
+Templates_List = sys.argv[2:] if len(sys.argv) > 2 else TemplatesHelper.listTemplates()
+
+for template in Templates_List:
+    start = time.time()
+    npz_file = os.path.join(Output_Dir, template + ".npz")
+    matrix_dict = TemplatesHelper.exportTemplate(template, npz_file)
+    (rows, columns) = matrix_dict['matrix'].shape
+    print("Exported "+template+": "+str(rows)+" compounds, "+str(columns)+" reactions, "+ \
+          str(matrix_dict['matrix'].nnz)+" coefficients in "+"{0:.2f}".format(time.time()-start)+"s")
@@ -1,13 +1,18 @@
 #!/usr/bin/env python
 import os
 import sys
-import json
+import multiprocessing
 from BiochemPy import Compounds
 
+#The compounds are consolidated independently of each other, so they are
+#split across processes, and the output of each compound is written in order
+Processes = os.cpu_count()
+
 #Load Compounds
 CompoundsHelper = Compounds()
 Compounds_Dict = CompoundsHelper.loadCompounds()
 
+#The formula and charge of each structure are kept as a (formula, charge) tuple
 Structures_Root=os.path.dirname(__file__)+"/../../Biochemistry/Structures/"
 Formulas_Dict=dict()
 for source in "KEGG","MetaCyc":
@@ -24,29 +29,34 @@ for source in "KEGG","MetaCyc":
 
             file_name=Structures_Root+source+"/"+struct_type+"_"+struct_stage+"_Formulas_Charges.txt"
             with open(file_name) as file_handle:
-                for line in file_handle.readlines():
+                for line in file_handle:
                     line=line.strip()
                     array=line.split('\t')
-                    Formulas_Dict[source][struct_type][struct_stage][array[0]]={'formula':array[1],'charge':array[2]}
+                    Formulas_Dict[source][struct_type][struct_stage][array[0]]=(array[1],array[2])
 
 #Load Curated Structures
 Ignored_Structures=dict()
 with open(Structures_Root+"Ignored_ModelSEED_Structures.txt") as ignore_file:
-    for line in ignore_file.readlines():
+    for line in ignore_file:
         array=line.split('\t')
         Ignored_Structures[array[0]]=1
-ignore_file.close()
 
-#Load Structures and Aliases
-Structures_Dict = CompoundsHelper.loadStructures(["SMILE","InChIKey","InChI"],["KEGG","MetaCyc"])
+#Load Structures and Aliases, the structure files are read concurrently
+#and the structures of each stage are kept as a set
+Structures_Dict = CompoundsHelper.loadStructures(["SMILE","InChIKey","InChI"],["KEGG","MetaCyc"],threads=Processes)
 MS_Aliases_Dict =  CompoundsHelper.loadMSAliases(["KEGG","MetaCyc"])
+Struct_Types = sorted(Structures_Dict.keys())
 
-master_structs_file = open(Structures_Root+"All_ModelSEED_Structures.txt",'w')
-unique_structs_file = open(Structures_Root+"Unique_ModelSEED_Structures.txt",'w')
-unique_structs_file.write("ID\tType\tAliases\tFormula\tCharge\tStructure\n")
-structure_conflicts_file = open("Structure_Conflicts.txt",'w')
-formula_conflicts_file = open("Formula_Conflicts.txt",'w')
-for msid in sorted(MS_Aliases_Dict.keys()):
+def joinLines(*lines_lists):
+    return tuple("".join(lines) for lines in lines_lists)
+
+def consolidateCompound(msid):
+    #Returns the lines of each file for the compound
+    master_lines=list()
+    unique_lines=list()
+    structure_conflict_lines=list()
+    formula_conflict_lines=list()
+    warning_lines=list()
 
     #Build collection of all structures for the ModelSEED ID
     Structs = dict()
@@ -55,8 +65,9 @@ for msid in sorted(MS_Aliases_Dict.keys()):
         if(source not in MS_Aliases_Dict[msid].keys()):
             continue
 
-        for struct_type in sorted(Structures_Dict.keys()):
-            for external_id in sorted(MS_Aliases_Dict[msid][source]):
+        external_ids = sorted(MS_Aliases_Dict[msid][source])
+        for struct_type in Struct_Types:
+            for external_id in external_ids:
                 if(external_id not in Structures_Dict[struct_type]):
                     continue
 
@@ -69,18 +80,17 @@ for msid in sorted(MS_Aliases_Dict.keys()):
                         Structs[struct_type][struct_stage]=dict()
                         Formulas[struct_type][struct_stage]=dict()
 
-                    for structure in sorted(Structures_Dict[struct_type][external_id][struct_stage].keys()):
-
-                        formula_charge_dict={'formula':"null",'charge':"null"}
+                    formula_charge=("null","null")
+                    if(struct_type in Formulas_Dict[source] and external_id in Formulas_Dict[source][struct_type][struct_stage]):
+                        formula_charge = Formulas_Dict[source][struct_type][struct_stage][external_id]
 
-                        if(struct_type in Formulas_Dict[source] and external_id in Formulas_Dict[source][struct_type][struct_stage]):
-                            formula_charge_dict = Formulas_Dict[source][struct_type][struct_stage][external_id]
+                    for structure in sorted(Structures_Dict[struct_type][external_id][struct_stage]):
 
                         #Write to master
-                        master_structs_file.write("\t".join([msid,struct_type,struct_stage,external_id,source,\
-                                                                 formula_charge_dict['formula'],\
-                                                                 formula_charge_dict['charge'],\
-                                                                 structure])+"\n")
+                        master_lines.append("\t".join([msid,struct_type,struct_stage,external_id,source,\
+                                                            formula_charge[0],\
+                                                            formula_charge[1],\
+                                                            structure])+"\n")
 
                         if(external_id in Ignored_Structures):
                             continue
@@ -89,13 +99,12 @@ for msid in sorted(MS_Aliases_Dict.keys()):
                             Structs[struct_type][struct_stage][structure]=dict()
                         Structs[struct_type][struct_stage][structure][external_id]=source
 
-                        formula_charge_json = json.dumps(formula_charge_dict)
-                        if(formula_charge_json not in Formulas[struct_type][struct_stage]):
-                            Formulas[struct_type][struct_stage][formula_charge_json]=dict()
-                        Formulas[struct_type][struct_stage][formula_charge_json][external_id]=source
+                        if(formula_charge not in Formulas[struct_type][struct_stage]):
+                            Formulas[struct_type][struct_stage][formula_charge]=dict()
+                        Formulas[struct_type][struct_stage][formula_charge][external_id]=source
 
     if(len(Structs.keys())==0):
-        continue
+        return joinLines(master_lines,unique_lines,structure_conflict_lines,formula_conflict_lines,warning_lines)
 
     #Priority is:
     #Charged InChI
@@ -120,8 +129,8 @@ for msid in sorted(MS_Aliases_Dict.keys()):
 
     if(struct_type is None or struct_stage is None):
         #At time of writing, this doesn't happen
-        print("Warning: no structures used for "+msid)
-        continue
+        warning_lines.append("Warning: no structures used for "+msid+"\n")
+        return joinLines(master_lines,unique_lines,structure_conflict_lines,formula_conflict_lines,warning_lines)
 
     struct_pass=0
     struct_conflict=0
@@ -138,7 +147,7 @@ for msid in sorted(MS_Aliases_Dict.keys()):
 
     if(struct_pass):
         #Only one formula/charge combination possible here
-        formula_charge_dict=json.loads(list(Formulas[struct_type][struct_stage].keys())[0])
+        formula_charge=list(Formulas[struct_type][struct_stage].keys())[0]
 
         #If there are structural conflicts we will collect the ids and strings and establish rules
         #But if there isn't a structural conflict, we will use the one
@@ -154,11 +163,11 @@ for msid in sorted(MS_Aliases_Dict.keys()):
                 for alias in Structs[structure_type][struct_stage][structure]:
                     aliases[alias]=1
 
-                unique_structs_file.write("\t".join((msid,\
+                unique_lines.append("\t".join((msid,\
                                                          structure_type,\
                                                          ";".join(sorted(aliases)),\
-                                                         formula_charge_dict['formula'],\
-                                                         formula_charge_dict['charge'],\
+                                                         formula_charge[0],\
+                                                         formula_charge[1],\
                                                          structure))+"\n")
 
         else:
@@ -277,22 +286,55 @@ for msid in sorted(MS_Aliases_Dict.keys()):
                         aliases[alias]=1
 
                 #Finally, write to file
-                unique_structs_file.write("\t".join((msid,\
+                unique_lines.append("\t".join((msid,\
                                                          structure_type,\
                                                          ";".join(sorted(aliases)),\
-                                                         formula_charge_dict['formula'],\
-                                                         formula_charge_dict['charge'],\
+                                                         formula_charge[0],\
+                                                         formula_charge[1],\
                                                          structure_to_use))+"\n")
 
     if(struct_conflict==1):
         for structure in Structs[struct_type][struct_stage]:
             for external_id in Structs[struct_type][struct_stage][structure]:
-                structure_conflicts_file.write("\t".join((msid,struct_type,struct_stage,structure,external_id,
+                structure_conflict_lines.append("\t".join((msid,struct_type,struct_stage,structure,external_id,
                                                           Structs[struct_type][struct_stage][structure][external_id]))+"\n")
 
     if(formula_conflict==1):
         for formula in Formulas[struct_type][struct_stage]:
             for external_id in Formulas[struct_type][struct_stage][formula]:
-                formula_dict=json.loads(formula)
-                formula_conflicts_file.write("\t".join((msid,struct_type,struct_stage,formula_dict['formula'],formula_dict['charge'],external_id,
+                formula_conflict_lines.append("\t".join((msid,struct_type,struct_stage,formula[0],formula[1],external_id,
                                                           Formulas[struct_type][struct_stage][formula][external_id]))+"\n")
+
+    return joinLines(master_lines,unique_lines,structure_conflict_lines,formula_conflict_lines,warning_lines)
+
+master_structs_file = open(Structures_Root+"All_ModelSEED_Structures.txt",'w')
+unique_structs_file = open(Structures_Root+"Unique_ModelSEED_Structures.txt",'w')
+unique_structs_file.write("ID\tType\tAliases\tFormula\tCharge\tStructure\n")
+structure_conflicts_file = open("Structure_Conflicts.txt",'w')
+formula_conflicts_file = open("Formula_Conflicts.txt",'w')
+
+#The processes are forked, so that they share the structures and aliases
+#loaded above, where that isn't possible the compounds are done in turn
+msids = sorted(MS_Aliases_Dict.keys())
+pool = None
+if(Processes is not None and Processes > 1 and 'fork' in multiprocessing.get_all_start_methods()):
+    pool = multiprocessing.get_context('fork').Pool(Processes)
+    compounds_lines = pool.imap(consolidateCompound, msids, chunksize=max(1,len(msids)//(Processes*16)))
+else:
+    compounds_lines = map(consolidateCompound, msids)
+
+for (master_text,unique_text,structure_conflict_text,formula_conflict_text,warning_text) in compounds_lines:
+    master_structs_file.write(master_text)
+    unique_structs_file.write(unique_text)
+    structure_conflicts_file.write(structure_conflict_text)
+    formula_conflicts_file.write(formula_conflict_text)
+    sys.stdout.write(warning_text)
+
+if(pool is not None):
+    pool.close()
+    pool.join()
+
+master_structs_file.close()
+unique_structs_file.close()
+structure_conflicts_file.close()
+formula_conflicts_file.close()
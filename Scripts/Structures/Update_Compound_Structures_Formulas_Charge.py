@@ -30,19 +30,7 @@ aliases_dict = compounds_helper.loadSourceAliases()
 compounds_dict = compounds_helper.loadCompounds()
 Structures_Root=os.path.dirname(__file__)+"/../../Biochemistry/Structures/"
 
-inchikey_dict = dict()
-smiles_dict = dict()
-for cpd in structures_dict:
-    if('InChIKey' in structures_dict[cpd]):
-        for struct in structures_dict[cpd]['InChIKey'].keys():
-            if(struct not in inchikey_dict):
-                inchikey_dict[struct]=list()
-            inchikey_dict[struct].append(cpd)
-    if('SMILE' in structures_dict[cpd]):
-        for struct in structures_dict[cpd]['SMILE'].keys():
-            if(struct not in smiles_dict):
-                smiles_dict[struct]=list()
-            smiles_dict[struct].append(cpd)
+structure_index = compounds_helper.structureIndex()
 
 Ignored_Structures=list()
 with open(Structures_Root+"Ignored_ModelSEED_Structures.txt") as fh:
@@ -101,8 +89,9 @@ for cpd in sorted (compounds_dict.keys()):
 
         #See if any duplicates for newly assigned InChIKeys
         if(compounds_dict[cpd]['inchikey']==""):
-            if(inchikey in inchikey_dict and len(inchikey_dict[inchikey])>1):
-                print("Warning: Duplicate InChIKey: "+inchikey+" in "+" and ".join(inchikey_dict[inchikey]))
+            inchikey_cpds = structure_index.findCompounds(inchikey,'InChIKey')
+            if(len(inchikey_cpds)>1):
+                print("Warning: Duplicate InChIKey: "+inchikey+" in "+" and ".join(inchikey_cpds))
         compounds_dict[cpd]['inchikey']=inchikey
         compounds_dict[cpd]['smiles']=smile
 
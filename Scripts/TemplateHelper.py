@@ -4,6 +4,7 @@ import os
 import re
 from .Base_Helper import BaseHelper
 from .Biochem_Helper import BiochemHelper
+from BiochemPy.CanonicalMap import CanonicalMap
 
 class CompoundNotFoundError(Exception):
     pass
@@ -53,27 +54,52 @@ class NoComplexesError(Exception):
 class LinkedCompoundFormatError(Exception):
     pass
 
+def loadMasterBiochemistry(compoundsPath, reactionsPath):
+    ''' Load the master compounds and reactions, and resolve the replacements of
+        obsolete compounds and reactions, so they can be shared by several templates.
+
+        @param compoundsPath: Path to master compounds file
+        @param reactionsPath: Path to master reactions file
+        @return Dictionary with the compounds, reactions, compoundMap and reactionMap
+    '''
+
+    helper = BaseHelper()
+    master = dict()
+    for (key, path, kind) in (('compounds', compoundsPath, 'compounds'), ('reactions', reactionsPath, 'reactions')):
+        if not os.path.exists(path):
+            raise ValueError("Invalid path to {}: {}".format(kind, path))
+        with open(path) as handle:
+            master[key] = json.load(handle)
+        # The master files are saved as a list of objects sorted by ID
+        if isinstance(master[key], list):
+            master[key] = helper.buildDictFromListOfObjects(master[key])
+    master['compoundMap'] = CanonicalMap(master['compounds'], 'linked_compound')
+    master['reactionMap'] = CanonicalMap(master['reactions'], 'linked_reaction')
+    return master
+
 ''' Helper methods for working with Model Template objects. '''
 
 class TemplateHelper(BaseHelper):
-    
-    def __init__(self, compoundsPath, reactionsPath):
+
+    def __init__(self, compoundsPath, reactionsPath, master=None):
         ''' Initialize object.
-        
+
             @param compoundsPath: Path to master compounds file
             @param reactionsPath: Path to master reactions file
+            @param master: Master biochemistry returned by loadMasterBiochemistry(), which
+                           is used instead of the files when building several templates
             @return Nothing
         '''
 
         # Load the master compounds and reactions from source files.
         self.biochem = BiochemHelper()
-        if not os.path.exists(compoundsPath):
-            raise ValueError("Invalid path to compounds: {}".format(compoundsPath))
-        self.masterCompounds = json.load(open(compoundsPath))
-        if not os.path.exists(reactionsPath):
-            raise ValueError("Invalid path to reactions: {}".format(reactionsPath))
-        self.masterReactions = json.load(open(reactionsPath))
-        
+        if master is None:
+            master = loadMasterBiochemistry(compoundsPath, reactionsPath)
+        self.masterCompounds = master['compounds']
+        self.masterReactions = master['reactions']
+        self.compoundMap = master['compoundMap']
+        self.reactionMap = master['reactionMap']
+
         # Create empty dictionaries for keeping track of items to add to Model Template.
         self.compartments = dict()
         self.biomasses = dict()
@@ -454,24 +480,13 @@ class TemplateHelper(BaseHelper):
                     #    print 'WARNING: Reaction %s has status %s and was skipped' %(masterReaction['id'], masterReaction['status'])
                     #    continue
 
-                    # Check for obsolete reaction.
+                    # Check for obsolete reaction, the replacements are resolved when loaded.
                     if masterReaction['is_obsolete']:
-                        if masterReaction['linked_reaction'] != 'null':
-                            # One of the reactions in the list is not obsolete.
-                            linkIds = masterReaction['linked_reaction'].split(';')
-                            for index in range(len(linkIds)):
-                                try:
-                                    linkReaction = self.masterReactions[linkIds[index]]
-                                    if not linkReaction['is_obsolete']:
-                                        print('NOTICE: Obsolete reaction %s replaced by %s' %(masterReaction['id'], linkReaction['id']))
-                                        masterReaction = linkReaction
-                                        break
-                                except KeyError as e:
-                                    raise ObsoleteReactionError('Reaction %s is obsolete and replacement %s not found' %(masterReaction['id'], linkIds[index]))
-                            if masterReaction['is_obsolete']:
-                                raise ObsoleteReactionError('Reaction %s is obsolete and all replacements are obsolete' %(masterReaction['id']))
-                        else:
-                            raise ObsoleteReactionError('Reaction %s is obsolete and no replacement is specified' %(masterReaction['id']))
+                        linkId = self.reactionMap.canonical(reactionId)
+                        if linkId is None:
+                            raise ObsoleteReactionError('Reaction %s is %s' %(reactionId, self.reactionMap.reason(reactionId)))
+                        print('NOTICE: Obsolete reaction %s replaced by %s' %(masterReaction['id'], linkId))
+                        masterReaction = self.masterReactions[linkId]
                     
                     # Make sure all of the compartments are valid.
                     compartmentIds = fields[fieldNames['compartment']].split('|')
@@ -515,15 +530,15 @@ class TemplateHelper(BaseHelper):
                         reaction['deltaGErr'] = 10000000
                     if reaction['name'] == 'null':
                         reaction['name'] = reaction['id']
-                    if not isinstance(reaction['base_cost'], (int, long, float, complex)):
+                    if not isinstance(reaction['base_cost'], (int, float, complex)):
                         reaction['base_cost'] = float(reaction['base_cost'])
-                    if not isinstance(reaction['maxforflux'], (int, long, float, complex)):
+                    if not isinstance(reaction['maxforflux'], (int, float, complex)):
                         reaction['maxforflux'] = float(reaction['maxforflux'])
-                    if not isinstance(reaction['maxrevflux'], (int, long, float, complex)):
+                    if not isinstance(reaction['maxrevflux'], (int, float, complex)):
                         reaction['maxrevflux'] = float(reaction['maxrevflux'])
-                    if not isinstance(reaction['deltaG'], (int, long, float, complex)):
+                    if not isinstance(reaction['deltaG'], (int, float, complex)):
                         reaction['deltaG'] = float(reaction['deltaG'])
-                    if not isinstance(reaction['deltaGErr'], (int, long, float, complex)):
+                    if not isinstance(reaction['deltaGErr'], (int, float, complex)):
                         reaction['deltaGErr'] = float(reaction['deltaGErr'])
                     # Stoichiometry format is n:cpdid:c:i:"cpdname"
                     if len(masterReaction['stoichiometry']) > 0:
@@ -585,24 +600,13 @@ class TemplateHelper(BaseHelper):
         except KeyError as e:
             raise CompoundNotFoundError('Compound %s not found in master biochemistry' %(compoundId))
 
-        # Check for obsolete compound.
+        # Check for obsolete compound, the replacements are resolved when loaded.
         if masterCompound['is_obsolete']:
-            if masterCompound['linked_compound'] != 'null':
-                linkIds = masterCompound['linked_compound'].split(';')
-                # One of the compounds in the list is not obsolete.
-                for index in range(len(linkIds)):
-                    try:
-                        linkCompound = self.masterCompounds[linkIds[index]]
-                        if not linkCompound['is_obsolete']:
-                            print('NOTICE: Obsolete compound %s replaced by %s' %(masterCompound['id'], linkCompound['id']))
-                            masterCompound = linkCompound
-                            break
-                    except KeyError as e:
-                        raise ObsoleteCompoundError('Compound %s is obsolete and replacement %s not found' %(masterCompound['id'], linkIds[index]))
-                if masterCompound['is_obsolete']:
-                    raise ObsoleteCompoundError('Compound %s is obsolete and all replacements are obsolete' %(masterCompound['id']))
-            else:
-                raise ObsoleteCompoundError('Compound %s is obsolete and no replacement is specified' %(masterCompound['id']))
+            linkId = self.compoundMap.canonical(compoundId)
+            if linkId is None:
+                raise ObsoleteCompoundError('Compound %s is %s' %(compoundId, self.compoundMap.reason(compoundId)))
+            print('NOTICE: Obsolete compound %s replaced by %s' %(masterCompound['id'], linkId))
+            masterCompound = self.masterCompounds[linkId]
         
         # If needed, create a new TemplateCompound and add it to the Model Template.
         if compoundId not in self.compounds:
@@ -625,18 +629,18 @@ class TemplateHelper(BaseHelper):
                     compound['deltaG'] = 10000000
                 if compound['deltaGErr'] == 'null':
                     compound['deltaGErr'] = 10000000
-                if not isinstance(compound['mass'], (int, long, float, complex)):
+                if not isinstance(compound['mass'], (int, float, complex)):
                     compound['mass'] = float(compound['mass'])
-                if not isinstance(compound['defaultCharge'], (int, long, float, complex)):
+                if not isinstance(compound['defaultCharge'], (int, float, complex)):
                     compound['defaultCharge'] = float(compound['defaultCharge'])
-                if not isinstance(compound['deltaG'], (int, long, float, complex)):
+                if not isinstance(compound['deltaG'], (int, float, complex)):
                     compound['deltaG'] = float(compound['deltaG'])
-                if not isinstance(compound['deltaGErr'], (int, long, float, complex)):
+                if not isinstance(compound['deltaGErr'], (int, float, complex)):
                     compound['deltaGErr'] = float(compound['deltaGErr'])
                 compound['formula'] = masterCompound['formula']
                 self.compounds[compound['id']] = compound
             except KeyError as e:
-                raise CompoundKeyError('Missing key in compound %s: %s' %(masterCompound['id'], e.message))
+                raise CompoundKeyError('Missing key in compound %s: %s' %(masterCompound['id'], e))
         else:
             compound = self.compounds[compoundId]
 
@@ -653,7 +657,7 @@ class TemplateHelper(BaseHelper):
             compCompound['id'] = id
             compCompound['templatecompound_ref'] = '~/compounds/id/'+compoundId
             compCompound['charge'] = compound['defaultCharge'] # @todo Not sure how charge could be different
-            if not isinstance(compCompound['charge'], (int, long, float, complex)):
+            if not isinstance(compCompound['charge'], (int, float, complex)):
                 compCompound['charge'] = float(compCompound['charge'])
             if compartment['id'] == 'e':
                 compCompound['maxuptake'] = 100.0 # Set a maximum for the extracellular compartment
@@ -1,6 +1,5 @@
 #!/usr/bin/env python
-from BiochemPy import Reactions
-from math import log
+from BiochemPy import Reactions, Thermodynamics
 import sys
 reactions_helper = Reactions()
 reactions_dict = reactions_helper.loadReactions()
@@ -9,14 +8,14 @@ DB_Level = ''
 if(len(sys.argv)>1 and (sys.argv[1] == 'EQ' or sys.argv[1] == 'GC')):
     DB_Level = sys.argv[1]
 
-#Constants
-TEMPERATURE=298.15
-GAS_CONSTANT=0.0019858775
-RT_CONST=TEMPERATURE*GAS_CONSTANT
-FARADAY = 0.023061 # kcal/vol gram divided by 1000?
-
-# max and min values refer to range of intracellular concentrations
-(cell_max,cell_min,cell_conc)=(0.02,0.00001,0.001)
+# The range of concentrations, and the fixed concentration, in M, (min, max, fixed),
+# of the compounds in each compartment, by the index of the compartment in the stoichiometry,
+# and of specific compounds in any compartment, which take precedence
+# Every other compound is in the range of intracellular concentrations (0.00001, 0.02, 0.001)
+# i.e. {'cpd00011':(0.00001,0.02,0.0001)} fixes the concentration of CO2 at 0.0001
+# and {'cpd00001':(1,1,1)} leaves water out of the energies altogether
+COMPARTMENT_CONCENTRATIONS = dict()
+COMPOUND_CONCENTRATIONS = dict()
 
 #Phosphates
 phosphate_ids=("cpd00002", #ATP
@@ -36,9 +35,22 @@ low_energy_cpds=("cpd00011", #CO2
                  "cpd00449", #Dihydrolipoamide
                  "cpd00242") #HCO3
 
+#The energies of every reaction at the extremes of the concentrations are found at once
+thermodynamics_helper = Thermodynamics(COMPARTMENT_CONCENTRATIONS, COMPOUND_CONCENTRATIONS)
+matrix_dict = thermodynamics_helper.buildMatrix(reactions_dict)
+energies_dict = thermodynamics_helper.estimateEnergies(reactions_dict, matrix_dict)
+(stored_min_list, stored_max_list, mMdeltaG_list) = (energies_dict['min'].tolist(),
+                                                     energies_dict['max'].tolist(),
+                                                     energies_dict['fixed'].tolist())
+
+#The compounds of each reaction, and their coefficients summed across compartments
+compounds_list = matrix_dict['compounds']
+(cpd_matrix, cpt_matrix) = (matrix_dict['compound_matrix'], matrix_dict['compartment_matrix'])
+(cpd_indptr, cpd_indices, cpd_data, cpt_data) = (cpd_matrix.indptr.tolist(), cpd_matrix.indices.tolist(),
+                                                 cpd_matrix.data.tolist(), cpt_matrix.data.tolist())
+
 reversibility_report=dict()
-for rxn in sorted(reactions_dict.keys()):
-    
+for (row, rxn) in enumerate(matrix_dict['reactions']):
     #defaults
     thermoreversibility = "?"
 
@@ -81,60 +93,21 @@ for rxn in sorted(reactions_dict.keys()):
 
         continue
 
-    #Calculate MdeltaG
-    (rct_min,rct_max)=(0.0,0.0)
-    (pdt_min,pdt_max)=(0.0,0.0)
-
-    #Calculate mMdeltaG
-    rgt_sum=0.0
-
     #Capture specific compounds for heuristics
-    proton_cpt_dict = dict()
+    cpds_coeff_dict = dict()
+    cpds_cpts_dict = dict()
+    for entry in range(cpd_indptr[row], cpd_indptr[row+1]):
+        cpd = compounds_list[cpd_indices[entry]]
+        cpds_coeff_dict[cpd] = cpd_data[entry]
+        cpds_cpts_dict[cpd] = cpt_data[entry]
+
     phosphates = dict()
-    for rgt in reactions_dict[rxn]['stoichiometry'].split(';'):
-        (coeff,cpd,cpt,idx,name)=rgt.split(":", maxsplit=4)
-        coeff=float(coeff)
-
-        if(cpd == 'cpd00067'):
-            proton_cpt_dict[cpt]=1
-
-        #Find phosphates
-        for cpd in phosphate_ids:
-            if(cpd in rgt):
-                if(cpd not in phosphates):
-                    phosphates[cpd]=0.0
-                phosphates[cpd]+=coeff
-
-        #ignore protons and water for following computation
-        if(cpd == 'cpd00067' or cpd == 'cpd00001'):
-            continue
-
-        #Here we can change accordingly to compartments
-        #This section for MdeltaG under concentration range
-        (cpt_max,cpt_min)=(cell_max,cell_min)
-        if(coeff<0):
-            rct_min += (coeff*log(cpt_min))
-            rct_max += (coeff*log(cpt_max))
-        else:
-            pdt_min += (coeff*log(cpt_min))
-            pdt_max += (coeff*log(cpt_max))
-
-        #This section for mMdeltaG under fixed concentration
-        local_conc=cell_conc
-        if(cpd == 'cpd00011'): #CO2
-            local_conc=0.0001
-        elif(cpd == 'cpd00007' or cpd == 'cpd11640'): #O2 && H2
-            local_conc=0.000001;
-        rgt_sum += (coeff*log(local_conc))
-
-    #for future reference
-    rxn_dg_transport = 0.0
-    
-    stored_max=rxn_dg+rxn_dg_transport+rxn_dge
-    stored_min=rxn_dg+rxn_dg_transport-rxn_dge
+    for cpd in phosphate_ids:
+        if(cpd in cpds_coeff_dict):
+            phosphates[cpd] = cpds_coeff_dict[cpd]
 
-    stored_max+=(RT_CONST*pdt_max)+(RT_CONST*rct_min)
-    stored_min+=(RT_CONST*pdt_min)+(RT_CONST*rct_max)
+    stored_max=stored_max_list[row]
+    stored_min=stored_min_list[row]
 
     if(stored_max < 0):
 
@@ -156,17 +129,7 @@ for rxn in sorted(reactions_dict.keys()):
     #1: ATP hydrolysis transport
     #1a: ATP Synthase is reversible, but cannot involve any other compound, and can only transport protons
     is_atp_synthase=False
-    if(reactions_dict[rxn]['is_transport']==1 and len(proton_cpt_dict.keys())>1):
-        cpds_cpts_dict=dict()
-        #Collect compound compartments
-        for rgt in reactions_dict[rxn]['stoichiometry'].split(';'):
-            (coeff,cpd,cpt,idx,name)=rgt.split(":",maxsplit=4)
-            coeff=float(coeff)
-        
-            if(cpd not in cpds_cpts_dict):
-                cpds_cpts_dict[cpd]=list()
-            cpds_cpts_dict[cpd].append(cpt)
-
+    if(reactions_dict[rxn]['is_transport']==1 and cpds_cpts_dict.get('cpd00067',0)>1):
         #defaults
         is_atp_synthase=True
         for cpd in cpds_cpts_dict.keys():
@@ -180,7 +143,7 @@ for rxn in sorted(reactions_dict.keys()):
 
         #Only protons are transported
         for cpd in cpds_cpts_dict.keys():
-            if(len(cpds_cpts_dict[cpd])==2 and cpd != 'cpd00067'):
+            if(cpds_cpts_dict[cpd]==2 and cpd != 'cpd00067'):
                 is_atp_synthase = False
 
     if(is_atp_synthase is True):
@@ -211,7 +174,7 @@ for rxn in sorted(reactions_dict.keys()):
         continue
 
     #2: Calculate and evaluate mMdeltaG
-    mMdeltaG=rxn_dg+(RT_CONST*rgt_sum);
+    mMdeltaG=mMdeltaG_list[row]
     if(mMdeltaG >= -2.0 and mMdeltaG <= 2.0):
 
         thermoreversibility = "="
@@ -234,12 +197,9 @@ for rxn in sorted(reactions_dict.keys()):
         low_energy_points-=(abs(min_coeff))
     
     #3b:Find other low energy compounds
-    for rgt in reactions_dict[rxn]['stoichiometry'].split(';'):
-        (coeff,cpd,cpt,idx,name)=rgt.split(":",maxsplit=4)
-        coeff=float(coeff)
-        
+    for cpd in cpds_coeff_dict.keys():
         if(cpd in low_energy_cpds):
-            low_energy_points-=coeff
+            low_energy_points-=cpds_coeff_dict[cpd]
 
     #Evaluate low energy
     if((low_energy_points*mMdeltaG) > 2 and mMdeltaG < 0):
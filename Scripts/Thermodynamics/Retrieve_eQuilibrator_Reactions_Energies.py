@@ -1,7 +1,26 @@
 #!/usr/bin/env python
-import os,sys,math
-from equilibrator_api import ComponentContribution, Reaction, Q_, ccache
+import os,sys,math,time
+import multiprocessing
+from importlib.metadata import version
 from BiochemPy import Compounds,Reactions
+from BiochemPy.EnergyCache import EnergyCache
+from BiochemPy.StructureIndex import inchikeyLevels
+
+#The conditions under which the energies are estimated
+P_H=7.0
+IONIC_STRENGTH="0.25M"
+TEMPERATURE="298.15K"
+
+#The reactions are estimated independently of each other, so they are split across processes
+#Each process loads its own ComponentContribution and compound cache, which takes more than a
+#gigabyte of memory, so only a few are used unless more are given, i.e.:
+#./Retrieve_eQuilibrator_Reactions_Energies.py 8
+PROCESSES=2
+if(len(sys.argv)>1):
+    PROCESSES=int(sys.argv[1])
+
+#Equations that eQuilibrator couldn't estimate are cached too, unless they're to be tried again
+RETRY_FAILURES=False
 
 #We have to try and make sure that we use MetaNetX IDs for which an estimate of energy
 #can be computed by eQuilibrator
@@ -30,52 +49,33 @@ with open(file_name) as file_handle:
         if(mnx in Problem_Compounds):
             continue
 
-        if(inchikey not in mnx_inchikey_dict):
-            mnx_inchikey_dict[inchikey]=mnx
-
-        inchikey = "-".join(inchikey.split('-')[0:2])
-        if(inchikey not in mnx_inchikey_dict):
-            mnx_inchikey_dict[inchikey]=mnx
-
-        inchikey = inchikey.split('-')[0]
-        if(inchikey not in mnx_inchikey_dict):
-            mnx_inchikey_dict[inchikey]=mnx
+        #Full, proton-neutral and stereo-neutral keys
+        for inchikey in inchikeyLevels(inchikey):
+            if(inchikey not in mnx_inchikey_dict):
+                mnx_inchikey_dict[inchikey]=mnx
 
 file_handle.close()
 
 #Here we can cross-check the structures that are in ModelSEED to find ones where
 #there is a match in eQuilibrator
 compounds_helper = Compounds()
-structures_dict = compounds_helper.loadStructures(["InChIKey"],["ModelSEED"])
+structure_index = compounds_helper.structureIndex()
 seed_mnx_structural_map=dict()
-for cpd in structures_dict:
-    structure_type='InChIKey'
-    if(structure_type not in structures_dict[cpd]):
-        #The load structures function will return all compounds, so have to
-        #Check that the structure is there
-        continue
-
+for cpd in structure_index.compoundsWith('InChIKey'):
     #As these are unique structures, i.e. 1-1 mapping with compound id,
     #there's only ever one in each list for each compound
-    structure = list(structures_dict[cpd][structure_type].keys())[0]
+    structure = structure_index.compoundStructures(cpd,'InChIKey')[0]
 
     #Here we check on three levels, we check the full string
     #Then the deprotonated string, then the structure alone
     #As per email from Elad and Moritz, we should not expect
     #Estimated energies to deviate between pseudoisomers (protons) and stereoisomers
     matched_mnx=None
-
-    if(structure in mnx_inchikey_dict):
-        matched_mnx=mnx_inchikey_dict[structure]
-    else:
-        structure = "-".join(structure.split('-')[0:2])
+    for structure in inchikeyLevels(structure):
         if(structure in mnx_inchikey_dict):
             matched_mnx=mnx_inchikey_dict[structure]
-        else:
-            structure = structure.split('-')[0]
-            if(structure in mnx_inchikey_dict):
-                matched_mnx=mnx_inchikey_dict[structure]
-    
+            break
+
     #As of 06/28/2019, there was:
     # 17,071 matches based on full inchikey
     # 17,863 matches using proton-neutral inchikey
@@ -109,9 +109,32 @@ for rxn in reactions_dict:
     elif(Some_Mol is True):
         incomplete_mol_rxns_dict[rxn]=1
 
-equilibrator_calculator = ComponentContribution(p_h=Q_(7.0), ionic_strength=Q_("0.25M"), temperature=Q_("298.15K"))
-output_name=thermodynamics_root+'eQuilibrator/MetaNetX_Reaction_Energies.tbl'
-output_handle=open(output_name,'w')
+#Each process has its own ComponentContribution, and its own compound cache, as
+#eQuilibrator is only imported once the process is started
+equilibrator_calculator=None
+def startCalculator():
+    global equilibrator_calculator, Reaction, ccache
+    from equilibrator_api import ComponentContribution, Reaction, Q_, ccache
+    equilibrator_calculator = ComponentContribution(p_h=Q_(P_H), ionic_strength=Q_(IONIC_STRENGTH), temperature=Q_(TEMPERATURE))
+
+def estimateEnergy(equation_str):
+    try:
+        equilibrator_reaction = Reaction.parse_formula(ccache.get_compound, equation_str)
+
+        result = equilibrator_calculator.standard_dg_prime(equilibrator_reaction)
+        dG0_prime = str(result.value.to('kilocal / mole').magnitude)
+        uncertainty = str(result.error.to('kilocal / mole').magnitude)
+
+        ln_RI = equilibrator_calculator.ln_reversibility_index(equilibrator_reaction)
+        if not type(ln_RI) == float:
+            ln_RI = ln_RI.magnitude
+        ln_RI = str(ln_RI)
+
+        return (equation_str,(dG0_prime,uncertainty,ln_RI),None)
+    except Exception as e:
+        return (equation_str,None,str(e))
+
+rxns_equations=dict()
 for rxn in reactions_dict:
     if(reactions_dict[rxn]['status']=="EMPTY"):
         continue
@@ -145,42 +168,78 @@ for rxn in reactions_dict:
 
     rxn_cpds_array=reactions_helper.parseStoich(reactions_dict[rxn]["stoichiometry"])
 
+    #These are all mapped, as per earlier condition
     lhs=dict()
     rhs=dict()
     for rgt in rxn_cpds_array:
-        if(rgt['compound'] not in seed_mnx_structural_map):
-            OK = False
-        else:
-            mnx_id = seed_mnx_structural_map[rgt['compound']]
+        mnx_id = seed_mnx_structural_map[rgt['compound']]
 
-            if(rgt['coefficient'] < 0):
-                lhs[mnx_id]=math.fabs(rgt['coefficient'])
-            elif(rgt['coefficient'] > 0):
-                rhs[mnx_id]=math.fabs(rgt['coefficient'])
+        if(rgt['coefficient'] < 0):
+            lhs[mnx_id]=math.fabs(rgt['coefficient'])
+        elif(rgt['coefficient'] > 0):
+            rhs[mnx_id]=math.fabs(rgt['coefficient'])
 
     equation_str = ' + '.join([f'{value} {key}' for key, value in lhs.items()]) + \
         " = " + \
         ' + '.join([f'{value} {key}' for key, value in rhs.items()])
+    rxns_equations[rxn]=equation_str
 
-    equilibrator_reaction = Reaction.parse_formula(ccache.get_compound, equation_str)
-
-    try:
-        result = equilibrator_calculator.standard_dg_prime(equilibrator_reaction)
-        dG0_prime = str(result.value.to('kilocal / mole').magnitude)
-        uncertainty = str(result.error.to('kilocal / mole').magnitude)
-
-
-        ln_RI = equilibrator_calculator.ln_reversibility_index(equilibrator_reaction)
-        if not type(ln_RI) == float:
-            ln_RI = str(ln_RI.magnitude)
+#The energy of each equation is cached under the conditions (pH, ionic strength and temperature)
+#and the version of eQuilibrator, so only the equations of reactions whose stoichiometry, or the
+#structures of its compounds, have changed are estimated again, and an estimation that is stopped
+#carries on from where it was
+output_name=thermodynamics_root+'eQuilibrator/MetaNetX_Reaction_Energies.tbl'
+energy_cache=EnergyCache(output_name)
+equilibrator_version=version('equilibrator-api')
+def cacheKey(equation_str):
+    return (equation_str,P_H,IONIC_STRENGTH,TEMPERATURE,equilibrator_version)
+
+def isPending(equation_str):
+    cached_energy=energy_cache.get(cacheKey(equation_str))
+    return cached_energy is None or (RETRY_FAILURES is True and cached_energy[0] is None)
+
+pending_equations=sorted(set(equation_str for equation_str in rxns_equations.values() if isPending(equation_str)))
+print("Estimating "+str(len(pending_equations))+" of "+str(len(set(rxns_equations.values())))+" equations")
+
+#The processes are forked, where that isn't possible the equations are estimated in turn
+start=time.time()
+pool=None
+if(PROCESSES > 1 and len(pending_equations) > 1 and 'fork' in multiprocessing.get_all_start_methods()):
+    pool=multiprocessing.get_context('fork').Pool(PROCESSES,initializer=startCalculator)
+    equations_energies=pool.imap_unordered(estimateEnergy,pending_equations,chunksize=max(1,len(pending_equations)//(PROCESSES*64)))
+else:
+    if(len(pending_equations) > 0):
+        startCalculator()
+    equations_energies=map(estimateEnergy,pending_equations)
+
+#If the estimation is stopped, the processes are stopped too, and what was
+#estimated until then is already in the cache
+try:
+    for (equation_str,energy,error) in equations_energies:
+        if(error is not None):
+            print(error)
+        energy_cache.add(cacheKey(equation_str),(energy,error))
+
+    if(pool is not None):
+        pool.close()
+        pool.join()
+finally:
+    if(pool is not None):
+        pool.terminate()
+    energy_cache.close()
+
+seconds=time.time()-start
+print("Estimated "+str(len(pending_equations))+" equations in "+"{0:.2f}".format(seconds)+"s ("+ \
+      "{0:.2f}".format(len(pending_equations)/max(seconds,1e-6))+" equations/s)")
 
-        output_handle.write("\t".join([rxn,dG0_prime,uncertainty,ln_RI])+"\n")
-    except Exception as e:
+output_handle=open(output_name,'w')
+for rxn in rxns_equations:
+    (energy,error)=energy_cache.get(cacheKey(rxns_equations[rxn]))
+    if(energy is None):
         output_handle.write("\t".join([rxn,"Unable to retrieve energy"])+"\n")
-        print(e)
-
-    #These are all true, as per earlier condition
-    #print(OK)
+    else:
+        output_handle.write("\t".join([rxn]+list(energy))+"\n")
+output_handle.close()
 
 print("Saving reactions")
 reactions_helper.saveReactions(reactions_dict)
@@ -1,10 +1,11 @@
 #!/usr/bin/env python
 import os,sys
 from BiochemPy import Compounds
+from BiochemPy.StructureIndex import inchikeyLevels
 
 compounds_helper = Compounds()
 compounds_dict = compounds_helper.loadCompounds()
-structures_dict = compounds_helper.loadStructures(["SMILE","InChIKey"],["ModelSEED"])
+structure_index = compounds_helper.structureIndex()
 
 ############################################################################
 ##
@@ -47,7 +48,7 @@ with open(file_name) as file_handle:
             eq_compounds[mnx]['struct']=inchikey
 
             #For searching purposes we lose the protonation indicator
-            inchikey="-".join(inchikey.split('-')[0:2])
+            inchikey=inchikeyLevels(inchikey)[1]
             struct_mnx_dict[inchikey]=mnx
 
 file_handle.close()
@@ -56,13 +57,9 @@ file_handle.close()
 # 18,206/19,432 (94%) MetaNetX records for which there is a unique structure
 
 seed_mnx_map=dict()
-for cpd in structures_dict:
-    structure_type='InChIKey'
-    if(structure_type not in structures_dict[cpd]):
-        continue
-
-    structure = list(structures_dict[cpd][structure_type].keys())[0]
-    dp_struct="-".join(structure.split('-')[0:2])
+for cpd in structure_index.compoundsWith('InChIKey'):
+    structure = structure_index.compoundStructures(cpd,'InChIKey')[0]
+    dp_struct=inchikeyLevels(structure)[1]
 
     if(dp_struct not in struct_mnx_dict):
         continue
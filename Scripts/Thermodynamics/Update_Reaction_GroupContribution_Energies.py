@@ -1,9 +1,10 @@
 #!/usr/bin/env python
 import os,sys
-from BiochemPy import Compounds, Reactions
+from BiochemPy import Compounds, Reactions, Thermodynamics
 
 compounds_helper = Compounds()
 compounds_dict = compounds_helper.loadCompounds()
+canonical_map = compounds_helper.canonicalMap(compounds_dict)
 
 mol_cpds_dict=dict()
 for cpd in compounds_dict:
@@ -11,32 +12,33 @@ for cpd in compounds_dict:
         mol_cpds_dict[cpd]=1
 
         if(compounds_dict[cpd]['is_obsolete']):
-            for link in compounds_dict[cpd]['linked_compound'].split(';'):
+            for link in canonical_map.links(cpd):
                 if('GC' in compounds_dict[link]['notes'] and compounds_dict[cpd]['deltag'] != 10000000):
                     mol_cpds_dict[link]=1
 
-reactions_helper = Reactions()
+reactions_helper = Reactions(compounds_dict=compounds_dict)
 reactions_dict = reactions_helper.loadReactions()
 
+#The energies of every reaction, and the number of its reagents without an energy
+#are found at once from the matrix of reactions and reagents
+cpds_energies=dict()
+for cpd in mol_cpds_dict:
+    cpds_energies[cpd]=(compounds_dict[cpd]['deltag'],compounds_dict[cpd]['deltagerr'])
+
+thermodynamics_helper = Thermodynamics()
+matrix_dict = thermodynamics_helper.buildMatrix(reactions_dict)
+energies_dict = thermodynamics_helper.reactionEnergies(matrix_dict, cpds_energies)
+
 complete_mol_rxns_dict=dict()
 incomplete_mol_rxns_dict=dict()
-for rxn in reactions_dict:
+for (row, rxn) in enumerate(matrix_dict['reactions']):
     if(reactions_dict[rxn]['status']=='EMPTY'):
         continue
 
-    rxn_cpds_array=reactions_helper.parseStoich(reactions_dict[rxn]["stoichiometry"])
-
-    All_Mol=True
-    Some_Mol=False
-    for rgt in rxn_cpds_array:
-        if(rgt['compound'] not in mol_cpds_dict):
-            All_Mol=False
-            Some_Mol=True
-
-    if(All_Mol is True):
-        complete_mol_rxns_dict[rxn]=1
-    elif(Some_Mol is True):
-        incomplete_mol_rxns_dict[rxn]=1
+    if(energies_dict['missing'][row]==0):
+        complete_mol_rxns_dict[rxn]=row
+    else:
+        incomplete_mol_rxns_dict[rxn]=row
 
 for rxn in reactions_dict:
 
@@ -70,20 +72,13 @@ for rxn in reactions_dict:
     if('GCC' not in notes_list):
         notes_list.append('GCC')
 
-    rxn_cpds_array=reactions_helper.parseStoich(reactions_dict[rxn]["stoichiometry"])
-
     #thermodynamics
-    dg_sum=0.0
-    dge_sum=0.0
-    for rgt in rxn_cpds_array:
-        if(rgt['compound'] not in mol_cpds_dict):
-            print("Warning: wrong reaction: "+rxn)
-
-        dg_sum+= ( compounds_dict[rgt['compound']]['deltag'] * rgt['coefficient'] )
-        dge_sum+= ( compounds_dict[rgt['compound']]['deltagerr'] * rgt['coefficient'] )**2
+    row=complete_mol_rxns_dict[rxn]
+    dg_sum=energies_dict['deltag'][row]
+    dge_sum=energies_dict['deltagerr'][row]
 
     dg_sum="{0:.2f}".format(dg_sum)
-    dge_sum = "{0:.2f}".format(dge_sum**0.5)
+    dge_sum = "{0:.2f}".format(dge_sum)
 
     reactions_dict[rxn]['deltag']=float(dg_sum)
     reactions_dict[rxn]['deltagerr']=float(dge_sum)
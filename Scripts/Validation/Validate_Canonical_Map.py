@@ -0,0 +1,133 @@
+"""Validates the replacements chosen by CanonicalMap.canonical()"""
+
+import sys
+import random
+import argparse
+from BiochemPy.CanonicalMap import CanonicalMap
+
+
+def make_rows(entries):
+    # entries: {id: (is_obsolete, linked)}
+    return dict((row_id, {'is_obsolete': int(obsolete), 'linked_compound': linked})
+                for row_id, (obsolete, linked) in entries.items())
+
+
+# (description, entries, {id: (canonical, reason)})
+CASES = [
+    ("current", {'cpd1': (False, 'null')},
+     {'cpd1': ('cpd1', None), 'cpd9': (None, None)}),
+    ("first listed current link, not the lowest",
+     {'cpd1': (True, 'cpd3;cpd2'), 'cpd2': (False, 'cpd1'), 'cpd3': (False, 'cpd1')},
+     {'cpd1': ('cpd3', None)}),
+    ("direct link before an indirect one",
+     {'cpd1': (True, 'cpd2;cpd3'), 'cpd2': (True, 'cpd4'), 'cpd3': (False, 'null'),
+      'cpd4': (False, 'null')},
+     {'cpd1': ('cpd3', None), 'cpd2': ('cpd4', None)}),
+    ("chain of obsolete links",
+     {'cpd1': (True, 'cpd2'), 'cpd2': (True, 'cpd3'), 'cpd3': (False, 'null')},
+     {'cpd1': ('cpd3', None), 'cpd2': ('cpd3', None)}),
+    ("no replacement",
+     {'cpd1': (True, 'null'), 'cpd2': (True, '')},
+     {'cpd1': (None, 'obsolete and no replacement is specified'),
+      'cpd2': (None, 'obsolete and no replacement is specified')}),
+    ("missing replacement",
+     {'cpd1': (True, 'cpd8'), 'cpd2': (True, 'cpd8;cpd3'), 'cpd3': (False, 'null')},
+     {'cpd1': (None, 'obsolete and replacement cpd8 not found'),
+      'cpd2': ('cpd3', None)}),
+    ("all replacements obsolete, in a cycle",
+     {'cpd1': (True, 'cpd2'), 'cpd2': (True, 'cpd1')},
+     {'cpd1': (None, 'obsolete and all replacements are obsolete'),
+      'cpd2': (None, 'obsolete and all replacements are obsolete')}),
+]
+
+
+def validate_cases():
+    errors = []
+    for description, entries, expected in CASES:
+        canonical_map = CanonicalMap(make_rows(entries), 'linked_compound')
+        for row_id, (canonical, reason) in expected.items():
+            if canonical_map.canonical(row_id) != canonical or canonical_map.reason(row_id) != reason:
+                errors.append("%s: %s is %s (%s), expected %s (%s)"
+                              % (description, row_id, canonical_map.canonical(row_id),
+                                 canonical_map.reason(row_id), canonical, reason))
+
+    diagnostics = CanonicalMap(make_rows(CASES[-1][1]), 'linked_compound').diagnostics()
+    if diagnostics['cycles'] != [['cpd1', 'cpd2']]:
+        errors.append("cycle not reported: %s" % diagnostics['cycles'])
+    diagnostics = CanonicalMap(make_rows(CASES[1][1]), 'linked_compound').diagnostics()
+    if diagnostics['conflicts'] != [['cpd1', 'cpd2', 'cpd3']]:
+        errors.append("conflict not reported: %s" % diagnostics['conflicts'])
+    diagnostics = CanonicalMap(make_rows(CASES[5][1]), 'linked_compound').diagnostics()
+    if sorted(diagnostics['dangling']) != [('cpd1', 'cpd8'), ('cpd2', 'cpd8')]:
+        errors.append("dangling links not reported: %s" % diagnostics['dangling'])
+    return errors
+
+
+def first_current_link(rows, row_id):
+    # The replacement TemplateHelper used to pick: the first of the
+    # listed links that isn't obsolete, stopping at a missing link
+    for link in rows[row_id]['linked_compound'].split(';'):
+        if link not in rows:
+            return None
+        if rows[link]['is_obsolete'] == 0:
+            return link
+    return None
+
+
+def breadth_first_link(rows, row_id):
+    queue = [row_id]
+    for entry in queue:
+        if rows[entry]['linked_compound'] == 'null':
+            continue
+        for link in rows[entry]['linked_compound'].split(';'):
+            if link not in rows:
+                continue
+            if rows[link]['is_obsolete'] == 0:
+                return link
+            if link not in queue:
+                queue.append(link)
+    return None
+
+
+def validate_random(seed, size):
+    rng = random.Random(seed)
+    ids = ["cpd%05d" % index for index in range(size)]
+    entries = dict()
+    for row_id in ids:
+        links = rng.sample(ids + ['cpd99999'], rng.randrange(4))
+        entries[row_id] = (rng.random() < 0.6, ';'.join(links) if links else 'null')
+    rows = make_rows(entries)
+    canonical_map = CanonicalMap(rows, 'linked_compound')
+
+    errors = []
+    for row_id in ids:
+        if rows[row_id]['is_obsolete'] == 0:
+            expected = row_id
+        else:
+            expected = breadth_first_link(rows, row_id)
+            direct = first_current_link(rows, row_id) if rows[row_id]['linked_compound'] != 'null' else None
+            if direct is not None and direct != expected:
+                errors.append("%s: breadth first %s, TemplateHelper %s" % (row_id, expected, direct))
+        if canonical_map.canonical(row_id) != expected:
+            errors.append("%s is %s, expected %s" % (row_id, canonical_map.canonical(row_id), expected))
+        if (expected is None) != (canonical_map.reason(row_id) is not None):
+            errors.append("%s has reason %s" % (row_id, canonical_map.reason(row_id)))
+    return errors
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Validates the replacements chosen by CanonicalMap.canonical()')
+    parser.add_argument('-s', dest='seeds', type=int, default=20,
+                        help='Number of random sets of linked compounds')
+    parser.add_argument('-n', dest='size', type=int, default=300,
+                        help='Number of compounds in each set')
+    args = parser.parse_args()
+
+    errors = validate_cases()
+    for seed in range(args.seeds):
+        errors += ["seed %d, %s" % (seed, error) for error in validate_random(seed, args.size)]
+
+    if errors:
+        print("ERROR-Canonical Map: " + "; ".join(errors), file=sys.stderr)
+    exit(len(errors) > 0)
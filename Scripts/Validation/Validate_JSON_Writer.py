@@ -0,0 +1,107 @@
+"""Validates that Writers.writeJSON() writes the same text as json.dumps()"""
+
+import os
+import sys
+import json
+import random
+import argparse
+import tempfile
+from BiochemPy import Writers
+
+
+def random_value(rng, depth=0):
+    choice = rng.randrange(8 if depth < 2 else 5)
+    if choice == 0:
+        return None
+    if choice == 1:
+        return rng.choice([True, False])
+    if choice == 2:
+        return rng.randint(-1000, 1000)
+    if choice == 3:
+        return rng.choice([0.0, 1.5, -56.69, 10000000, 1e-05, rng.uniform(-100, 100)])
+    if choice == 4:
+        # Strings with the characters that are escaped, and braces and
+        # indentation that could be taken for the end of a record
+        return rng.choice(["null", "", "H2O", "α-D-Glucose", "a;b|c:d",
+                           "quote \" and \\ backslash", "line\nbreak\ttab",
+                           "    },\n    {", "}]", "[{"])
+    if choice == 5:
+        return [random_value(rng, depth + 1) for _ in range(rng.randrange(4))]
+    return dict(("key%d" % index, random_value(rng, depth + 1))
+                for index in range(rng.randrange(4)))
+
+
+def random_record(rng, record_id):
+    record = {'id': record_id}
+    for field in ('name', 'formula', 'deltag', 'aliases', 'notes', 'pka'):
+        if rng.random() < 0.8:
+            record[field] = random_value(rng)
+    return record
+
+
+def check_file(json_file, records, step, written=None):
+    errors = []
+    result = Writers.writeJSON(json_file, records)
+    if written is not None and result is not written:
+        errors.append("%s: writeJSON() returned %s" % (step, result))
+
+    with open(json_file) as fh:
+        text = fh.read()
+    if text != json.dumps(records, indent=4, sort_keys=True):
+        errors.append("%s: text differs from json.dumps(indent=4, sort_keys=True)" % step)
+    elif json.loads(text) != records:
+        errors.append("%s: records read back differ" % step)
+    return errors
+
+
+def validate_writer(seed, size):
+    rng = random.Random(seed)
+    errors = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        json_file = os.path.join(tmp_dir, 'compounds.json')
+        records = [random_record(rng, "cpd%05d" % index) for index in range(size)]
+        errors += check_file(json_file, records, 'first write', written=True)
+        errors += check_file(json_file, records, 'unchanged', written=False)
+
+        # Records changed, removed and added, the unchanged ones are copied
+        for _ in range(4):
+            for record in rng.sample(records, max(1, size // 10)):
+                record['name'] = random_value(rng)
+            for record in rng.sample(records, max(1, size // 20)):
+                records.remove(record)
+            for index in rng.sample(range(size, size * 2), max(1, size // 20)):
+                records.append(random_record(rng, "cpd%05d" % index))
+            records.sort(key=lambda record: record['id'])
+            errors += check_file(json_file, records, 'changed', written=True)
+
+        # Records moved, so the old ones are out of order
+        records.reverse()
+        errors += check_file(json_file, records, 'reversed', written=True)
+
+        # A file changed since it was written isn't copied from
+        with open(json_file, 'w') as fh:
+            fh.write('[]')
+        errors += check_file(json_file, records, 'edited', written=True)
+
+        errors += check_file(json_file, records[:1], 'single', written=True)
+        errors += check_file(json_file, [], 'empty', written=True)
+        errors += check_file(json_file, records, 'refilled', written=True)
+    return errors
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Validates that Writers.writeJSON() writes the same text as json.dumps()')
+    parser.add_argument('-s', dest='seeds', type=int, default=5,
+                        help='Number of random sets of records')
+    parser.add_argument('-n', dest='size', type=int, default=200,
+                        help='Number of records in each set')
+    args = parser.parse_args()
+
+    errors = []
+    for seed in range(args.seeds):
+        errors += ["seed %d, %s" % (seed, error) for error in validate_writer(seed, args.size)]
+
+    if errors:
+        print("ERROR-JSON Writer: " + "; ".join(errors), file=sys.stderr)
+    exit(len(errors) > 0)
@@ -0,0 +1,91 @@
+"""Validates Thermodynamics.reactionEnergies() against summing one reagent at a time"""
+
+import sys
+import random
+import argparse
+from BiochemPy import Thermodynamics
+
+
+def random_reactions(rng, size):
+    cpds = ["cpd%05d" % index for index in range(size // 2)]
+    cpds_energies = dict()
+    for cpd in cpds:
+        if rng.random() < 0.9:
+            cpds_energies[cpd] = (round(rng.uniform(-500, 500), 2), round(rng.uniform(0, 10), 2))
+
+    rxns_dict = dict()
+    for index in range(size):
+        reagents = list()
+        if rng.random() > 0.02:
+            for cpd in rng.sample(cpds, rng.randint(1, 8)):
+                coeff = rng.choice([-1, -2, -3, 1, 2, 4, -0.5, 0.5, 1.5, -2.5, 0.333])
+                reagents.append("%s:%s:%d:0:\"%s\"" % (coeff, cpd, rng.randrange(3), cpd))
+        rxns_dict["rxn%05d" % index] = {'stoichiometry': ';'.join(reagents)}
+    return (rxns_dict, cpds_energies)
+
+
+def sum_reagents(stoichiometry, cpds_energies):
+    # The sums as they were done in Update_Reaction_GroupContribution_Energies.py,
+    # with the coefficients as returned by Reactions.parseStoich()
+    dg_sum = 0.0
+    dge_sum = 0.0
+    missing = 0
+    if stoichiometry == "":
+        return (dg_sum, dge_sum, missing)
+
+    for rgt in stoichiometry.split(";"):
+        (coeff, cpd, cpt, index, name) = rgt.split(":", 4)
+        coeff = float(coeff)
+        if str(coeff)[-2:] == ".0":
+            coeff = int(round(coeff))
+
+        if cpd not in cpds_energies:
+            missing += 1
+            continue
+        dg_sum += (cpds_energies[cpd][0] * coeff)
+        dge_sum += (cpds_energies[cpd][1] * coeff)**2
+    return (dg_sum, dge_sum**0.5, missing)
+
+
+def validate_energies(seed, size):
+    rng = random.Random(seed)
+    (rxns_dict, cpds_energies) = random_reactions(rng, size)
+    matrix_dict = Thermodynamics().buildMatrix(rxns_dict)
+    energies_dict = Thermodynamics.reactionEnergies(matrix_dict, cpds_energies)
+
+    errors = []
+    if matrix_dict['reactions'] != sorted(rxns_dict):
+        errors.append("reactions are not sorted")
+    for (row, rxn) in enumerate(matrix_dict['reactions']):
+        (dg_sum, dge_sum, missing) = sum_reagents(rxns_dict[rxn]['stoichiometry'], cpds_energies)
+        if energies_dict['missing'][row] != missing:
+            errors.append("%s: %d reagents missing, expected %d" % (rxn, energies_dict['missing'][row], missing))
+            continue
+        if missing > 0:
+            continue
+
+        # The values have to be the same, not just close, so that the
+        # energies written to the database don't change
+        if energies_dict['deltag'][row] != dg_sum or energies_dict['deltagerr'][row] != dge_sum:
+            errors.append("%s: %r +/- %r, expected %r +/- %r"
+                          % (rxn, energies_dict['deltag'][row], energies_dict['deltagerr'][row],
+                             dg_sum, dge_sum))
+    return errors
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Validates Thermodynamics.reactionEnergies() against summing one reagent at a time')
+    parser.add_argument('-s', dest='seeds', type=int, default=5,
+                        help='Number of random sets of reactions')
+    parser.add_argument('-n', dest='size', type=int, default=2000,
+                        help='Number of reactions in each set')
+    args = parser.parse_args()
+
+    errors = []
+    for seed in range(args.seeds):
+        errors += ["seed %d, %s" % (seed, error) for error in validate_energies(seed, args.size)]
+
+    if errors:
+        print("ERROR-Reaction Energies: " + "; ".join(errors), file=sys.stderr)
+    exit(len(errors) > 0)